@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+
+# Copyright 2016 Tesora Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Benchmark of the lookup of the last completed backup of an instance.
+
+The backups table of a scratch database is filled with backups spread over
+many instances. Backup.get_last_completed is then timed against the scan of
+the first page of backups that it replaced:
+
+    python tools/bench_last_completed_backup.py --rows 1000000
+"""
+
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+import uuid
+
+from sqlalchemy.schema import MetaData
+from sqlalchemy.schema import Table
+
+ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, ROOT)
+
+from trove.backup import models  # noqa
+from trove.backup.state import BackupState  # noqa
+from trove.common import cfg  # noqa
+from trove.common.context import TroveContext  # noqa
+from trove.db import get_db_api  # noqa
+from trove.db.sqlalchemy import session  # noqa
+
+CONF = cfg.CONF
+INSERT_BATCH = 10000
+
+
+def create_db(connection):
+    CONF(args=[], project='trove', default_config_files=[])
+    CONF.set_override('connection', connection, group='database')
+    db_api = get_db_api()
+    db_api.db_sync(CONF)
+    db_api.configure_db(CONF)
+    return Table('backups', MetaData(bind=session.get_engine()),
+                 autoload=True)
+
+
+def fill(backups, rows, instance_ids):
+    states = [BackupState.COMPLETED] * 8 + [BackupState.FAILED,
+                                            BackupState.NEW]
+    start = datetime.datetime(2016, 1, 1)
+    batch = []
+    for row in range(rows):
+        batch.append({
+            'id': str(uuid.uuid4()),
+            'name': 'backup-%d' % row,
+            'tenant_id': 'tenant',
+            'state': random.choice(states),
+            'instance_id': random.choice(instance_ids),
+            'deleted': random.random() < 0.1,
+            'parent_id': None if random.random() < 0.3 else 'parent',
+            'created': start + datetime.timedelta(seconds=row),
+            'updated': start + datetime.timedelta(seconds=row),
+        })
+        if len(batch) == INSERT_BATCH:
+            backups.insert().execute(batch)
+            batch = []
+    if batch:
+        backups.insert().execute(batch)
+
+
+def first_page_scan(context, instance_id, include_incremental=True):
+    """The lookup that get_last_completed used before the dedicated
+    query: the newest completed backup of the first page.
+    """
+    last_backup = None
+    backups, marker = models.Backup.list_for_instance(context, instance_id)
+    for backup in backups:
+        if backup.state == BackupState.COMPLETED and (
+                include_incremental or not backup.parent_id):
+            if not last_backup or backup.updated > last_backup.updated:
+                last_backup = backup
+    return last_backup
+
+
+def bench(label, lookup, context, instance_ids):
+    start = time.time()
+    for instance_id in instance_ids:
+        lookup(context, instance_id, include_incremental=False)
+    elapsed = time.time() - start
+    print("%-45s %10.3f ms per lookup" %
+          (label, elapsed * 1000 / len(instance_ids)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--connection',
+                        default='sqlite:////tmp/trove_backup_bench.sqlite',
+                        help='Connection to an empty scratch database.')
+    parser.add_argument('--rows', type=int, default=1000000,
+                        help='Number of backups.')
+    parser.add_argument('--instances', type=int, default=5000,
+                        help='Number of instances the backups belong to.')
+    parser.add_argument('--lookups', type=int, default=100,
+                        help='Number of instances to look up.')
+    args = parser.parse_args()
+
+    backups = create_db(args.connection)
+    instance_ids = [str(uuid.uuid4()) for _ in range(args.instances)]
+    print("Inserting %d backups of %d instances." %
+          (args.rows, args.instances))
+    fill(backups, args.rows, instance_ids)
+
+    context = TroveContext(is_admin=True)
+    lookups = instance_ids[:args.lookups]
+    bench("first page scan", first_page_scan, context, lookups)
+    bench("get_last_completed", models.Backup.get_last_completed, context,
+          lookups)
+
+
+if __name__ == '__main__':
+    main()
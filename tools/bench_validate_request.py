@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+
+# Copyright 2016 Tesora Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Benchmark of the validation of API request bodies against their schemas.
+
+Controller.validate_request, which reuses the validator of each schema, is
+timed against building a Draft4Validator on every request as it used to:
+
+    python tools/bench_validate_request.py --requests 10000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import jsonschema
+
+ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, ROOT)
+
+from trove.cluster.service import ClusterController  # noqa
+from trove.common import exception  # noqa
+from trove.instance.service import InstanceController  # noqa
+
+FLAVOR = '7'
+DATASTORE = {'type': 'mysql', 'version': '5.6'}
+
+INSTANCE_CREATE = {
+    'instance': {
+        'name': 'bench',
+        'flavorRef': FLAVOR,
+        'volume': {'size': 2},
+        'databases': [{'name': 'db%d' % i} for i in range(3)],
+        'users': [{'name': 'user%d' % i, 'password': 'password',
+                   'databases': [{'name': 'db%d' % i}]}
+                  for i in range(3)],
+        'datastore': DATASTORE,
+        'nics': [{'net-id': 'a3a3e2b4-5bbe-4ad6-8b3b-7e1d3e0ae2a5'}],
+    }
+}
+
+CLUSTER_CREATE = {
+    'cluster': {
+        'name': 'bench',
+        'datastore': DATASTORE,
+        'instances': [{'flavorRef': FLAVOR, 'volume': {'size': 2}}
+                      for _ in range(3)],
+    }
+}
+
+
+def uncached_validate_request(controller, action, action_args):
+    """validate_request as it was before the validators were cached."""
+    body = action_args.get('body', {})
+    schema = controller.get_schema(action, body)
+    if schema:
+        validator = jsonschema.Draft4Validator(schema)
+        if not validator.is_valid(body):
+            errors = sorted(validator.iter_errors(body),
+                            key=lambda e: e.path)
+            raise exception.BadRequest(
+                message=controller.format_validation_msg(errors))
+
+
+def bench(label, validate, controller, body, requests):
+    start = time.time()
+    for _ in range(requests):
+        validate(controller, 'create', {'body': body})
+    elapsed = time.time() - start
+    print("%-40s %10.1f us per request" %
+          (label, elapsed * 1000000 / requests))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--requests', type=int, default=10000,
+                        help='Number of requests to validate.')
+    args = parser.parse_args()
+
+    for name, controller, body in [
+            ('instance create', InstanceController(), INSTANCE_CREATE),
+            ('cluster create', ClusterController(), CLUSTER_CREATE)]:
+        bench("%s, validator per request" % name,
+              uncached_validate_request, controller, body, args.requests)
+        bench("%s, cached validator" % name,
+              type(controller).validate_request, controller, body,
+              args.requests)
+
+
+if __name__ == '__main__':
+    main()
@@ -14,8 +14,13 @@
 
 """Model classes that form the core of snapshots functionality."""
 
+import base64
+import datetime
+
 from oslo_log import log as logging
+from sqlalchemy import and_
 from sqlalchemy import desc
+from sqlalchemy import or_
 from swiftclient.client import ClientException
 
 from trove.backup.state import BackupState
@@ -33,6 +38,8 @@ from trove.taskmanager import api
 CONF = cfg.CONF
 LOG = logging.getLogger(__name__)
 
+MARKER_TIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
 
 class Backup(object):
 
@@ -146,6 +153,18 @@ class Backup(object):
             query = query.filter(DBBackup.id != exclude)
         return query.first()
 
+    @classmethod
+    def running_for_tenant(cls, tenant_id):
+        """
+        Returns the first running backup of a tenant
+        :param tenant_id: Id of the tenant
+        """
+        query = DBBackup.query()
+        query = query.filter(DBBackup.tenant_id == tenant_id,
+                             DBBackup.state.in_(BackupState.RUNNING_STATES))
+        query = query.filter_by(deleted=False)
+        return query.first()
+
     @classmethod
     def get_by_id(cls, context, backup_id, deleted=False):
         """
@@ -163,25 +182,51 @@ class Backup(object):
         except exception.NotFound:
             raise exception.NotFound(uuid=backup_id)
 
+    @staticmethod
+    def _encode_marker(backup):
+        """The marker of the page after the given backup: its position in
+        the (updated, id) order, opaque to the client.
+        """
+        key = "%s/%s" % (backup.updated.strftime(MARKER_TIME_FORMAT),
+                         backup.id)
+        return base64.urlsafe_b64encode(key)
+
+    @staticmethod
+    def _decode_marker(marker):
+        try:
+            updated, backup_id = base64.urlsafe_b64decode(
+                str(marker)).split('/', 1)
+            return (datetime.datetime.strptime(updated, MARKER_TIME_FORMAT),
+                    backup_id)
+        except (TypeError, ValueError):
+            raise exception.BadRequest(_("Invalid marker: %s") % marker)
+
     @classmethod
     def _paginate(cls, context, query):
         """Paginate the results of the base query.
-        We use limit/offset as the results need to be ordered by date
-        and not the primary key.
+        The results are ordered by date, most recent first, and the marker
+        is the (updated, id) key of the last backup of the previous page,
+        so that a page is found through the index and does not shift when
+        backups are added. Integer markers of the previous limit/offset
+        pagination are still accepted as offsets.
         """
-        marker = int(context.marker or 0)
+        marker = context.marker
         limit = int(context.limit or CONF.backups_page_size)
         # order by 'updated DESC' to show the most recent backups first
-        query = query.order_by(desc(DBBackup.updated))
-        # Apply limit/offset
-        query = query.limit(limit)
-        query = query.offset(marker)
-        # check if we need to send a marker for the next page
-        if query.count() < limit:
-            marker = None
-        else:
-            marker += limit
-        return query.all(), marker
+        query = query.order_by(desc(DBBackup.updated), desc(DBBackup.id))
+        if marker and str(marker).isdigit():
+            query = query.offset(int(marker))
+        elif marker:
+            updated, backup_id = cls._decode_marker(marker)
+            query = query.filter(or_(
+                DBBackup.updated < updated,
+                and_(DBBackup.updated == updated, DBBackup.id < backup_id)))
+        # fetch one more backup to find out if there is a next page
+        backups = query.limit(limit + 1).all()
+        if len(backups) > limit:
+            backups = backups[:limit]
+            return backups, cls._encode_marker(backups[-1])
+        return backups, None
 
     @classmethod
     def list(cls, context, datastore=None):
@@ -231,17 +276,18 @@ class Backup(object):
         :param include_incremental:
         :return:
         """
-        last_backup = None
-        backups, marker = cls.list_for_instance(context, instance_id)
-        # we don't care about the marker since we only want the first backup
-        # and they are ordered descending based on date (what we want)
-        for backup in backups:
-            if backup.state == BackupState.COMPLETED and (
-                    include_incremental or not backup.parent_id):
-                if not last_backup or backup.updated > last_backup.updated:
-                    last_backup = backup
-
-        return last_backup
+        query = DBBackup.query()
+        query = query.filter_by(instance_id=instance_id,
+                                state=BackupState.COMPLETED,
+                                deleted=False)
+        if not context.is_admin:
+            query = query.filter_by(tenant_id=context.tenant)
+        if not include_incremental:
+            query = query.filter(DBBackup.parent_id.is_(None))
+        # the (instance_id, deleted, updated, id) index of the backup
+        # listings walks the backups of the instance newest first
+        query = query.order_by(desc(DBBackup.updated), desc(DBBackup.id))
+        return query.first()
 
     @classmethod
     def fail_for_instance(cls, instance_id):
@@ -56,7 +56,7 @@ def main():
     from trove.common.rpc import version as rpc_version
     server = rpc_service.RpcService(
         manager=manager, host=CONF.guest_id,
-        rpc_api_version=rpc_version.RPC_API_VERSION)
+        rpc_api_version=rpc_version.GUEST_RPC_API_VERSION)
 
     launcher = openstack_service.launch(CONF, server)
     launcher.wait()
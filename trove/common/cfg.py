@@ -128,6 +128,19 @@ common_opts = [
                      '(using Designate DNSaaS).'),
     cfg.StrOpt('db_api_implementation', default='trove.db.sqlalchemy.api',
                help='API Implementation for Trove database access.'),
+    cfg.BoolOpt('db_read_replica_routing', default=False,
+                help='Send the queries of the GET and HEAD API requests to '
+                'the database replica set by the slave_connection option of '
+                'the [database] section. Requests that write, and the '
+                'requests of a tenant during db_read_replica_write_window '
+                'seconds after it wrote, read from the primary. The writes '
+                'are tracked by each API worker, so a request served by '
+                'another worker than the one that wrote may still read '
+                'data from the replica that does not have the write yet.'),
+    cfg.IntOpt('db_read_replica_write_window', default=10,
+               help='Seconds after a write of a tenant during which its API '
+               'requests read from the primary database, so that they see '
+               'the write before it reaches the replica.'),
     cfg.StrOpt('dns_driver', default='trove.dns.driver.DnsDriver',
                help='Driver for DNSaaS.'),
     cfg.StrOpt('dns_instance_entry_factory',
@@ -164,6 +177,19 @@ common_opts = [
                help='Page size for listing databases.'),
     cfg.IntOpt('instances_page_size', default=20,
                help='Page size for listing instances.'),
+    cfg.BoolOpt('instances_list_page_servers', default=False,
+                help='When listing instances, fetch from Nova only the '
+                     'servers backing the requested page instead of every '
+                     'server owned by the tenant.'),
+    cfg.IntOpt('instances_list_server_workers', default=10,
+               help='Maximum number of concurrent Nova requests used when '
+                    'listing instances, either to fetch the servers of a '
+                    'page (see instances_list_page_servers) or the servers '
+                    'of instances living in other regions.'),
+    cfg.IntOpt('instances_list_remote_server_timeout', default=10,
+               help='Maximum time (in seconds) to wait for a server in '
+                    'another region when listing instances. Servers that '
+                    'take longer are reported as shut down.'),
     cfg.IntOpt('clusters_page_size', default=20,
                help='Page size for listing clusters.'),
     cfg.IntOpt('backups_page_size', default=20,
@@ -229,6 +255,27 @@ common_opts = [
     cfg.IntOpt('trove_conductor_workers',
                help='Number of workers for the Conductor service. The default '
                'will be the number of CPUs available.'),
+    cfg.IntOpt('conductor_heartbeat_flush_interval', default=0,
+               help='Interval (in seconds) at which the Conductor writes '
+               'guest heartbeats to the database in batches. Only the newest '
+               'heartbeat of each instance is kept in between flushes. The '
+               'default of 0 writes every heartbeat as it arrives.'),
+    cfg.IntOpt('conductor_lastseen_cache_size', default=10000,
+               help='Maximum number of (instance, method) entries each '
+               'Conductor worker keeps in its cache of last seen guest '
+               'messages, used to discard out of order messages without a '
+               'database read. Set to 0 to disable the cache.'),
+    cfg.BoolOpt('conductor_status_notifications', default=False,
+                help='Whether the Conductor notifies the task managers when '
+                'a heartbeat changes the service status of an instance, so '
+                'that cluster operations stop waiting for the instances as '
+                'soon as they are ready, rather than polling the database '
+                'every usage_sleep_time seconds.'),
+    cfg.IntOpt('cluster_status_fallback_interval', default=60,
+               help='Interval (in seconds) at which the task manager still '
+               'polls the status of the instances it waits for when '
+               'conductor_status_notifications is set, in case a '
+               'notification is lost.'),
     cfg.StrOpt('use_nova_key_name', default=None,
                help='Use key_name for for nova instances'),
     cfg.BoolOpt('use_nova_server_config_drive', default=False,
@@ -245,6 +292,13 @@ common_opts = [
                help='The default datastore id or name to use if one is not '
                'provided by the user. If the default value is None, the field '
                'becomes required in the instance create request.'),
+    cfg.IntOpt('datastore_cache_ttl', default=60,
+               help='Seconds for which the datastores, datastore versions, '
+               'capabilities and configuration parameters loaded from the '
+               'database are cached by each process. Changes made by the '
+               'process itself are seen at once, changes made by other '
+               'processes, such as trove-manage, after at most this delay. '
+               'Set to 0 to disable the cache.'),
     cfg.StrOpt('datastore_manager', default=None,
                help='Manager class in the Guest Agent, set up by the '
                'Taskmanager on instance provision.'),
@@ -328,6 +382,14 @@ common_opts = [
                 help='Encrypt backups using OpenSSL.'),
     cfg.StrOpt('backup_aes_cbc_key', default='default_aes_cbc_key',
                help='Default OpenSSL aes_cbc key.'),
+    cfg.IntOpt('backup_compression_workers', default=1,
+               help='Number of cores the guest agent uses to compress '
+               'backups. With more than 1, backups are compressed, and then '
+               'encrypted, by the agent instead of a gzip command; the '
+               'output is still read by gzip on restore.'),
+    cfg.IntOpt('backup_compression_block_size', default=2 ** 20,
+               help='Size (in bytes) of the blocks compressed concurrently '
+               'when backup_compression_workers is more than 1.'),
     cfg.BoolOpt('backup_use_snet', default=False,
                 help='Send backup files over snet.'),
     cfg.IntOpt('backup_chunk_size', default=2 ** 16,
@@ -339,6 +401,41 @@ common_opts = [
     cfg.IntOpt('backup_segment_max_size', default=2 * (1024 ** 3),
                help='Maximum size (in bytes) of each segment of the backup '
                'file.'),
+    cfg.IntOpt('backup_upload_workers', default=1,
+               help='Number of backup segments uploaded to Swift '
+               'concurrently, each over its own connection. While segments '
+               'are uploaded the next one is read ahead from the backup '
+               'process, so up to backup_upload_workers + 1 segments are '
+               'buffered at a time.'),
+    cfg.IntOpt('backup_upload_buffer_size', default=64 * (1024 ** 2),
+               help='Size (in bytes) of a buffered backup segment kept in '
+               'memory when uploading in parallel. Larger segments are '
+               'spooled to a temporary file.'),
+    cfg.IntOpt('backup_download_workers', default=1,
+               help='Number of backup segments downloaded from Swift '
+               'concurrently on restore, each over its own connection. '
+               'Segments are still fed to the restore process in order, so '
+               'up to backup_download_workers + 1 segments are buffered at '
+               'a time.'),
+    cfg.IntOpt('backup_download_buffer_size', default=64 * (1024 ** 2),
+               help='Size (in bytes) of a buffered backup segment kept in '
+               'memory when downloading in parallel. Larger segments are '
+               'spooled to a temporary file.'),
+    cfg.IntOpt('backup_delete_workers', default=10,
+               help='Number of backup segments deleted from Swift '
+               'concurrently when Swift does not support bulk-delete.'),
+    cfg.IntOpt('backup_dedup_chunk_size', default=2 ** 20,
+               help='Average size (in bytes) of the chunks a backup is split '
+               'into by the SwiftDedupStorage strategy. That strategy '
+               'requires backup_use_gzip_compression and '
+               'backup_use_openssl_encryption to be disabled, and fails '
+               'the backups otherwise.'),
+    cfg.IntOpt('backup_chunk_sweep_grace', default=24 * 3600,
+               help='Seconds for which a chunk of the SwiftDedupStorage '
+               'strategy that no backup refers to is kept, marked with a '
+               'tombstone, before it is deleted. Must be longer than a '
+               'backup takes, as backups list the stored chunks when they '
+               'start.'),
     cfg.StrOpt('remote_dns_client',
                default='trove.common.remote.dns_client',
                help='Client to send DNS calls to.'),
@@ -455,6 +552,10 @@ common_opts = [
     cfg.IntOpt('cluster_usage_timeout', default=36000,
                help='Maximum time (in seconds) to wait for a cluster to '
                     'become active.'),
+    cfg.IntOpt('fan_out_workers', default=16,
+               help='Maximum number of instances the task manager calls '
+                    'concurrently during cluster and replication '
+                    'operations.'),
     cfg.IntOpt('timeout_wait_for_service', default=120,
                help='Maximum time (in seconds) to wait for a service to '
                     'become alive.'),
@@ -471,6 +572,18 @@ common_opts = [
                help='Maximum size of a chunk saved in guest log container.'),
     cfg.IntOpt('guest_log_expiry', default=2592000,
                help='Expiry (in seconds) of objects in guest log container.'),
+    cfg.IntOpt('guest_log_ship_interval', default=0,
+               help='Maximum time (in seconds) before new lines of the '
+                    'enabled guest logs are shipped to the guest log '
+                    'container. 0 disables shipping, logs are then only '
+                    'published on request. The guest ships with the token '
+                    'of the last guest log request; once that token '
+                    'expires the logs show the Shipping Stopped status '
+                    'until the next guest log request.'),
+    cfg.IntOpt('guest_log_ship_batch_size', default=65536,
+               help='Ship the new lines of a guest log as soon as this '
+                    'many bytes are pending, rather than waiting for '
+                    'guest_log_ship_interval.'),
     cfg.IntOpt('password_min_lower_case', default=1,
                help='Minimum number of lower case letters to use in '
                     'randomly generated database passwords.'),
@@ -1738,7 +1851,10 @@ rpcapi_cap_opts = [
         help='Set a version cap for messages sent to taskmanager services'),
     cfg.StrOpt(
         'guestagent', default="icehouse",
-        help='Set a version cap for messages sent to guestagent services'),
+        help='Set a version cap for messages sent to guestagent services. '
+             'Guest agent calls are batched into one message only when '
+             'this is mitaka or later, once all guest agents are upgraded; '
+             'with the default they are sent one at a time.'),
     cfg.StrOpt(
         'conductor', default="icehouse",
         help='Set a version cap for messages sent to conductor services'),
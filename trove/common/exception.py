@@ -323,6 +323,12 @@ class PollTimeOut(TroveError):
     message = _("Polling request timed out.")
 
 
+class FanOutError(TroveError):
+
+    message = _("%(failed)d of %(count)d concurrent calls failed: "
+                "%(errors)s.")
+
+
 class Forbidden(TroveError):
 
     message = _("User does not have admin privileges.")
@@ -17,13 +17,19 @@
 Module dedicated functions/classes dealing with rate limiting requests.
 """
 
+import array
 import collections
 import copy
+import fcntl
+import hashlib
 import httplib
 import math
+import os
 import re
+import sys
 import time
 
+from oslo_log import log as logging
 from oslo_serialization import jsonutils
 from oslo_utils import importutils
 import webob.dec
@@ -32,10 +38,12 @@ import webob.exc
 from trove.common import base_wsgi
 from trove.common import cfg
 from trove.common.i18n import _
+from trove.common.i18n import _LW
 from trove.common import wsgi
 
 
 CONF = cfg.CONF
+LOG = logging.getLogger(__name__)
 
 # Convenience constants for the limits dictionary passed to Limiter().
 PER_SECOND = 1
@@ -330,6 +338,415 @@ class Limiter(object):
         return result
 
 
+class _CompiledLimits(object):
+    """
+    A list of `Limit` objects with one precompiled matcher per verb.
+
+    The matcher of a verb is a single regular expression made of one
+    optional, empty named group per limit, each guarded by a lookahead on
+    the limit's regex. One match call therefore tells which of the limits
+    apply to a URL.
+    """
+
+    def __init__(self, limits):
+        self.limits = list(limits)
+        self.intervals = [float(limit.unit) / float(limit.value)
+                          for limit in self.limits]
+        self.capacities = [float(limit.unit) for limit in self.limits]
+
+        indexes_by_verb = collections.defaultdict(list)
+        for index, limit in enumerate(self.limits):
+            indexes_by_verb[limit.verb].append(index)
+
+        self.matchers = {}
+        for verb, indexes in indexes_by_verb.items():
+            pattern = ''.join(
+                '(?:(?=%s)(?P<l%d>))?' % (self.limits[index].regex, index)
+                for index in indexes)
+            group_names = [(index, 'l%d' % index) for index in indexes]
+            self.matchers[verb] = (re.compile(pattern), group_names)
+
+    def match(self, verb, url):
+        """Return the indexes of the limits applying to verb and url."""
+        matcher = self.matchers.get(verb)
+        if matcher is None:
+            return []
+        regex, group_names = matcher
+        groups = regex.match(url).groupdict()
+        return [index for index, name in group_names
+                if groups[name] is not None]
+
+
+class BucketLimiter(object):
+    """
+    Rate-limit checking class which handles limits in memory, like `Limiter`,
+    with a constant cost per request and compact per-user state.
+
+    Each limit is a leaky bucket with the same semantics as `Limit`, kept as
+    a single "theoretical arrival time" (GCRA): the bucket is full up to
+    that time and drains in real time. A user's state is an array of these
+    times, one per limit. A user whose buckets have all drained is in the
+    same state as a new user, so it is evicted once the eviction interval
+    has elapsed.
+
+    To use it, set ``limiter = trove.common.limits.BucketLimiter`` in the
+    ``ratelimit`` filter of api-paste.ini. ``eviction_interval`` (in
+    seconds) may be set there as well.
+    """
+
+    DEFAULT_EVICTION_INTERVAL = 60
+
+    def __init__(self, limits, **kwargs):
+        """
+        Initialize the new `BucketLimiter`.
+
+        @param limits: List of `Limit` objects
+        """
+        self.default_limits = _CompiledLimits(limits)
+        self.user_limits = {}
+        self.eviction_interval = float(kwargs.pop(
+            'eviction_interval', self.DEFAULT_EVICTION_INTERVAL))
+
+        # Pick up any per-user limit information
+        for key, value in kwargs.items():
+            if key.startswith('user:'):
+                username = key[5:]
+                self.user_limits[username] = _CompiledLimits(
+                    self.parse_limits(value))
+
+        self.arrival_times = {}
+        self.started = self._get_time()
+        self.next_eviction = self.started + self.eviction_interval
+        self.checks = 0
+        self.delayed = 0
+        self.evicted = 0
+
+    def _get_time(self):
+        """Retrieve the current time. Broken out for testability."""
+        return time.time()
+
+    def _limits_for(self, username):
+        return self.user_limits.get(username, self.default_limits)
+
+    def get_limits(self, username=None):
+        """
+        Return the limits for a given user.
+        """
+        now = self._get_time()
+        compiled = self._limits_for(username)
+        arrival_times = self.arrival_times.get(username)
+        result = []
+        for index, limit in enumerate(compiled.limits):
+            capacity = compiled.capacities[index]
+            arrival_time = arrival_times[index] if arrival_times else 0.0
+            water_level = max(arrival_time - now, 0.0)
+            next_request = max(
+                arrival_time + compiled.intervals[index] - capacity, now)
+            display = limit.display()
+            display.update({
+                "remaining": int(math.floor(
+                    ((capacity - water_level) / capacity) * limit.value)),
+                "resetTime": int(next_request),
+            })
+            result.append(display)
+        return result
+
+    def check_for_delay(self, verb, url, username=None):
+        """
+        Check the given verb/user/user triplet for limit.
+
+        @return: Tuple of delay (in seconds) and error message (or None, None)
+        """
+        now = self._get_time()
+        self.checks += 1
+        if now >= self.next_eviction:
+            self._evict_idle(now)
+
+        compiled = self._limits_for(username)
+        indexes = compiled.match(verb, url)
+        if not indexes:
+            return None, None
+
+        arrival_times = self.arrival_times.get(username)
+        if arrival_times is None:
+            arrival_times = array.array('d', [0.0] * len(compiled.limits))
+            self.arrival_times[username] = arrival_times
+
+        delays = []
+        for index in indexes:
+            arrival_time = max(arrival_times[index], now)
+            arrival_time += compiled.intervals[index]
+            difference = arrival_time - now - compiled.capacities[index]
+            if difference > 0:
+                delays.append((difference,
+                               compiled.limits[index].error_message))
+            else:
+                arrival_times[index] = arrival_time
+
+        if delays:
+            self.delayed += 1
+            delays.sort()
+            return delays[0]
+
+        return None, None
+
+    def _evict_idle(self, now):
+        idle = [username for username, arrival_times
+                in self.arrival_times.items()
+                if max(arrival_times) <= now]
+        for username in idle:
+            del self.arrival_times[username]
+        self.evicted += len(idle)
+        self.next_eviction = now + self.eviction_interval
+
+    def stats(self):
+        """
+        Return memory and throughput statistics of this limiter.
+        """
+        elapsed = max(self._get_time() - self.started, 1e-9)
+        state_bytes = sys.getsizeof(self.arrival_times) + sum(
+            sys.getsizeof(arrival_times)
+            for arrival_times in self.arrival_times.values())
+        return {
+            "users": len(self.arrival_times),
+            "state_bytes": state_bytes,
+            "checks": self.checks,
+            "delayed": self.delayed,
+            "evicted": self.evicted,
+            "checks_per_second": self.checks / elapsed,
+        }
+
+    parse_limits = staticmethod(Limiter.parse_limits)
+
+
+class FileSharedState(object):
+    """
+    Shares rate-limit state between the API workers of one host through a
+    file, which should live on a memory backed filesystem such as /dev/shm.
+    Updates are serialized with an exclusive lock on the file.
+    """
+
+    def __init__(self, path="/dev/shm/trove-api-ratelimit", **kwargs):
+        self.path = path
+
+    def sync(self, consumed, keys, now):
+        """
+        Add the locally consumed bucket time to the shared state and return
+        the shared arrival times of the given keys.
+
+        @param consumed: Dict of key to seconds of bucket time consumed
+                         locally since the last sync
+        @param keys: Keys whose shared arrival time should be returned
+        @param now: Current time
+        @return: Dict of key to shared arrival time
+        """
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            with os.fdopen(os.dup(fd), 'r+') as state_file:
+                content = state_file.read()
+                state = jsonutils.loads(content) if content else {}
+                for key, seconds in consumed.items():
+                    state[key] = max(state.get(key, 0.0), now) + seconds
+                # Drop the buckets that have drained.
+                state = {key: arrival_time
+                         for key, arrival_time in state.items()
+                         if arrival_time > now}
+                state_file.seek(0)
+                state_file.truncate()
+                state_file.write(jsonutils.dumps(state))
+        finally:
+            os.close(fd)
+        return {key: state.get(key, 0.0) for key in keys}
+
+
+class MemcachedSharedState(object):
+    """
+    Shares rate-limit state between API workers through memcached, using
+    compare-and-swap updates. Requires the pymemcache package.
+
+    The arrival times of all the keys are read in one request; only the
+    keys with consumption to add cost a request each to store it.
+    Consumption that cannot be stored after MAX_RETRIES attempts, because
+    other workers keep updating the same keys, is kept and added again on
+    the next sync.
+    """
+
+    KEY_PREFIX = "trove-ratelimit-"
+    MAX_RETRIES = 5
+
+    def __init__(self, servers="127.0.0.1:11211", client=None, **kwargs):
+        if client is None:
+            from pymemcache.client.hash import HashClient
+            client = HashClient(
+                [(host, int(port)) for host, port in
+                 (server.strip().rsplit(':', 1)
+                  for server in servers.split(','))],
+                default_noreply=False)
+        self.client = client
+        # Consumption that could not be stored on the previous syncs.
+        self.unsynced = {}
+
+    def _cache_key(self, key):
+        return self.KEY_PREFIX + hashlib.md5(key.encode("utf-8")).hexdigest()
+
+    def _store(self, pending, now, result):
+        """
+        Try once to add the pending consumption to the shared state and
+        return the consumption that was not stored.
+        """
+        cache_keys = dict((self._cache_key(key), key) for key in pending)
+        values = self.client.gets_many(list(cache_keys))
+        not_stored = {}
+        for cache_key, key in cache_keys.items():
+            value, cas = values.get(cache_key, (None, None))
+            arrival_time = max(float(value or 0.0), now) + pending[key]
+            # Let memcached forget the bucket once it has drained.
+            expiry = int(math.ceil(arrival_time - now)) + 1
+            if value is None:
+                stored = self.client.add(cache_key, repr(arrival_time),
+                                         expire=expiry)
+            else:
+                stored = self.client.cas(cache_key, repr(arrival_time), cas,
+                                         expire=expiry)
+            result[key] = arrival_time
+            if not stored:
+                not_stored[key] = pending[key]
+        return not_stored
+
+    def sync(self, consumed, keys, now):
+        """
+        Add the locally consumed bucket time to the shared state and return
+        the shared arrival times of the given keys.
+
+        See `FileSharedState.sync`.
+        """
+        pending = dict(self.unsynced)
+        for key, seconds in consumed.items():
+            pending[key] = pending.get(key, 0.0) + seconds
+        result = {}
+        for attempt in range(self.MAX_RETRIES):
+            if not pending:
+                break
+            pending = self._store(pending, now, result)
+        if pending:
+            LOG.warning(_LW("Could not store the rate-limit consumption of "
+                            "%d keys in memcached, it will be added on the "
+                            "next sync."), len(pending))
+        self.unsynced = pending
+
+        others = [key for key in keys if key not in result]
+        if others:
+            values = self.client.get_many(
+                [self._cache_key(key) for key in others])
+            for key in others:
+                result[key] = float(values.get(self._cache_key(key)) or 0.0)
+        return result
+
+
+class SharedBucketLimiter(BucketLimiter):
+    """
+    A `BucketLimiter` whose buckets are shared by all the API workers, so
+    that a tenant gets the configured limits rather than one set of limits
+    per worker, and limits survive worker restarts.
+
+    Requests are checked against local state as usual. The bucket time
+    consumed locally is pushed to the shared state, and the shared arrival
+    times pulled back, at most every ``sync_interval`` seconds, so that
+    requests do not wait on the shared state; only the first request of a
+    tenant unknown to the worker reads it. Between two syncs a tenant may
+    exceed its limits by what the other workers accept in that interval.
+
+    To use it, set in the ``ratelimit`` filter of api-paste.ini::
+
+        limiter = trove.common.limits.SharedBucketLimiter
+        shared_state = trove.common.limits.FileSharedState
+        sync_interval = 1
+
+    Options not used by the limiter, such as ``path`` for
+    `FileSharedState` or ``servers`` for `MemcachedSharedState`, are
+    passed to the shared state class.
+    """
+
+    DEFAULT_SYNC_INTERVAL = 1
+
+    def __init__(self, limits, **kwargs):
+        shared_state = kwargs.pop('shared_state', FileSharedState)
+        if not isinstance(shared_state, type):
+            shared_state = importutils.import_class(shared_state)
+        self.sync_interval = float(kwargs.pop(
+            'sync_interval', self.DEFAULT_SYNC_INTERVAL))
+        limiter_kwargs = {key: value for key, value in kwargs.items()
+                          if key.startswith('user:')
+                          or key == 'eviction_interval'}
+        state_kwargs = {key: value for key, value in kwargs.items()
+                        if key not in limiter_kwargs}
+        super(SharedBucketLimiter, self).__init__(limits, **limiter_kwargs)
+        self.shared_state = shared_state(**state_kwargs)
+        self.consumed = collections.defaultdict(float)
+        # Sync on the first request to pick up the existing shared state.
+        self.next_sync = 0
+        self.syncs = 0
+
+    @staticmethod
+    def _key(username, index):
+        return "%s/%d" % (username or '', index)
+
+    def check_for_delay(self, verb, url, username=None):
+        now = self._get_time()
+        if now >= self.next_sync:
+            self.sync(now)
+        if username not in self.arrival_times:
+            self._seed(username, now)
+
+        before = self.arrival_times.get(username)
+        before = array.array('d', before) if before is not None else None
+        result = super(SharedBucketLimiter, self).check_for_delay(
+            verb, url, username)
+
+        after = self.arrival_times.get(username)
+        if after is not None:
+            for index, arrival_time in enumerate(after):
+                previous = max(before[index] if before else 0.0, now)
+                if arrival_time > previous:
+                    self.consumed[self._key(username, index)] += (
+                        arrival_time - previous)
+        return result
+
+    def _seed(self, username, now):
+        # A tenant new to this worker starts from the shared state, so that
+        # restarted or idle workers do not grant it a fresh set of limits.
+        count = len(self._limits_for(username).limits)
+        if not count:
+            return
+        keys = [self._key(username, index) for index in range(count)]
+        shared = self.shared_state.sync({}, keys, now)
+        self.arrival_times[username] = array.array(
+            'd', [shared[key] for key in keys])
+
+    def sync(self, now=None):
+        """Exchange local consumption with the shared state."""
+        now = self._get_time() if now is None else now
+        keys = [self._key(username, index)
+                for username, arrival_times in self.arrival_times.items()
+                for index in range(len(arrival_times))]
+        consumed, self.consumed = self.consumed, collections.defaultdict(float)
+        shared = self.shared_state.sync(dict(consumed), keys, now)
+
+        for username, arrival_times in self.arrival_times.items():
+            for index in range(len(arrival_times)):
+                arrival_time = shared.get(self._key(username, index))
+                if arrival_time is not None:
+                    arrival_times[index] = arrival_time
+        self.syncs += 1
+        self.next_sync = now + self.sync_interval
+
+    def stats(self):
+        stats = super(SharedBucketLimiter, self).stats()
+        stats["syncs"] = self.syncs
+        return stats
+
+
 class WsgiLimiter(object):
     """
     Rate-limit checking from a WSGI application. Uses an in-memory `Limiter`.
@@ -81,4 +81,9 @@ class RpcService(service.Service):
             LOG.info(_("Failed to stop RPC server before shutdown. "))
             pass
 
+        # Let the manager write out what it has buffered, now that no more
+        # messages are received.
+        if hasattr(self.manager_impl, 'stop'):
+            self.manager_impl.stop()
+
         super(RpcService, self).stop()
@@ -15,12 +15,15 @@
 
 # based on configured release version
 RPC_API_VERSION = "1.0"
+# the guest agent API is ahead of the other APIs
+GUEST_RPC_API_VERSION = "1.1"
 
 # API version history:
 #
 # 1.0 - Initial version.  (We started keeping track at icehouse-3)
-# 1.1 -
+# 1.1 - Add batch_call to the guest agent (guest agent API only).
 # 1.2 - ...
 VERSION_ALIASES = {
-    'icehouse': '1.0'
+    'icehouse': '1.0',
+    'mitaka': '1.1'
 }
@@ -66,36 +66,37 @@ class CassandraClusterTasks(task_models.ClusterTasks):
             try:
                 LOG.debug("Selected seed nodes: %s" % seeds)
 
-                for node in cluster_nodes:
+                def _configure(node):
                     LOG.debug("Configuring node: %s." % node['id'])
                     node['guest'].set_seeds(seeds)
                     node['guest'].set_auto_bootstrap(False)
 
+                utils.fan_out(_configure, cluster_nodes)
+
                 LOG.debug("Starting seed nodes.")
                 for node in cluster_nodes:
                     if node['ip'] in seeds:
-                        node['guest'].restart()
-                        node['guest'].set_auto_bootstrap(True)
+                        self._start(node)
 
+                # The nodes do not bootstrap, so they can join all at once.
                 LOG.debug("All seeds running, starting remaining nodes.")
-                for node in cluster_nodes:
-                    if node['ip'] not in seeds:
-                        node['guest'].restart()
-                        node['guest'].set_auto_bootstrap(True)
+                utils.fan_out(self._start, [node for node in cluster_nodes
+                                            if node['ip'] not in seeds])
 
                 # Create the in-database user via the first node. The remaining
                 # nodes will replicate in-database changes automatically.
                 # Only update the local authentication file on the other nodes.
                 LOG.debug("Securing the cluster.")
                 key = utils.generate_random_password()
-                admin_creds = None
-                for node in cluster_nodes:
-                    if admin_creds is None:
-                        admin_creds = node['guest'].cluster_secure(key)
-                    else:
+                admin_creds = cluster_nodes[0]['guest'].cluster_secure(key)
+
+                def _secure(node):
+                    if node is not cluster_nodes[0]:
                         node['guest'].store_admin_credentials(admin_creds)
                     node['guest'].cluster_complete()
 
+                utils.fan_out(_secure, cluster_nodes)
+
                 LOG.debug("Cluster configuration finished successfully.")
             except Exception:
                 LOG.exception(_("Error creating cluster."))
@@ -115,6 +116,11 @@ class CassandraClusterTasks(task_models.ClusterTasks):
 
         LOG.debug("End create_cluster for id: %s." % cluster_id)
 
+    @staticmethod
+    def _start(node):
+        node['guest'].restart()
+        node['guest'].set_auto_bootstrap(True)
+
     @classmethod
     def find_cluster_node_ids(cls, cluster_id):
         db_instances = DBInstance.find_all(cluster_id=cluster_id).all()
@@ -122,8 +128,10 @@ class CassandraClusterTasks(task_models.ClusterTasks):
 
     @classmethod
     def load_cluster_nodes(cls, context, node_ids):
-        return [cls.build_node_info(Instance.load(context, node_id))
-                for node_id in node_ids]
+        def _load_node(node_id):
+            return cls.build_node_info(Instance.load(context, node_id))
+
+        return utils.fan_out(_load_node, node_ids)
 
     @classmethod
     def build_node_info(cls, instance):
@@ -135,6 +143,14 @@ class CassandraClusterTasks(task_models.ClusterTasks):
                 'dc': guest.get_data_center(),
                 'rack': guest.get_rack()}
 
+    @classmethod
+    def _set_seeds(cls, nodes, seeds):
+        def _set_seeds(node):
+            LOG.debug("Configuring node: %s." % node['id'])
+            node['guest'].set_seeds(seeds)
+
+        utils.fan_out(_set_seeds, nodes)
+
     @classmethod
     def choose_seed_nodes(cls, node_info):
         """Select gossip seeds. The seeds are cluster nodes from which any
@@ -183,10 +199,7 @@ class CassandraClusterTasks(task_models.ClusterTasks):
             if not self._all_instances_ready(new_instance_ids, cluster_id):
                 return
 
-            new_instances = [Instance.load(context, instance_id)
-                             for instance_id in new_instance_ids]
-            added_nodes = [self.build_node_info(instance)
-                           for instance in new_instances]
+            added_nodes = self.load_cluster_nodes(context, new_instance_ids)
 
             LOG.debug("All nodes ready, proceeding with cluster setup.")
 
@@ -210,11 +223,16 @@ class CassandraClusterTasks(task_models.ClusterTasks):
                 # Since we are adding to an existing cluster, ensure that the
                 # new nodes have auto-bootstrapping enabled.
                 # Start the added nodes.
-                LOG.debug("Starting new nodes.")
-                for node in added_nodes:
+                def _configure(node):
                     node['guest'].set_auto_bootstrap(True)
                     node['guest'].set_seeds(current_seeds)
                     node['guest'].store_admin_credentials(admin_creds)
+
+                utils.fan_out(_configure, added_nodes)
+
+                # Bootstrapping nodes must join the ring one at a time.
+                LOG.debug("Starting new nodes.")
+                for node in added_nodes:
                     node['guest'].restart()
                     node['guest'].cluster_complete()
 
@@ -224,8 +242,7 @@ class CassandraClusterTasks(task_models.ClusterTasks):
 
                 # Configure each cluster node with the updated list of seeds.
                 LOG.debug("Updating all nodes with new seeds: %s" % seeds)
-                for node in cluster_nodes:
-                    node['guest'].set_seeds(seeds)
+                self._set_seeds(cluster_nodes, seeds)
 
                 # Run nodetool cleanup on each of the previously existing nodes
                 # to remove the keys that no longer belong to those nodes.
@@ -305,9 +322,7 @@ class CassandraClusterTasks(task_models.ClusterTasks):
                                        if node['id'] not in removal_ids]
                     seeds = self.choose_seed_nodes(remaining_nodes)
                     LOG.debug("Selected seed nodes: %s" % seeds)
-                    for node in remaining_nodes:
-                        LOG.debug("Configuring node: %s." % node['id'])
-                        node['guest'].set_seeds(seeds)
+                    self._set_seeds(remaining_nodes, seeds)
 
                 # Wait for the removed nodes to go SHUTDOWN.
                 LOG.debug("Waiting for all decommissioned nodes to shutdown.")
@@ -67,6 +67,28 @@ class GaleraCommonClusterTasks(task_models.ClusterTasks):
         )
         return config_rendered
 
+    @staticmethod
+    def _cluster_complete(guest):
+        guest.cluster_complete()
+
+    def _write_cluster_configuration(self, context, instances, cluster_ips,
+                                     cluster_context):
+        """Write the configuration of the cluster to all its instances at
+        once.
+        """
+        def _write_configuration(instance):
+            # render the conf.d/cluster.cnf configuration
+            cluster_configuration = self._render_cluster_config(
+                context,
+                instance,
+                ",".join(cluster_ips),
+                cluster_context['cluster_name'],
+                cluster_context['replication_user'])
+            self.get_guest(instance).write_cluster_configuration_overrides(
+                cluster_configuration)
+
+        utils.fan_out(_write_configuration, instances)
+
     def create_cluster(self, context, cluster_id):
         LOG.debug("Begin create_cluster for id: %s." % cluster_id)
 
@@ -107,9 +129,12 @@ class GaleraCommonClusterTasks(task_models.ClusterTasks):
                 # password in the my.cnf will be wrong after the joiner
                 # instances syncs with the donor instance.
                 admin_password = str(utils.generate_random_password())
-                for guest in instance_guests:
+
+                def _reset_admin_password(guest):
                     guest.reset_admin_password(admin_password)
 
+                utils.fan_out(_reset_admin_password, instance_guests)
+
                 bootstrap = True
                 for instance in instances:
                     guest = self.get_guest(instance)
@@ -129,8 +154,7 @@ class GaleraCommonClusterTasks(task_models.ClusterTasks):
                     bootstrap = False
 
                 LOG.debug("Finalizing cluster configuration.")
-                for guest in instance_guests:
-                    guest.cluster_complete()
+                utils.fan_out(self._cluster_complete, instance_guests)
             except Exception:
                 LOG.exception(_("Error creating cluster."))
                 self.update_statuses_on_failure(cluster_id)
@@ -196,11 +220,18 @@ class GaleraCommonClusterTasks(task_models.ClusterTasks):
                              for instance_id in new_instance_ids]
             new_cluster_ips = [self.get_ip(instance) for instance in
                                new_instances]
-            for instance in new_instances:
-                guest = self.get_guest(instance)
+            new_instance_guests = [self.get_guest(instance)
+                                   for instance in new_instances]
 
+            def _reset_admin_password(guest):
                 guest.reset_admin_password(cluster_context['admin_password'])
 
+            utils.fan_out(_reset_admin_password, new_instance_guests)
+
+            # The new members join the cluster one at a time.
+            for instance in new_instances:
+                guest = self.get_guest(instance)
+
                 # render the conf.d/cluster.cnf configuration
                 cluster_configuration = self._render_cluster_config(
                     context,
@@ -220,21 +251,11 @@ class GaleraCommonClusterTasks(task_models.ClusterTasks):
                                          new_instances)
 
             # apply the new config to all instances
-            for instance in existing_instances + new_instances:
-                guest = self.get_guest(instance)
-                # render the conf.d/cluster.cnf configuration
-                cluster_configuration = self._render_cluster_config(
-                    context,
-                    instance,
-                    ",".join(existing_cluster_ips + new_cluster_ips),
-                    cluster_context['cluster_name'],
-                    cluster_context['replication_user'])
-                guest.write_cluster_configuration_overrides(
-                    cluster_configuration)
+            self._write_cluster_configuration(
+                context, existing_instances + new_instances,
+                existing_cluster_ips + new_cluster_ips, cluster_context)
 
-            for instance in new_instances:
-                guest = self.get_guest(instance)
-                guest.cluster_complete()
+            utils.fan_out(self._cluster_complete, new_instance_guests)
 
         timeout = Timeout(CONF.cluster_usage_timeout)
         try:
@@ -295,17 +316,9 @@ class GaleraCommonClusterTasks(task_models.ClusterTasks):
             cluster_context = rnd_cluster_guest.get_cluster_context()
 
             # apply the new config to all leftover instances
-            for instance in leftover_instances:
-                guest = self.get_guest(instance)
-                # render the conf.d/cluster.cnf configuration
-                cluster_configuration = self._render_cluster_config(
-                    context,
-                    instance,
-                    ",".join(leftover_cluster_ips),
-                    cluster_context['cluster_name'],
-                    cluster_context['replication_user'])
-                guest.write_cluster_configuration_overrides(
-                    cluster_configuration)
+            self._write_cluster_configuration(
+                context, leftover_instances, leftover_cluster_ips,
+                cluster_context)
 
         timeout = Timeout(CONF.cluster_usage_timeout)
         try:
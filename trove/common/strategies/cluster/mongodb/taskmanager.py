@@ -110,8 +110,7 @@ class MongoDbClusterTasks(task_models.ClusterTasks):
                 return
 
             # call to start checking status
-            for instance in instances:
-                self.get_guest(instance).cluster_complete()
+            self._cluster_complete(instances)
 
         cluster_usage_timeout = CONF.cluster_usage_timeout
         timeout = Timeout(cluster_usage_timeout)
@@ -157,8 +156,7 @@ class MongoDbClusterTasks(task_models.ClusterTasks):
             if not self._create_shard(query_routers[0], members):
                 return
 
-            for member in members:
-                self.get_guest(member).cluster_complete()
+            self._cluster_complete(members)
 
         cluster_usage_timeout = CONF.cluster_usage_timeout
         timeout = Timeout(cluster_usage_timeout)
@@ -233,8 +231,7 @@ class MongoDbClusterTasks(task_models.ClusterTasks):
                 ):
                     return
                 instances.extend(query_routers)
-            for instance in instances:
-                self.get_guest(instance).cluster_complete()
+            self._cluster_complete(instances)
 
         cluster_usage_timeout = CONF.cluster_usage_timeout
         timeout = Timeout(cluster_usage_timeout)
@@ -293,16 +290,25 @@ class MongoDbClusterTasks(task_models.ClusterTasks):
         instance = Instance.load(context, self._get_running_query_router_id())
         return self.get_guest(instance).get_admin_password()
 
+    def _cluster_complete(self, instances):
+        def _cluster_complete(instance):
+            self.get_guest(instance).cluster_complete()
+
+        utils.fan_out(_cluster_complete, instances)
+
     def _init_replica_set(self, primary_member, other_members):
         """Initialize the replica set by calling the primary member guest's
         add_members.
         """
         LOG.debug('initializing replica set on %s' % primary_member.id)
-        other_members_ips = []
+
+        def _restart(member):
+            self.get_guest(member).restart()
+
         try:
-            for member in other_members:
-                other_members_ips.append(self.get_ip(member))
-                self.get_guest(member).restart()
+            other_members_ips = [self.get_ip(member)
+                                 for member in other_members]
+            utils.fan_out(_restart, other_members)
             self.get_guest(primary_member).prep_primary()
             self.get_guest(primary_member).add_members(other_members_ips)
         except Exception:
@@ -335,11 +341,15 @@ class MongoDbClusterTasks(task_models.ClusterTasks):
 
     def _get_running_query_router_id(self):
         """Get a query router in this cluster that is in the RUNNING state."""
-        for instance_id in [db_instance.id for db_instance in self.db_instances
-                            if db_instance.type == 'query_router']:
-            status = models.InstanceServiceStatus.find_by(
-                instance_id=instance_id).get_status()
-            if status == ServiceStatuses.RUNNING:
+        query_router_ids = [db_instance.id for db_instance
+                            in self.db_instances
+                            if db_instance.type == 'query_router']
+        statuses = models.InstanceServiceStatus.find_all_by_instance_ids(
+            query_router_ids)
+        for instance_id in query_router_ids:
+            if (instance_id in statuses and
+                    statuses[instance_id].get_status() ==
+                    ServiceStatuses.RUNNING):
                 return instance_id
         LOG.exception(_("no query routers ready to accept requests"))
         self.update_statuses_on_failure(self.id)
@@ -355,22 +365,31 @@ class MongoDbClusterTasks(task_models.ClusterTasks):
         LOG.debug('adding new query router(s) %s with config server '
                   'ips %s' % ([i.id for i in query_routers],
                               config_server_ips))
-        for query_router in query_routers:
-            try:
+
+        def _add_config_servers(query_router):
+            LOG.debug("calling add_config_servers on query router %s"
+                      % query_router.id)
+            guest = self.get_guest(query_router)
+            guest.add_config_servers(config_server_ips)
+            guest.store_admin_password(admin_password)
+
+        try:
+            if not admin_password:
+                # The admin user is created through the first query router,
+                # the others only store its password.
                 LOG.debug("calling add_config_servers on query router %s"
-                          % query_router.id)
-                guest = self.get_guest(query_router)
+                          % query_routers[0].id)
+                guest = self.get_guest(query_routers[0])
                 guest.add_config_servers(config_server_ips)
-                if not admin_password:
-                    LOG.debug("creating cluster admin user")
-                    admin_password = utils.generate_random_password()
-                    guest.create_admin_user(admin_password)
-                else:
-                    guest.store_admin_password(admin_password)
-            except Exception:
-                LOG.exception(_("error adding config servers"))
-                self.update_statuses_on_failure(self.id)
-                return False
+                LOG.debug("creating cluster admin user")
+                admin_password = utils.generate_random_password()
+                guest.create_admin_user(admin_password)
+                query_routers = query_routers[1:]
+            utils.fan_out(_add_config_servers, query_routers)
+        except Exception:
+            LOG.exception(_("error adding config servers"))
+            self.update_statuses_on_failure(self.id)
+            return False
         return True
 
 
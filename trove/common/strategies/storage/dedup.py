@@ -0,0 +1,370 @@
+# Copyright 2016 Tesora Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+import hashlib
+import hmac
+import json
+import math
+import zlib
+
+from eventlet import greenthread
+from oslo_log import log as logging
+from oslo_utils import timeutils
+from swiftclient.client import ClientException
+
+from trove.common import cfg
+from trove.common import crypto_utils
+from trove.common.i18n import _
+from trove.common.strategies.storage import swift
+
+LOG = logging.getLogger(__name__)
+CONF = cfg.CONF
+
+CHUNK_SIZE = CONF.backup_chunk_size
+AVERAGE_CHUNK_SIZE = CONF.backup_dedup_chunk_size
+CHUNK_PREFIX = 'chunks/'
+MANIFEST_CONTENT_TYPE = 'application/x-trove-chunk-manifest'
+MANIFEST_VERSION = 1
+TOMBSTONE_PREFIX = 'tombstones/'
+
+# The byte values in a random order, without 0x00 and 0xff which fill the
+# unused parts of database pages.
+BYTE_RANK = sorted(range(1, 255),
+                   key=lambda value: hashlib.md5(chr(value)).hexdigest())
+
+
+class ContentDefinedChunker(object):
+    """Split a stream into chunks whose boundaries depend on the content.
+
+    A boundary is placed after a sequence of bytes from a few small sets of
+    byte values, so inserting or removing data only changes the chunks
+    around the change, and the chunks of unchanged data are the same from
+    one backup to the next. The sets are sized so that such a sequence
+    starts every three quarters of the average size in random data, and
+    the bytes are mapped to the index of their set with str.translate, so
+    that the sequence is found by str.find, both of which run in C.
+    Chunks are between a quarter and four times the average size.
+    """
+
+    def __init__(self, stream, average_size=AVERAGE_CHUNK_SIZE,
+                 read_size=CHUNK_SIZE):
+        self.stream = stream
+        self.read_size = read_size
+        self.min_size = average_size // 4
+        self.max_size = average_size * 4
+        self.scan_size = average_size
+        self.table, self.needle = self._boundary_sequence(
+            average_size - self.min_size)
+
+    @staticmethod
+    def _boundary_sequence(distance):
+        """Return the translation table and the sequence of set indexes
+        that a random stream matches about every distance bytes.
+        """
+        probability = 1.0 / distance
+        best = None
+        for length in range(1, 9):
+            size = int(round(256 * probability ** (1.0 / length)))
+            if not 1 <= size <= len(BYTE_RANK) // length:
+                continue
+            error = abs(length * math.log(size / 256.0) -
+                        math.log(probability))
+            if best is None or error < best[0]:
+                best = (error, length, size)
+        error, length, size = best
+
+        table = ['.'] * 256
+        for index in range(length):
+            for value in BYTE_RANK[index * size:(index + 1) * size]:
+                table[value] = chr(ord('A') + index)
+        needle = ''.join(chr(ord('A') + index) for index in range(length))
+        return ''.join(table), needle
+
+    def _find_boundary(self, data):
+        end = min(len(data), self.max_size)
+        if end <= self.min_size:
+            return end
+        # Boundaries are never closer than min_size, so skip scanning
+        # there, and translate no more than scan_size bytes at a time.
+        overlap = len(self.needle) - 1
+        start = self.min_size
+        while start < end:
+            window = data[start:min(end, start + self.scan_size + overlap)]
+            index = window.translate(self.table).find(self.needle)
+            if index >= 0:
+                return start + index + len(self.needle)
+            start += self.scan_size
+        return end
+
+    def __iter__(self):
+        data = bytearray()
+        end_of_stream = False
+        while data or not end_of_stream:
+            while not end_of_stream and len(data) < self.max_size:
+                chunk = self.stream.read(self.read_size)
+                if not chunk:
+                    end_of_stream = True
+                data.extend(chunk)
+            if not data:
+                break
+            boundary = self._find_boundary(data)
+            yield str(data[:boundary])
+            del data[:boundary]
+            # Let the other green threads run between chunks.
+            greenthread.sleep(0)
+
+
+def chunk_id(chunk, key=None):
+    """Address of a chunk.
+
+    A keyed hash, so that chunk names do not reveal the hash of their
+    content.
+    """
+    key = key or CONF.backup_aes_cbc_key
+    return hmac.new(key, chunk, hashlib.sha256).hexdigest()
+
+
+def encode_chunk(chunk, key=None):
+    return crypto_utils.encrypt_data(zlib.compress(chunk),
+                                     key or CONF.backup_aes_cbc_key)
+
+
+def decode_chunk(data, key=None):
+    return zlib.decompress(crypto_utils.decrypt_data(
+        data, key or CONF.backup_aes_cbc_key))
+
+
+def is_manifest(headers):
+    return headers.get('content-type') == MANIFEST_CONTENT_TYPE
+
+
+def _delete_if_exists(client, container, name):
+    """Delete an object and return whether it existed."""
+    try:
+        client.delete_object(container, name)
+    except ClientException as e:
+        if e.http_status == 404:
+            return False
+        raise
+    return True
+
+
+def sweep_chunks(client, container, grace=None):
+    """Delete the chunks of a container that no manifest refers to.
+
+    A chunk is not deleted as soon as it is unreferenced, as a running
+    backup may have found it in the container and not have saved its
+    manifest yet. It is first marked with a tombstone, an empty
+    tombstones/<id> object, and deleted by a later sweep once it has been
+    marked for grace seconds and is still unreferenced. Backups and sweeps
+    delete the tombstone of a chunk that is referenced again, and a sweep
+    only deletes a chunk after deleting its tombstone, so a chunk whose
+    tombstone a backup has just cleared is kept.
+    """
+    grace = CONF.backup_chunk_sweep_grace if grace is None else grace
+    headers, objects = client.get_container(container, full_listing=True)
+    referenced = set()
+    chunk_keys = []
+    tombstones = {}
+    for obj in objects:
+        name = obj.get('name')
+        if name.startswith(CHUNK_PREFIX):
+            chunk_keys.append(name[len(CHUNK_PREFIX):])
+        elif name.startswith(TOMBSTONE_PREFIX):
+            tombstones[name[len(TOMBSTONE_PREFIX):]] = obj
+        elif obj.get('content_type') == MANIFEST_CONTENT_TYPE:
+            headers, manifest = client.get_object(container, name)
+            referenced.update(chunk[0]
+                              for chunk in json.loads(manifest)['chunks'])
+
+    now = timeutils.utcnow()
+    marked = 0
+    cleared = 0
+    deleted = 0
+    for key in chunk_keys:
+        name = CHUNK_PREFIX + key
+        tombstone = tombstones.pop(key, None)
+        if key in referenced:
+            if tombstone:
+                LOG.debug("Clearing referenced chunk: %(cont)s/%(name)s" %
+                          {'cont': container, 'name': name})
+                _delete_if_exists(client, container, TOMBSTONE_PREFIX + key)
+                cleared += 1
+        elif not tombstone:
+            LOG.debug("Marking unreferenced chunk: %(cont)s/%(name)s" %
+                      {'cont': container, 'name': name})
+            client.put_object(container, TOMBSTONE_PREFIX + key, '')
+            marked += 1
+        elif timeutils.delta_seconds(
+                timeutils.normalize_time(
+                    timeutils.parse_isotime(tombstone['last_modified'])),
+                now) >= grace:
+            if _delete_if_exists(client, container, TOMBSTONE_PREFIX + key):
+                LOG.debug("Deleting unreferenced chunk: %(cont)s/%(name)s" %
+                          {'cont': container, 'name': name})
+                _delete_if_exists(client, container, name)
+                deleted += 1
+    # The tombstones of chunks that no longer exist.
+    for key in tombstones:
+        _delete_if_exists(client, container, TOMBSTONE_PREFIX + key)
+    LOG.debug("Marked %(marked)d, cleared %(cleared)d and deleted "
+              "%(deleted)d of %(count)d chunks in %(cont)s." %
+              {'marked': marked, 'cleared': cleared, 'deleted': deleted,
+               'count': len(chunk_keys), 'cont': container})
+    return deleted
+
+
+class SwiftDedupStorage(swift.SwiftStorage):
+    """Storage Strategy for Swift that stores every chunk of data once.
+
+    The backup stream is split into content-defined chunks. Each chunk is
+    compressed and encrypted on its own and stored as chunks/<id> in the
+    backup container, where <id> is a keyed hash of its content, unless a
+    chunk with that id was stored by a previous backup. The backup itself
+    is a manifest object listing its chunks, which load() reassembles into
+    the original stream.
+
+    Compression or encryption of the backup stream would make every backup
+    unique, so backup_use_gzip_compression and
+    backup_use_openssl_encryption must be disabled with this strategy, and
+    the backups of a compressed or encrypted stream fail; the chunks are
+    still compressed, and encrypted with backup_aes_cbc_key.
+    """
+    __strategy_name__ = 'swiftdedup'
+
+    def _list_keys(self, container, prefix):
+        headers, objects = self.connection.get_container(
+            container, prefix=prefix, full_listing=True)
+        return set(obj['name'][len(prefix):] for obj in objects)
+
+    def save(self, filename, stream):
+        """Persist the chunks of the stream, and their manifest, to swift.
+
+        The manifest is saved to the location <BACKUP_CONTAINER>/<filename>.
+        """
+        container = self.get_container_name()
+        url = self.connection.url
+        location = "%s/%s/%s" % (url, container, filename)
+
+        if filename.endswith('.gz') or filename.endswith('.enc'):
+            # Every chunk of such a stream would be unique.
+            LOG.error(_("Backup %s is compressed or encrypted and cannot be "
+                        "deduplicated. Disable backup_use_gzip_compression "
+                        "and backup_use_openssl_encryption to use the "
+                        "swiftdedup storage strategy."), filename)
+            return (False, "Compressed or encrypted backups cannot be "
+                    "deduplicated!", None, location)
+
+        self.connection.put_container(container)
+
+        # The chunks stored by previous backups, listed once rather than
+        # checked one by one. A backup must take less time than the sweep
+        # grace period, as a chunk listed here may be marked afterwards.
+        stored = self._list_keys(container, CHUNK_PREFIX)
+        tombstoned = self._list_keys(container, TOMBSTONE_PREFIX) & stored
+        chunks = []
+        stream_checksum = hashlib.md5()
+        size = 0
+        uploaded = 0
+        for chunk in ContentDefinedChunker(stream, AVERAGE_CHUNK_SIZE):
+            key = chunk_id(chunk)
+            name = CHUNK_PREFIX + key
+            if key in tombstoned:
+                # Clearing the tombstone keeps the next sweeps from
+                # deleting the chunk, unless one already has.
+                tombstoned.discard(key)
+                if not _delete_if_exists(self.connection, container,
+                                         TOMBSTONE_PREFIX + key):
+                    stored.discard(key)
+            if key not in stored:
+                data = encode_chunk(chunk)
+                etag = self.connection.put_object(container, name, data)
+                checksum = hashlib.md5(data).hexdigest()
+                if etag != checksum:
+                    LOG.error(_("Error saving data chunk to swift. "
+                              "ETAG: %(tag)s Chunk MD5: %(checksum)s."),
+                              {'tag': etag, 'checksum': checksum})
+                    return False, "Error saving data to Swift!", None, location
+                uploaded += 1
+            stored.add(key)
+            chunks.append([key, len(chunk)])
+            stream_checksum.update(chunk)
+            size += len(chunk)
+
+        # The manifest is created after all the chunks have been uploaded,
+        # so that a backup is never restored from missing chunks.
+        manifest = json.dumps({'version': MANIFEST_VERSION,
+                               'chunks': chunks,
+                               'size': size,
+                               'md5': stream_checksum.hexdigest()})
+        etag = self.connection.put_object(
+            container, filename, manifest,
+            content_type=MANIFEST_CONTENT_TYPE)
+        checksum = hashlib.md5(manifest).hexdigest()
+        if etag != checksum:
+            LOG.error(_("Error saving chunk manifest to swift. "
+                      "ETAG: %(tag)s Manifest MD5: %(checksum)s."),
+                      {'tag': etag, 'checksum': checksum})
+            return False, "Error saving data to Swift!", None, location
+
+        LOG.info(_("Saved backup %(filename)s: uploaded %(uploaded)d of "
+                   "%(count)d chunks."),
+                 {'filename': filename, 'uploaded': uploaded,
+                  'count': len(chunks)})
+        return (True, "Successfully saved data to Swift!",
+                checksum, location)
+
+    def _load_chunks(self, container, manifest):
+        stream_checksum = hashlib.md5()
+        for key, length in manifest['chunks']:
+            headers, data = self.connection.get_object(
+                container, CHUNK_PREFIX + key)
+            chunk = decode_chunk(data)
+            if len(chunk) != length or chunk_id(chunk) != key:
+                msg = _("Chunk %s of the backup is corrupted.") % key
+                LOG.error(msg)
+                raise swift.SwiftDownloadIntegrityError(msg)
+            stream_checksum.update(chunk)
+            yield chunk
+
+        if stream_checksum.hexdigest() != manifest['md5']:
+            msg = _("Checksum of the restored stream does not match the "
+                    "chunk manifest.")
+            LOG.error(msg)
+            raise swift.SwiftDownloadIntegrityError(msg)
+
+    def load(self, location, backup_checksum):
+        """Reassemble the backup stream from its chunks."""
+        storage_url, container, filename = self._explodeLocation(location)
+
+        headers, manifest = self.connection.get_object(container, filename)
+
+        if CONF.verify_swift_checksum_on_restore:
+            self._verify_checksum(headers.get('etag', ''), backup_checksum)
+
+        return self._load_chunks(container, json.loads(manifest))
+
+    def save_metadata(self, location, metadata={}):
+        """Save metadata to the manifest object."""
+
+        storage_url, container, filename = self._explodeLocation(location)
+
+        headers = {'Content-Type': MANIFEST_CONTENT_TYPE}
+        for key, value in metadata.iteritems():
+            headers[self._set_attr(key)] = value
+
+        LOG.info(_("Writing metadata: %s"), str(headers))
+        self.connection.post_object(container, filename, headers=headers)
@@ -14,9 +14,14 @@
 #    under the License.
 #
 
+import collections
 import hashlib
+import sys
+import tempfile
 
+from eventlet import greenpool
 from oslo_log import log as logging
+import six
 
 from trove.common import cfg
 from trove.common.i18n import _
@@ -29,6 +34,10 @@ CONF = cfg.CONF
 CHUNK_SIZE = CONF.backup_chunk_size
 MAX_FILE_SIZE = CONF.backup_segment_max_size
 BACKUP_CONTAINER = CONF.backup_swift_container
+UPLOAD_WORKERS = CONF.backup_upload_workers
+UPLOAD_BUFFER_SIZE = CONF.backup_upload_buffer_size
+DOWNLOAD_WORKERS = CONF.backup_download_workers
+DOWNLOAD_BUFFER_SIZE = CONF.backup_download_buffer_size
 
 
 class DownloadError(Exception):
@@ -121,21 +130,14 @@ class SwiftStorage(base.Storage):
         location = "%s/%s/%s" % (url, self.get_container_name(), filename)
 
         # Read from the stream and write to the container in swift
-        while not stream_reader.end_of_file:
-            etag = self.connection.put_object(self.get_container_name(),
-                                              stream_reader.segment,
-                                              stream_reader)
-
-            segment_checksum = stream_reader.segment_checksum.hexdigest()
-
-            # Check each segment MD5 hash against swift etag
-            # Raise an error and mark backup as failed
-            if etag != segment_checksum:
-                LOG.error(_("Error saving data segment to swift. "
-                          "ETAG: %(tag)s Segment MD5: %(checksum)s."),
-                          {'tag': etag, 'checksum': segment_checksum})
-                return False, "Error saving data to Swift!", None, location
+        if UPLOAD_WORKERS > 1:
+            checksums = self._save_segments_parallel(stream_reader)
+        else:
+            checksums = self._save_segments(stream_reader)
+        if checksums is None:
+            return False, "Error saving data to Swift!", None, location
 
+        for segment_checksum in checksums:
             swift_checksum.update(segment_checksum)
 
         # Create the manifest file
@@ -170,6 +172,97 @@ class SwiftStorage(base.Storage):
         return (True, "Successfully saved data to Swift!",
                 final_swift_checksum, location)
 
+    def _check_segment_etag(self, etag, segment_checksum):
+        # Check each segment MD5 hash against swift etag
+        if etag != segment_checksum:
+            LOG.error(_("Error saving data segment to swift. "
+                      "ETAG: %(tag)s Segment MD5: %(checksum)s."),
+                      {'tag': etag, 'checksum': segment_checksum})
+            return False
+        return True
+
+    def _save_segments(self, stream_reader):
+        """Upload the segments one after another through the connection.
+
+        Returns the list of segment checksums, or None if a segment was not
+        saved correctly.
+        """
+        checksums = []
+        while not stream_reader.end_of_file:
+            etag = self.connection.put_object(self.get_container_name(),
+                                              stream_reader.segment,
+                                              stream_reader)
+
+            segment_checksum = stream_reader.segment_checksum.hexdigest()
+            if not self._check_segment_etag(etag, segment_checksum):
+                return None
+            checksums.append(segment_checksum)
+        return checksums
+
+    def _read_segment(self, stream_reader):
+        """Buffer the next segment of the stream.
+
+        Returns the segment name, the buffer positioned at its start and
+        the segment checksum.
+        """
+        segment = stream_reader.segment
+        buf = tempfile.SpooledTemporaryFile(max_size=UPLOAD_BUFFER_SIZE)
+        chunk = stream_reader.read()
+        while chunk:
+            buf.write(chunk)
+            chunk = stream_reader.read()
+        buf.seek(0)
+        return segment, buf, stream_reader.segment_checksum.hexdigest()
+
+    def _save_segments_parallel(self, stream_reader):
+        """Upload up to UPLOAD_WORKERS segments concurrently.
+
+        Each upload uses a connection of its own, and the next segment is
+        read ahead from the stream while the previous ones are uploaded, so
+        the backup process does not stall on a single put_object. Returns
+        the list of segment checksums in segment order, or None if a
+        segment was not saved correctly.
+        """
+        connections = [self.connection]
+        failed = []
+        errors = []
+
+        def _upload(segment, buf, segment_checksum):
+            if connections:
+                connection = connections.pop()
+            else:
+                connection = remote.create_swift_client(self.context)
+            try:
+                etag = connection.put_object(self.get_container_name(),
+                                             segment, buf)
+            except Exception:
+                # Raised again once all the uploads are done.
+                failed.append(segment)
+                errors.append(sys.exc_info())
+                return None
+            finally:
+                buf.close()
+                connections.append(connection)
+            if not self._check_segment_etag(etag, segment_checksum):
+                failed.append(segment)
+                return None
+            return segment_checksum
+
+        # The pool blocks spawn until a worker is free, which bounds the
+        # number of buffered segments.
+        pool = greenpool.GreenPool(UPLOAD_WORKERS)
+        uploads = []
+        while not stream_reader.end_of_file and not failed:
+            uploads.append(pool.spawn(_upload,
+                                      *self._read_segment(stream_reader)))
+        pool.waitall()
+
+        if errors:
+            six.reraise(*errors[0])
+        if failed:
+            return None
+        return [upload.wait() for upload in uploads]
+
     def _explodeLocation(self, location):
         storage_url = "/".join(location.split('/')[:-2])
         container = location.split('/')[-2]
@@ -190,6 +283,15 @@ class SwiftStorage(base.Storage):
         """Restore a backup from the input stream to the restore_location."""
         storage_url, container, filename = self._explodeLocation(location)
 
+        if DOWNLOAD_WORKERS > 1:
+            headers = self.connection.head_object(container, filename)
+            manifest = headers.get('x-object-manifest')
+            if manifest:
+                if CONF.verify_swift_checksum_on_restore:
+                    self._verify_checksum(headers.get('etag', ''),
+                                          backup_checksum)
+                return self._load_segments_parallel(manifest)
+
         headers, info = self.connection.get_object(container, filename,
                                                    resp_chunk_size=CHUNK_SIZE)
 
@@ -198,6 +300,79 @@ class SwiftStorage(base.Storage):
 
         return info
 
+    def _fetch_segment(self, connections, container, segment):
+        """Download a segment into a buffer and verify it against its etag.
+
+        Returns the buffer positioned at its start.
+        """
+        if connections:
+            connection = connections.pop()
+        else:
+            connection = remote.create_swift_client(self.context)
+        buf = tempfile.SpooledTemporaryFile(max_size=DOWNLOAD_BUFFER_SIZE)
+        try:
+            headers, body = connection.get_object(
+                container, segment, resp_chunk_size=CHUNK_SIZE)
+            checksum = hashlib.md5()
+            for chunk in body:
+                checksum.update(chunk)
+                buf.write(chunk)
+            self._verify_checksum(headers.get('etag', ''),
+                                  checksum.hexdigest())
+        except Exception:
+            buf.close()
+            raise
+        finally:
+            connections.append(connection)
+        buf.seek(0)
+        return buf
+
+    def _load_segments_parallel(self, manifest):
+        """Stream the segments of a manifest, in order, while downloading
+        up to DOWNLOAD_WORKERS of the following ones concurrently.
+        """
+        container, prefix = manifest.split('/', 1)
+        headers, listing = self.connection.get_container(
+            container, prefix=prefix, full_listing=True)
+        # A manifest is the concatenation of its segments in name order.
+        segments = iter(sorted(item['name'] for item in listing))
+
+        connections = [self.connection]
+        pool = greenpool.GreenPool(DOWNLOAD_WORKERS)
+        pending = collections.deque()
+
+        def _fetch(segment):
+            try:
+                return self._fetch_segment(connections, container,
+                                           segment), None
+            except Exception:
+                return None, sys.exc_info()
+
+        def _spawn_next():
+            for segment in segments:
+                pending.append(pool.spawn(_fetch, segment))
+                break
+
+        for x in range(DOWNLOAD_WORKERS):
+            _spawn_next()
+        try:
+            while pending:
+                buf, error = pending.popleft().wait()
+                if error:
+                    six.reraise(*error)
+                # Keep the read-ahead full while this segment is streamed.
+                _spawn_next()
+                try:
+                    chunk = buf.read(CHUNK_SIZE)
+                    while chunk:
+                        yield chunk
+                        chunk = buf.read(CHUNK_SIZE)
+                finally:
+                    buf.close()
+        finally:
+            for fetch in pending:
+                fetch.kill()
+
     def _get_attr(self, original):
         """Get a friendly name from an object header key."""
         key = original.replace('-', '_')
@@ -21,10 +21,12 @@ import os
 import random
 import shutil
 import string
+import sys
 import time
 import types
 import uuid
 
+from eventlet import greenpool
 from eventlet.timeout import Timeout
 import jinja2
 from oslo_concurrency import processutils
@@ -218,6 +220,63 @@ def poll_until(retriever, condition=lambda value: value,
                               sleep_time=sleep_time, time_out=time_out).wait()
 
 
+def fan_out(func, items, timeout=None):
+    """Call func on each of the items concurrently, on green threads.
+
+    At most CONF.fan_out_workers calls run at a time, and a call is given
+    up after timeout seconds, if set. A call that fails does not stop the
+    others.
+
+    Returns the results of the calls, in the order of the items. If any
+    call failed, FanOutError is raised once all calls have returned; its
+    failures are the (item, exception) pairs of the failed calls, its
+    exc_infos the matching sys.exc_info() tuples to re-raise them with
+    their traceback, and its results are those of all calls, None for the
+    failed ones.
+    """
+    items = list(items)
+    pool = greenpool.GreenPool(CONF.fan_out_workers)
+
+    def _call(item):
+        call_timeout = Timeout(timeout)
+        try:
+            return func(item), None
+        except Timeout as t:
+            if t is not call_timeout:
+                raise
+            LOG.error(_("Timed out after %(timeout)s seconds calling "
+                        "%(func)s on %(item)s.") %
+                      {'timeout': timeout, 'func': func.__name__,
+                       'item': getattr(item, 'id', item)})
+            return None, sys.exc_info()
+        except Exception:
+            LOG.exception(_("Error calling %(func)s on %(item)s.") %
+                          {'func': func.__name__,
+                           'item': getattr(item, 'id', item)})
+            return None, sys.exc_info()
+        finally:
+            call_timeout.cancel()
+
+    results = []
+    failures = []
+    exc_infos = []
+    for item, (result, exc_info) in zip(items, pool.imap(_call, items)):
+        results.append(result)
+        if exc_info is not None:
+            failures.append((item, exc_info[1]))
+            exc_infos.append(exc_info)
+    if failures:
+        error = exception.FanOutError(
+            failed=len(failures), count=len(items),
+            errors='; '.join(str(error) or error.__class__.__name__
+                             for item, error in failures))
+        error.failures = failures
+        error.exc_infos = exc_infos
+        error.results = results
+        raise error
+    return results
+
+
 # Copied from nova.api.openstack.common in the old code.
 def get_id_from_href(href):
     """Return the id or uuid portion of a url.
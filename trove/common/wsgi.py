@@ -37,6 +37,7 @@ from trove.common import exception
 from trove.common.i18n import _
 from trove.common import pastedeploy
 from trove.common import utils
+from trove.db import get_db_api
 
 CONTEXT_KEY = 'trove.context'
 Router = base_wsgi.Router
@@ -53,6 +54,9 @@ eventlet.patcher.monkey_patch(all=False, socket=True)
 
 LOG = logging.getLogger('trove.common.wsgi')
 
+# id(schema) -> (schema, validator) of the request schemas
+_VALIDATORS = {}
+
 
 def versioned_urlmap(*args, **kwargs):
     urlmap = paste.urlmap.urlmap_factory(*args, **kwargs)
@@ -395,19 +399,60 @@ class Controller(object):
         error_msg = "; ".join(messages)
         return "Validation error: %s" % error_msg
 
+    @staticmethod
+    def get_validator(schema):
+        """Return the validator of a schema, which is built only once as
+        the schemas are static.
+        """
+        # Keyed by id as the schemas are not hashable; the schema is kept
+        # in the entry so that its id is not reused.
+        entry = _VALIDATORS.get(id(schema))
+        if entry is None or entry[0] is not schema:
+            entry = (schema, jsonschema.Draft4Validator(schema))
+            _VALIDATORS[id(schema)] = entry
+        return entry[1]
+
+    @classmethod
+    def check_schemas(cls):
+        """Check the schemas of the controller against the meta-schema and
+        build their validators when the controller is set up, rather than
+        on its first requests.
+        """
+        def check(schemas):
+            for schema in schemas.values():
+                if not isinstance(schema, dict):
+                    continue
+                if 'type' in schema or 'properties' in schema:
+                    try:
+                        jsonschema.Draft4Validator.check_schema(schema)
+                    except jsonschema.SchemaError as e:
+                        # Such as the draft 3 style "required": True, which
+                        # the validator ignores.
+                        LOG.debug("Schema of %(controller)s does not match "
+                                  "the draft 4 meta-schema: %(error)s" %
+                                  {'controller': cls.__name__,
+                                   'error': e.message})
+                    cls.get_validator(schema)
+                else:
+                    # the schemas of the actions, by action type
+                    check(schema)
+
+        check(cls.schemas)
+
     def validate_request(self, action, action_args):
         body = action_args.get('body', {})
         schema = self.get_schema(action, body)
         if schema:
-            validator = jsonschema.Draft4Validator(schema)
-            if not validator.is_valid(body):
-                errors = sorted(validator.iter_errors(body),
-                                key=lambda e: e.path)
+            validator = self.get_validator(schema)
+            errors = sorted(validator.iter_errors(body),
+                            key=lambda e: e.path)
+            if errors:
                 error_msg = self.format_validation_msg(errors)
                 LOG.info(error_msg)
                 raise exception.BadRequest(message=error_msg)
 
     def create_resource(self):
+        self.check_schemas()
         return Resource(
             self,
             RequestDeserializer(),
@@ -549,6 +594,9 @@ class ContextMiddleware(base_wsgi.Middleware):
                                           marker=limits.get('marker'),
                                           service_catalog=service_catalog)
         request.environ[CONTEXT_KEY] = context
+        if CONF.db_read_replica_routing:
+            get_db_api().start_request(
+                tenant_id, read_only=request.method in ('GET', 'HEAD'))
 
     @classmethod
     def factory(cls, global_config, **local_config):
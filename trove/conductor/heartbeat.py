@@ -0,0 +1,135 @@
+# Copyright 2016 Tesora Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from datetime import timedelta
+import threading
+
+from oslo_log import log as logging
+
+from trove.common import cfg
+from trove.common.i18n import _
+from trove.common.instance import ServiceStatus
+from trove.common import utils
+from trove.conductor.models import LastSeen
+from trove.db import get_db_api
+from trove.instance import models as inst_models
+
+LOG = logging.getLogger(__name__)
+CONF = cfg.CONF
+
+
+class HeartbeatCoalescer(object):
+    """Keeps the newest heartbeat of every instance in memory and writes
+    them to the database in batched transactions.
+
+    A flush loads the service statuses and last seen timestamps of all the
+    pending instances with bulk queries and saves everything that changed
+    in a single transaction. A heartbeat that does not change the status
+    only refreshes updated_at once it gets close to agent_heartbeat_expiry,
+    so liveness checks keep working without a write per heartbeat.
+
+    on_status_change, if given, is called with the instance id and the new
+    status of every instance whose status changed, once it is written.
+    """
+
+    METHOD_NAME = 'heartbeat'
+
+    def __init__(self, on_status_change=None):
+        self._on_status_change = on_status_change
+        self._lock = threading.Lock()
+        # instance_id -> (sent, ServiceStatus or None)
+        self._pending = {}
+
+    def add(self, instance_id, payload, sent=None):
+        """Record a heartbeat. Returns False if it was discarded because a
+        newer heartbeat of the same instance is already pending.
+        """
+        status = None
+        if payload.get('service_status') is not None:
+            status = ServiceStatus.from_description(payload['service_status'])
+
+        with self._lock:
+            pending = self._pending.get(instance_id)
+            if pending is not None:
+                pending_sent, pending_status = pending
+                if (sent is not None and pending_sent is not None
+                        and pending_sent >= sent):
+                    LOG.debug("[Instance %s] Heartbeat is older than the "
+                              "pending one. Discarding." % instance_id)
+                    return False
+                if status is None:
+                    status = pending_status
+            self._pending[instance_id] = (sent, status)
+        return True
+
+    def flush(self):
+        """Write the pending heartbeats to the database."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        try:
+            self._write(pending)
+        except Exception:
+            LOG.exception(_("Failed to flush %d heartbeats.") % len(pending))
+
+    def _write(self, pending):
+        statuses = inst_models.InstanceServiceStatus.find_all_by_instance_ids(
+            pending.keys())
+        last_seen = LastSeen.load_all(pending.keys(), self.METHOD_NAME)
+        now = utils.utcnow()
+        refresh_before = now - timedelta(
+            seconds=CONF.agent_heartbeat_expiry / 2)
+
+        records = []
+        changed_statuses = []
+        for instance_id, (sent, status) in pending.items():
+            service_status = statuses.get(instance_id)
+            if service_status is None:
+                LOG.error(_("[Instance %s] Service status not found. "
+                            "Discarding heartbeat.") % instance_id)
+                continue
+
+            if sent is not None:
+                seen = last_seen.get(instance_id)
+                if seen is None:
+                    seen = LastSeen(instance_id, self.METHOD_NAME, sent)
+                elif float(seen.sent) < sent:
+                    seen.sent = sent
+                else:
+                    LOG.info(_("[Instance %s] Rec'd message is older than "
+                               "last seen. Discarding.") % instance_id)
+                    continue
+                records.append(seen)
+
+            changed = (status is not None and
+                       status.code != service_status.status_id)
+            if changed:
+                service_status.set_status(status)
+                changed_statuses.append((instance_id, status))
+            if (changed or service_status.updated_at is None
+                    or service_status.updated_at < refresh_before):
+                service_status['updated_at'] = now
+                records.append(service_status)
+
+        if records:
+            get_db_api().save_all(records)
+        LOG.debug("Flushed %(count)d heartbeats with %(records)d writes." %
+                  {'count': len(pending), 'records': len(records)})
+
+        if self._on_status_change is not None:
+            for instance_id, status in changed_statuses:
+                self._on_status_change(instance_id, status)
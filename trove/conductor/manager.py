@@ -14,18 +14,23 @@
 
 from oslo_log import log as logging
 import oslo_messaging as messaging
+from oslo_service import loopingcall
 from oslo_service import periodic_task
 
 from trove.backup import models as bkup_models
 from trove.common import cfg
+from trove.common.context import TroveContext
 from trove.common import exception as trove_exception
 from trove.common.i18n import _
 from trove.common.instance import ServiceStatus
 from trove.common.rpc import version as rpc_version
 from trove.common.serializable_notification import SerializableNotification
+from trove.conductor.heartbeat import HeartbeatCoalescer
 from trove.conductor.models import LastSeen
+from trove.conductor.models import LastSeenCache
 from trove.extensions.mysql import models as mysql_models
 from trove.instance import models as inst_models
+from trove.taskmanager import api as task_api
 
 LOG = logging.getLogger(__name__)
 CONF = cfg.CONF
@@ -37,6 +42,49 @@ class Manager(periodic_task.PeriodicTasks):
 
     def __init__(self):
         super(Manager, self).__init__(CONF)
+        self._heartbeats = None
+        self._status_notifier = None
+        if CONF.conductor_status_notifications:
+            self._status_notifier = task_api.API(TroveContext())
+        if CONF.conductor_heartbeat_flush_interval > 0:
+            self._heartbeats = HeartbeatCoalescer(
+                on_status_change=self._status_changed)
+        self._heartbeat_flusher = None
+        self._last_seen_cache = None
+        if CONF.conductor_lastseen_cache_size > 0:
+            self._last_seen_cache = LastSeenCache(
+                CONF.conductor_lastseen_cache_size)
+
+    def _start_heartbeat_flusher(self):
+        # Started on the first heartbeat so that it runs in the worker
+        # process rather than in the parent that forks the workers.
+        if self._heartbeat_flusher is None:
+            interval = CONF.conductor_heartbeat_flush_interval
+            self._heartbeat_flusher = loopingcall.FixedIntervalLoopingCall(
+                self._heartbeats.flush)
+            self._heartbeat_flusher.start(interval=interval,
+                                          initial_delay=interval)
+
+    def stop(self):
+        """Write the pending heartbeats when the service is stopped, as
+        they would otherwise be lost until the next heartbeat of their
+        instances.
+        """
+        if self._heartbeat_flusher is not None:
+            self._heartbeat_flusher.stop()
+            self._heartbeat_flusher = None
+        if self._heartbeats is not None:
+            self._heartbeats.flush()
+
+    def _status_changed(self, instance_id, status):
+        if self._status_notifier is not None:
+            try:
+                self._status_notifier.instance_status_changed(
+                    instance_id, status.description)
+            except Exception:
+                # The task managers fall back to polling the status.
+                LOG.exception(_("[Instance %s] Failed to notify the task "
+                                "managers of a status change.") % instance_id)
 
     def _message_too_old(self, instance_id, method_name, sent):
         fields = {
@@ -53,6 +101,14 @@ class Manager(periodic_task.PeriodicTasks):
         LOG.debug("Instance %(instance)s sent %(method)s at %(sent)s "
                   % fields)
 
+        if self._last_seen_cache is not None:
+            if self._last_seen_cache.message_too_old(instance_id,
+                                                     method_name, sent):
+                LOG.info(_("[Instance %s] Rec'd message is older than last "
+                           "seen. Discarding.") % instance_id)
+                return True
+            return False
+
         seen = None
         try:
             seen = LastSeen.load(instance_id=instance_id,
@@ -82,18 +138,35 @@ class Manager(periodic_task.PeriodicTasks):
                    "Discarding.") % instance_id)
         return True
 
+    @periodic_task.periodic_task
+    def report_last_seen_cache_stats(self, context):
+        if self._last_seen_cache is not None:
+            LOG.info(_("Last seen cache: %(size)d/%(max_size)d entries, "
+                       "%(hits)d hits, %(misses)d misses, %(evictions)d "
+                       "evictions.") % self._last_seen_cache.stats())
+
     def heartbeat(self, context, instance_id, payload, sent=None):
         LOG.debug("Instance ID: %(instance)s, Payload: %(payload)s" %
                   {"instance": str(instance_id),
                    "payload": str(payload)})
+        if self._heartbeats is not None:
+            self._start_heartbeat_flusher()
+            self._heartbeats.add(instance_id, payload, sent)
+            return
         status = inst_models.InstanceServiceStatus.find_by(
             instance_id=instance_id)
         if self._message_too_old(instance_id, 'heartbeat', sent):
             return
+        changed = None
         if payload.get('service_status') is not None:
-            status.set_status(ServiceStatus.from_description(
-                payload['service_status']))
+            new_status = ServiceStatus.from_description(
+                payload['service_status'])
+            if new_status.code != status.status_id:
+                changed = new_status
+            status.set_status(new_status)
         status.save()
+        if changed is not None:
+            self._status_changed(instance_id, changed)
 
     def update_backup(self, context, instance_id, backup_id,
                       sent=None, **backup_fields):
@@ -12,6 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import collections
+import threading
+
 from oslo_log import log as logging
 
 from trove.db import get_db_api
@@ -31,6 +34,8 @@ class LastSeen(object):
     _data_fields = ['instance_id', 'method_name', 'sent']
     _table_name = 'conductor_lastseen'
     preserve_on_delete = False
+    # Keeps IN clauses below the bound parameter limit of SQLite.
+    MAX_IDS_PER_QUERY = 500
 
     def __init__(self, instance_id, method_name, sent):
         self.instance_id = instance_id
@@ -47,7 +52,116 @@ class LastSeen(object):
                                     method_name=method_name)
         return seen
 
+    @classmethod
+    def load_all(cls, instance_ids, method_name):
+        """Load the last seen messages of many instances at once.
+
+        :returns: the LastSeen records keyed by instance id.
+        """
+        instance_ids = list(set(instance_ids))
+        seen = {}
+        for index in range(0, len(instance_ids), cls.MAX_IDS_PER_QUERY):
+            batch = instance_ids[index:index + cls.MAX_IDS_PER_QUERY]
+            query = get_db_api()._base_query(cls).filter(
+                cls.method_name == method_name,
+                cls.instance_id.in_(batch))
+            for record in query.all():
+                seen[record.instance_id] = record
+        return seen
+
     @classmethod
     def create(cls, instance_id, method_name, sent):
         seen = LastSeen(instance_id, method_name, sent)
         return seen.save()
+
+    @classmethod
+    def update_if_newer(cls, instance_id, method_name, sent):
+        """Record sent only if it is newer than the stored value.
+
+        :returns: True if the record was updated, False if it holds a
+                  message at least as new as sent or does not exist.
+        """
+        query = get_db_api()._base_query(cls).filter(
+            cls.instance_id == instance_id,
+            cls.method_name == method_name,
+            cls.sent < sent)
+        return query.update({'sent': sent}, synchronize_session=False) > 0
+
+
+class LastSeenCache(object):
+    """A bounded LRU cache of the last message seen from each instance,
+       keyed by (instance_id, method_name).
+
+       Misses are seeded from the database and accepted messages are
+       written through with a conditional update, so a message that is
+       older than the cached one is discarded without any database access.
+       If another worker recorded a newer message in the meantime, the
+       conditional update matches nothing and the entry is reloaded.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _get(self, key):
+        with self._lock:
+            sent = self._entries.pop(key, None)
+            if sent is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries[key] = sent
+            return sent
+
+    def _put(self, key, sent):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = sent
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _load(self, key):
+        instance_id, method_name = key
+        seen = LastSeen.load(instance_id=instance_id,
+                             method_name=method_name)
+        return float(seen.sent) if seen is not None else None
+
+    def message_too_old(self, instance_id, method_name, sent):
+        """Record the message and return whether it should be discarded
+           because a message at least as new has already been seen.
+        """
+        key = (instance_id, method_name)
+        last_sent = self._get(key)
+        if last_sent is not None:
+            if last_sent >= sent:
+                return True
+            if LastSeen.update_if_newer(instance_id, method_name, sent):
+                self._put(key, sent)
+                return False
+            # Another worker recorded a newer message since this entry
+            # was cached, or the record is gone. Fall back to the database.
+
+        last_sent = self._load(key)
+        if last_sent is not None and last_sent >= sent:
+            self._put(key, last_sent)
+            return True
+        if last_sent is None:
+            LOG.debug("[Instance %s] Did not find any previous message. "
+                      "Creating." % instance_id)
+        LastSeen.create(instance_id=instance_id, method_name=method_name,
+                        sent=sent)
+        self._put(key, sent)
+        return False
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._entries),
+                    'max_size': self.max_size,
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'evictions': self.evictions}
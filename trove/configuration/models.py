@@ -238,7 +238,8 @@ class DBConfigurationParameter(dbmodels.DatabaseModelBase):
         return self.configuration_key.__hash__()
 
 
-class DBDatastoreConfigurationParameters(dbmodels.DatabaseModelBase):
+class DBDatastoreConfigurationParameters(
+        dstore_models.DBCatalogModelBase):
     """Model for storing the configuration parameters on a datastore."""
     _auto_generated_attrs = ['id']
     _data_fields = [
@@ -302,16 +303,22 @@ class DatastoreConfigurationParameters(object):
 
     @classmethod
     def load_parameters(cls, datastore_version_id, show_deleted=False):
+        return dstore_models.CATALOG_CACHE.get(
+            ('configuration_parameters', datastore_version_id, show_deleted),
+            lambda: cls._load_parameters(datastore_version_id, show_deleted))
+
+    @classmethod
+    def _load_parameters(cls, datastore_version_id, show_deleted):
         try:
             if show_deleted:
                 return DBDatastoreConfigurationParameters.find_all(
                     datastore_version_id=datastore_version_id
-                )
+                ).all()
             else:
                 return DBDatastoreConfigurationParameters.find_all(
                     datastore_version_id=datastore_version_id,
                     deleted=False
-                )
+                ).all()
         except exception.NotFound:
             raise exception.NotFound(uuid=datastore_version_id)
 
@@ -377,6 +384,7 @@ def create_or_update_datastore_configuration_parameter(name,
             deleted=False,
         )
         get_db_api().save(config)
+    dstore_models.CATALOG_CACHE.invalidate()
 
 
 def load_datastore_configuration_parameters(datastore,
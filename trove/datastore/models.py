@@ -15,6 +15,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import time
+
 from oslo_log import log as logging
 
 from trove.common import cfg
@@ -42,22 +44,88 @@ def persisted_models():
     }
 
 
-class DBDatastore(dbmodels.DatabaseModelBase):
+class CatalogCache(object):
+    """Read-through cache of the datastore catalog.
+
+    The catalog only changes when an operator edits it, but it is loaded
+    for every row of the instance and backup listings. Entries expire
+    after datastore_cache_ttl seconds, and invalidate() drops them all
+    whenever the catalog is written. Each entry records the generation it
+    was loaded in, so that a value loaded while the catalog was written
+    is never served.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._generation = 0
+
+    def get(self, key, loader):
+        """Return the cached value of key, calling loader() to load it
+        when it is missing or expired. Exceptions are not cached.
+        """
+        ttl = CONF.datastore_cache_ttl
+        if ttl <= 0:
+            return loader()
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            generation, expires, value = entry
+            if generation == self._generation and now < expires:
+                return value
+        generation = self._generation
+        value = loader()
+        if generation == self._generation:
+            self._entries[key] = (generation, now + ttl, value)
+        return value
+
+    def invalidate(self):
+        self._generation += 1
+        self._entries.clear()
+
+
+CATALOG_CACHE = CatalogCache()
+
+
+class DBCatalogModelBase(dbmodels.DatabaseModelBase):
+    """Base of the models cached by CATALOG_CACHE, which is invalidated
+    when they are written.
+    """
+
+    def save(self):
+        try:
+            return super(DBCatalogModelBase, self).save()
+        finally:
+            CATALOG_CACHE.invalidate()
+
+    def delete(self):
+        try:
+            return super(DBCatalogModelBase, self).delete()
+        finally:
+            CATALOG_CACHE.invalidate()
+
+    def update(self, **values):
+        try:
+            return super(DBCatalogModelBase, self).update(**values)
+        finally:
+            CATALOG_CACHE.invalidate()
+
+
+class DBDatastore(DBCatalogModelBase):
 
     _data_fields = ['id', 'name', 'default_version_id']
 
 
-class DBCapabilities(dbmodels.DatabaseModelBase):
+class DBCapabilities(DBCatalogModelBase):
 
     _data_fields = ['id', 'name', 'description', 'enabled']
 
 
-class DBCapabilityOverrides(dbmodels.DatabaseModelBase):
+class DBCapabilityOverrides(DBCatalogModelBase):
 
     _data_fields = ['id', 'capability_id', 'datastore_version_id', 'enabled']
 
 
-class DBDatastoreVersion(dbmodels.DatabaseModelBase):
+class DBDatastoreVersion(DBCatalogModelBase):
 
     _data_fields = ['id', 'datastore_id', 'name', 'manager', 'image_id',
                     'packages', 'active']
@@ -147,9 +215,13 @@ class Capabilities(object):
 
         :returns Capabilities:
         """
-        self = cls(datastore_version_id)
-        self._load()
-        return self
+        def _load():
+            self = cls(datastore_version_id)
+            self._load()
+            return self
+
+        return CATALOG_CACHE.get(('capabilities', datastore_version_id),
+                                 _load)
 
 
 class BaseCapability(object):
@@ -342,6 +414,11 @@ class Datastore(object):
 
     @classmethod
     def load(cls, id_or_name):
+        return CATALOG_CACHE.get(('datastore', id_or_name),
+                                 lambda: cls._load(id_or_name))
+
+    @classmethod
+    def _load(cls, id_or_name):
         try:
             return cls(DBDatastore.find_by(id=id_or_name))
         except exception.ModelNotFoundError:
@@ -396,6 +473,12 @@ class DatastoreVersion(object):
 
     @classmethod
     def load(cls, datastore, id_or_name):
+        return CATALOG_CACHE.get(
+            ('datastore_version', datastore.id, id_or_name),
+            lambda: cls._load(datastore, id_or_name))
+
+    @classmethod
+    def _load(cls, datastore, id_or_name):
         try:
             return cls(DBDatastoreVersion.find_by(datastore_id=datastore.id,
                                                   id=id_or_name))
@@ -410,6 +493,11 @@ class DatastoreVersion(object):
 
     @classmethod
     def load_by_uuid(cls, uuid):
+        return CATALOG_CACHE.get(('datastore_version', uuid),
+                                 lambda: cls._load_by_uuid(uuid))
+
+    @classmethod
+    def _load_by_uuid(cls, uuid):
         try:
             return cls(DBDatastoreVersion.find_by(id=uuid))
         except exception.ModelNotFoundError:
@@ -531,6 +619,7 @@ def update_datastore(name, default_version):
         datastore.default_version_id = None
 
     db_api.save(datastore)
+    CATALOG_CACHE.invalidate()
 
 
 def update_datastore_version(datastore, name, manager, image_id, packages,
@@ -552,6 +641,7 @@ def update_datastore_version(datastore, name, manager, image_id, packages,
     version.active = active
 
     db_api.save(version)
+    CATALOG_CACHE.invalidate()
 
 
 class DatastoreVersionMetadata(object):
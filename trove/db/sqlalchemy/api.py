@@ -51,6 +51,7 @@ def find_by(model, **kwargs):
 
 
 def save(model):
+    session.record_write()
     try:
         db_session = session.get_session()
         model = db_session.merge(model)
@@ -61,7 +62,19 @@ def save(model):
                                           error=str(error.orig))
 
 
+def save_all(models):
+    session.record_write()
+    try:
+        db_session = session.get_session()
+        with db_session.begin():
+            return [db_session.merge(model) for model in models]
+    except sqlalchemy.exc.IntegrityError as error:
+        raise exception.DBConstraintError(model_name='batch',
+                                          error=str(error.orig))
+
+
 def delete(model):
+    session.record_write()
     db_session = session.get_session()
     model = db_session.merge(model)
     db_session.delete(model)
@@ -69,6 +82,7 @@ def delete(model):
 
 
 def delete_all(query_func, model, **conditions):
+    session.record_write()
     query_func(model, **conditions).delete()
 
 
@@ -78,6 +92,7 @@ def update(model, **values):
 
 
 def update_all(query_func, model, conditions, values):
+    session.record_write()
     query_func(model, **conditions).update(values)
 
 
@@ -117,8 +132,17 @@ def db_reset(options, *plugins):
     configure_db(options)
 
 
+def start_request(tenant_id, read_only):
+    session.start_request(tenant_id, read_only)
+
+
+def primary_reads():
+    return session.primary_reads()
+
+
 def _base_query(cls):
-    return session.get_session().query(cls)
+    return session.get_session(
+        use_slave=session.reads_use_slave()).query(cls)
 
 
 def _query_by(cls, **conditions):
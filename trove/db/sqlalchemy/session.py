@@ -15,6 +15,7 @@
 
 import contextlib
 import threading
+import time
 
 from oslo_db.sqlalchemy import session
 from oslo_log import log as logging
@@ -26,6 +27,12 @@ from trove.db.sqlalchemy import mappers
 
 _FACADE = None
 _LOCK = threading.Lock()
+# The read routing of the request handled by the current (green) thread.
+_READS = threading.local()
+# tenant_id -> time until which the tenant reads from the primary
+_RECENT_WRITES = {}
+# time after which the expired entries of _RECENT_WRITES are removed
+_NEXT_PRUNE = 0
 
 
 LOG = logging.getLogger(__name__)
@@ -122,6 +129,66 @@ def get_session(**kwargs):
     return get_facade().get_session(**kwargs)
 
 
+def start_request(tenant_id, read_only):
+    """Route the reads of the API request that starts to the replica if it
+    is read only, unless the tenant wrote recently.
+    """
+    _READS.tenant_id = tenant_id
+    _READS.use_slave = (read_only and CONF.db_read_replica_routing and
+                        not _wrote_recently(tenant_id))
+
+
+def _wrote_recently(tenant_id):
+    until = _RECENT_WRITES.get(tenant_id)
+    if until is None:
+        return False
+    if until < time.time():
+        _RECENT_WRITES.pop(tenant_id, None)
+        return False
+    return True
+
+
+def reads_use_slave():
+    return getattr(_READS, 'use_slave', False)
+
+
+def record_write():
+    """Read from the primary for the rest of the request, and for the next
+    requests of the tenant until the write has reached the replica.
+    """
+    _READS.use_slave = False
+    tenant_id = getattr(_READS, 'tenant_id', None)
+    if tenant_id and CONF.db_read_replica_routing:
+        now = time.time()
+        _prune_recent_writes(now)
+        _RECENT_WRITES[tenant_id] = now + CONF.db_read_replica_write_window
+
+
+def _prune_recent_writes(now):
+    # Tenants that do not read again after a write are not removed by
+    # _wrote_recently, so the expired entries are swept once per window.
+    global _NEXT_PRUNE
+    if now < _NEXT_PRUNE:
+        return
+    _NEXT_PRUNE = now + CONF.db_read_replica_write_window
+    for tenant_id, until in list(_RECENT_WRITES.items()):
+        if until < now:
+            _RECENT_WRITES.pop(tenant_id, None)
+
+
+@contextlib.contextmanager
+def primary_reads():
+    """Read from the primary within the block, for handlers that must see
+    the latest data.
+    """
+    use_slave = reads_use_slave()
+    _READS.use_slave = False
+    try:
+        yield
+    finally:
+        _READS.use_slave = use_slave
+
+
 def raw_query(model, **kwargs):
     return get_session(**kwargs).query(model)
 
@@ -16,7 +16,6 @@ import datetime
 from oslo_log import log as logging
 
 from trove.common import cfg
-from trove.common import exception
 from trove.common.i18n import _
 from trove.common import remote
 from trove.common import utils
@@ -228,12 +227,12 @@ class NotificationTransformer(object):
     def __call__(self):
         audit_start, audit_end = NotificationTransformer._get_audit_period()
         messages = []
-        db_infos = instance_models.DBInstance.find_all(deleted=False)
+        db_infos = instance_models.DBInstance.find_all(deleted=False).all()
+        service_statuses = InstanceServiceStatus.find_all_by_instance_ids(
+            [db_info.id for db_info in db_infos])
         for db_info in db_infos:
-            try:
-                service_status = InstanceServiceStatus.find_by(
-                    instance_id=db_info.id)
-            except exception.ModelNotFoundError:
+            service_status = service_statuses.get(db_info.id)
+            if service_status is None:
                 # There is a small window of opportunity during when the db
                 # resource for an instance exists, but no InstanceServiceStatus
                 # for it has yet been created. We skip sending the notification
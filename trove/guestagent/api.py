@@ -17,10 +17,14 @@
 Handles all request to the Platform or Guest VM
 """
 
+import contextlib
+import functools
+
 from eventlet import Timeout
 from oslo_log import log as logging
 import oslo_messaging as messaging
 from oslo_messaging.rpc.client import RemoteError
+import six
 
 from trove.common import cfg
 from trove.common import exception
@@ -34,6 +38,71 @@ LOG = logging.getLogger(__name__)
 AGENT_LOW_TIMEOUT = CONF.agent_call_low_timeout
 AGENT_HIGH_TIMEOUT = CONF.agent_call_high_timeout
 AGENT_SNAPSHOT_TIMEOUT = CONF.agent_replication_snapshot_timeout
+# The first version of the guest agent that has batch_call.
+BATCH_CALL_VERSION = rpc_version.GUEST_RPC_API_VERSION
+
+
+class GuestBatch(object):
+    """Record the calls made through an API and make them in one RPC call.
+
+    The methods of the API are called on the batch as on the API, but
+    return nothing; the results are in the results list, in the order of
+    the calls, once the batch has been executed. Casts cannot be batched,
+    and the calls are made one at a time if the guest agent version cap
+    is older than BATCH_CALL_VERSION.
+    """
+
+    # Whether it was logged that the version cap prevents batching.
+    _logged_unbatched = False
+
+    def __init__(self, api):
+        self.api = api
+        self.context = api.context
+        self.id = api.id
+        self.version_cap = api.version_cap
+        self.calls = []
+        self.timeouts = []
+        self.results = None
+
+    def __getattr__(self, name):
+        method = getattr(type(self.api), name)
+        return functools.partial(six.get_unbound_function(method), self)
+
+    def _call(self, method_name, timeout_sec, version, **kwargs):
+        LOG.debug("Batching %s" % method_name)
+        self.calls.append([method_name, kwargs])
+        self.timeouts.append(timeout_sec)
+
+    def _cast(self, method_name, version, **kwargs):
+        raise exception.TroveError(_(
+            "Cannot batch %s as it is a cast.") % method_name)
+
+    def execute(self):
+        self.results = []
+        if not self.calls:
+            return
+        if not self.api.client.can_send_version(BATCH_CALL_VERSION):
+            if not GuestBatch._logged_unbatched:
+                GuestBatch._logged_unbatched = True
+                LOG.info(_("Guest agent calls are made one at a time as the "
+                           "guestagent upgrade level %(level)s is older than "
+                           "version %(version)s of batch_call.") %
+                         {'level': CONF.upgrade_levels.guestagent,
+                          'version': BATCH_CALL_VERSION})
+            for (method_name, kwargs), timeout_sec in zip(self.calls,
+                                                          self.timeouts):
+                self.results.append(self.api._call(
+                    method_name, timeout_sec, self.version_cap, **kwargs))
+            return
+        # The calls are run one after another.
+        response = self.api._call("batch_call", sum(self.timeouts),
+                                  BATCH_CALL_VERSION, calls=self.calls)
+        self.results = response['results']
+        if response['error']:
+            failed = self.calls[len(self.results)][0]
+            LOG.error(_("Error calling %(method)s in a batch: %(error)s") %
+                      {'method': failed, 'error': response['error']})
+            raise exception.GuestError(original_message=response['error'])
 
 
 class API(object):
@@ -45,7 +114,7 @@ class API(object):
         super(API, self).__init__()
 
         target = messaging.Target(topic=self._get_routing_key(),
-                                  version=rpc_version.RPC_API_VERSION)
+                                  version=rpc_version.GUEST_RPC_API_VERSION)
 
         self.version_cap = rpc_version.VERSION_ALIASES.get(
             CONF.upgrade_levels.guestagent)
@@ -86,6 +155,24 @@ class API(object):
             LOG.exception(_("Error calling %s") % method_name)
             raise exception.GuestError(original_message=str(e))
 
+    @contextlib.contextmanager
+    def batch(self):
+        """Make the calls of a with block in a single RPC call:
+
+            with guest.batch() as batch:
+                batch.get_txn_count()
+                batch.get_latest_txn_id()
+            txn_count, txn_id = batch.results
+
+        The calls are run by the guest in order, and stop at the first
+        that fails, which raises GuestError with the results of the calls
+        before it in batch.results. Only the methods of the guest that
+        are in its Manager.BATCH_CALLS can be batched.
+        """
+        batch = GuestBatch(self)
+        yield batch
+        batch.execute()
+
     def _get_routing_key(self):
         """Create the routing key based on the container id."""
         return "guestagent.%s" % self.id
@@ -262,7 +349,7 @@ class API(object):
         server = None
         target = messaging.Target(topic=self._get_routing_key(),
                                   server=self.id,
-                                  version=rpc_version.RPC_API_VERSION)
+                                  version=rpc_version.GUEST_RPC_API_VERSION)
         try:
             server = rpc.get_server(target, [])
             server.start()
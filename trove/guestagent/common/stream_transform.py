@@ -0,0 +1,155 @@
+# Copyright 2016 Tesora Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Transforms applied by the guest agent to a backup stream.
+
+Each transform wraps a file-like object and is itself read with
+read(chunk_size), so they can be chained between a backup process and the
+storage strategy.
+"""
+
+import collections
+import sys
+import zlib
+
+import eventlet
+from eventlet.green import subprocess
+from eventlet import greenpool
+from eventlet import tpool
+from oslo_log import log as logging
+import six
+
+from trove.common.i18n import _LW
+
+LOG = logging.getLogger(__name__)
+
+
+class StreamTransformError(Exception):
+    """Error transforming a backup stream."""
+
+
+def gzip_member(data, level):
+    """Compress data into a complete gzip member."""
+    # A wbits offset of 16 makes zlib write the gzip header and trailer.
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+class ParallelGzipStream(object):
+    """Compress a stream on several cores.
+
+    The stream is cut into blocks of block_size bytes, and up to workers
+    blocks are compressed at a time on native threads (zlib releases the
+    GIL while compressing). Each block is written as a gzip member of its
+    own: a concatenation of gzip members is a valid gzip file, so the
+    output is read by 'gzip -d' like the output of the gzip command.
+    """
+
+    def __init__(self, stream, workers, block_size, level=6):
+        self.stream = stream
+        self.workers = workers
+        self.block_size = block_size
+        self.level = level
+        self.pool = greenpool.GreenPool(workers)
+        self.pending = collections.deque()
+        self.end_of_stream = False
+        self.buffer = ''
+        self.offset = 0
+
+    def _compress(self, block):
+        return tpool.execute(gzip_member, block, self.level)
+
+    def _read_ahead(self):
+        while not self.end_of_stream and len(self.pending) < self.workers:
+            block = self.stream.read(self.block_size)
+            if not block:
+                self.end_of_stream = True
+                break
+            self.pending.append(self.pool.spawn(self._compress, block))
+
+    def read(self, chunk_size):
+        while len(self.buffer) - self.offset < chunk_size:
+            self._read_ahead()
+            if not self.pending:
+                break
+            self.buffer = (self.buffer[self.offset:] +
+                           self.pending.popleft().wait())
+            self.offset = 0
+
+        chunk = self.buffer[self.offset:self.offset + chunk_size]
+        self.offset += len(chunk)
+        return chunk
+
+    def close(self):
+        for compression in self.pending:
+            compression.wait()
+        self.pending.clear()
+
+
+class CommandStream(object):
+    """Pipe a stream through a command, such as 'openssl enc'.
+
+    The stream is written to the command by a green thread while its output
+    is read, so the command runs alongside the other stages in a process of
+    its own. A failure of the command or of the writer is raised when the
+    end of its output is reached.
+    """
+
+    def __init__(self, stream, command, chunk_size):
+        self.stream = stream
+        self.command = command
+        self.chunk_size = chunk_size
+        self.process = subprocess.Popen(command, shell=True,
+                                        stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE,
+                                        stderr=subprocess.PIPE)
+        self.writer = eventlet.spawn(self._write)
+
+    def _write(self):
+        try:
+            chunk = self.stream.read(self.chunk_size)
+            while chunk:
+                self.process.stdin.write(chunk)
+                chunk = self.stream.read(self.chunk_size)
+        except Exception:
+            return sys.exc_info()
+        finally:
+            self.process.stdin.close()
+
+    def read(self, chunk_size):
+        chunk = self.process.stdout.read(chunk_size)
+        if not chunk:
+            self._check()
+        return chunk
+
+    def _check(self):
+        error = self.writer.wait()
+        if error:
+            six.reraise(*error)
+        err = self.process.stderr.read()
+        if self.process.wait():
+            raise StreamTransformError(
+                err or "Command exited with status %d." %
+                self.process.returncode)
+        if err:
+            # Such as the key derivation warning of recent openssl versions.
+            LOG.warning(_LW("Stream command wrote: %s"), err)
+
+    def close(self):
+        if self.process.poll() is None:
+            LOG.debug("Terminating stream command.")
+            self.writer.kill()
+            self.process.terminate()
+            self.process.wait()
@@ -15,10 +15,13 @@
 #
 
 import abc
+import time
 
 from oslo_config import cfg as oslo_cfg
 from oslo_log import log as logging
+from oslo_service import loopingcall
 from oslo_service import periodic_task
+from swiftclient.client import ClientException
 
 from trove.common import cfg
 from trove.common import exception
@@ -61,6 +64,13 @@ class Manager(periodic_task.PeriodicTasks):
     GUEST_LOG_DEFS_ERROR_LABEL = 'error'
     GUEST_LOG_DEFS_SLOW_QUERY_LABEL = 'slow_query'
 
+    # The RPC methods that can be run by batch_call. These are calls, not
+    # casts, that the task manager makes several of to the same guest.
+    BATCH_CALLS = frozenset([
+        'detach_replica', 'enable_as_master', 'get_last_txn',
+        'get_latest_txn_id', 'get_replica_context', 'get_replication_detail',
+        'get_txn_count', 'make_read_only', 'rpc_ping', 'wait_for_txn'])
+
     def __init__(self, manager_name):
         super(Manager, self).__init__(CONF)
 
@@ -74,6 +84,8 @@ class Manager(periodic_task.PeriodicTasks):
         self._guest_log_loaded_context = None
         self._guest_log_cache = None
         self._guest_log_defs = None
+        self._guest_log_shipper = None
+        self._guest_log_ship_backoff = {}
 
         # Module
         self.module_driver_manager = driver_manager.ModuleDriverManager()
@@ -194,6 +206,8 @@ class Manager(periodic_task.PeriodicTasks):
     @guest_log_context.setter
     def guest_log_context(self, context):
         self._guest_log_context = context
+        if context:
+            self._start_guest_log_shipper()
 
     @property
     def guest_log_cache(self):
@@ -252,6 +266,29 @@ class Manager(periodic_task.PeriodicTasks):
         LOG.debug("Responding to RPC ping.")
         return True
 
+    def batch_call(self, context, calls):
+        """Run several methods of the manager in one RPC call.
+
+        calls is a list of [method_name, kwargs] pairs of BATCH_CALLS,
+        which are run in order. The calls stop at the first one that
+        fails, and its error is returned with the results of the calls
+        before it.
+        """
+        results = []
+        for method_name, kwargs in calls:
+            if method_name not in self.BATCH_CALLS:
+                return {'results': results,
+                        'error': "Method '%s' cannot be batched." %
+                                 method_name}
+            try:
+                method = getattr(self, method_name)
+                results.append(method(context, **kwargs))
+            except Exception as e:
+                LOG.exception(_("Error running batched call %s.") %
+                              method_name)
+                return {'results': results, 'error': str(e)}
+        return {'results': results, 'error': None}
+
     #################
     # Prepare related
     #################
@@ -533,6 +570,67 @@ class Manager(periodic_task.PeriodicTasks):
 
         raise exception.NotFound("Log '%s' is not defined." % log_name)
 
+    def _start_guest_log_shipper(self):
+        """Start shipping the enabled logs, if guest_log_ship_interval is
+        set. The guest has no credentials of its own, so the logs are
+        shipped with the token of the last guest log request. The shipper
+        is therefore started by a guest log request, and stops once that
+        token is rejected until the next request brings a new one.
+        """
+        if CONF.guest_log_ship_interval > 0 and not self._guest_log_shipper:
+            LOG.info(_("Shipping guest logs every %d seconds.") %
+                     CONF.guest_log_ship_interval)
+            self._guest_log_ship_backoff = {}
+            self._guest_log_shipper = loopingcall.FixedIntervalLoopingCall(
+                self.ship_guest_logs)
+            self._guest_log_shipper.start(
+                interval=guest_log.SHIP_POLL_INTERVAL)
+
+    def ship_guest_logs(self):
+        """Publish the new lines of the enabled logs.
+
+        A log that cannot be shipped is retried after an exponentially
+        growing delay, and the error is only logged on the first failure.
+        """
+        gl_cache = self.guest_log_cache
+        for log_name in gl_cache.keys():
+            log = gl_cache[log_name]
+            if not (log.enabled and log.exposed):
+                continue
+            failures, retry_at = self._guest_log_ship_backoff.get(
+                log_name, (0, 0))
+            if time.time() < retry_at:
+                continue
+            try:
+                log.ship()
+            except ClientException as e:
+                if e.http_status == 401:
+                    LOG.warning(_("The guest log token has been rejected, "
+                                  "shipping stopped until the next guest "
+                                  "log request."))
+                    # Report it in the status of the shipped logs, until
+                    # they are shipped again.
+                    for shipped in gl_cache.values():
+                        if shipped.enabled and shipped.exposed:
+                            shipped.ship_stopped = True
+                    self._guest_log_shipper = None
+                    raise loopingcall.LoopingCallDone()
+                self._guest_log_ship_failed(log_name, failures)
+            except Exception:
+                self._guest_log_ship_failed(log_name, failures)
+            else:
+                self._guest_log_ship_backoff.pop(log_name, None)
+
+    def _guest_log_ship_failed(self, log_name, failures):
+        if failures:
+            LOG.debug("Could not ship guest log '%s' again." % log_name)
+        else:
+            LOG.exception(_("Could not ship guest log '%s'.") % log_name)
+        delay = min(guest_log.SHIP_POLL_INTERVAL * 2 ** failures,
+                    guest_log.SHIP_MAX_BACKOFF)
+        self._guest_log_ship_backoff[log_name] = (failures + 1,
+                                                  time.time() + delay)
+
     def guest_log_enable(self, context, log_name, disable):
         """This method can be overridden by datastore implementations to
         facilitate enabling and disabling USER type logs.  If the logs
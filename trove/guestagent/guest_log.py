@@ -17,6 +17,8 @@ import enum
 import hashlib
 import os
 from requests.exceptions import ConnectionError
+import threading
+import time
 
 from oslo_log import log as logging
 from swiftclient.client import ClientException
@@ -33,6 +35,12 @@ from trove.guestagent.common.operating_system import FileMode
 LOG = logging.getLogger(__name__)
 CONF = cfg.CONF
 
+# How often (in seconds) the shipper checks the enabled logs for new lines.
+SHIP_POLL_INTERVAL = 1
+# Longest time (in seconds) the shipper waits before retrying a log that
+# could not be shipped.
+SHIP_MAX_BACKOFF = 600
+
 
 class LogType(enum.Enum):
     """Represent the type of the log object."""
@@ -76,6 +84,10 @@ class LogStatus(enum.Enum):
     # This is an internal status
     Restart_Completed = 9
 
+    # Logging is on, but new data is no longer shipped as the token of the
+    # last guest log request has been rejected
+    Shipping_Stopped = 10
+
 
 class GuestLog(object):
 
@@ -85,6 +97,7 @@ class GuestLog(object):
     MF_LABEL_LOG_FILE = 'log_file'
     MF_LABEL_LOG_SIZE = 'log_size'
     MF_LABEL_LOG_HEADER = 'log_header_digest'
+    MF_LABEL_LOG_INODE = 'log_inode'
 
     def __init__(self, log_context, log_name, log_type, log_user, log_file,
                  log_exposed):
@@ -98,6 +111,10 @@ class GuestLog(object):
         self._published_size = None
         self._header_digest = 'abc'
         self._published_header_digest = None
+        self._inode = None
+        self._published_inode = None
+        self._shipped_at = 0
+        self._ship_stopped = False
         self._status = None
         self._cached_context = None
         self._cached_swift_client = None
@@ -105,6 +122,9 @@ class GuestLog(object):
         self._file_readable = False
         self._container_name = None
         self._codec = stream_codecs.JsonCodec()
+        # The shipper and the guest log requests run concurrently, and
+        # must not publish or delete the components at the same time.
+        self._lock = threading.Lock()
 
         self._set_status(self._type == LogType.USER,
                          LogStatus.Disabled, LogStatus.Enabled)
@@ -146,6 +166,14 @@ class GuestLog(object):
     def enabled(self, enabled):
         self._enabled = enabled
 
+    @property
+    def ship_stopped(self):
+        return self._ship_stopped
+
+    @ship_stopped.setter
+    def ship_stopped(self, ship_stopped):
+        self._ship_stopped = ship_stopped
+
     @property
     def status(self):
         return self._status
@@ -198,10 +226,13 @@ class GuestLog(object):
             pending = self._size - self._published_size
             if self.status == LogStatus.Rotated:
                 pending = self._size
+            status = self.status
+            if self.ship_stopped and status != LogStatus.Restart_Required:
+                status = LogStatus.Shipping_Stopped
             return {
                 'name': self._name,
                 'type': self._type.name,
-                'status': self.status.name.replace('_', ' '),
+                'status': status.name.replace('_', ' '),
                 'published': self._published_size,
                 'pending': pending,
                 'container': container_name,
@@ -222,6 +253,8 @@ class GuestLog(object):
                     meta_details[self.MF_LABEL_LOG_SIZE])
                 self._published_header_digest = (
                     meta_details[self.MF_LABEL_LOG_HEADER])
+                self._published_inode = meta_details.get(
+                    self.MF_LABEL_LOG_INODE)
             except ClientException as ex:
                 if ex.http_status == 404:
                     LOG.debug("No published metadata found for log '%s'" %
@@ -253,6 +286,7 @@ class GuestLog(object):
         if os.path.isfile(self._file):
             logstat = os.stat(self._file)
             self._size = logstat.st_size
+            self._inode = logstat.st_ino
             self._update_log_header_digest(self._file)
 
             if self._log_rotated():
@@ -280,15 +314,20 @@ class GuestLog(object):
                              user_status, LogStatus.Unavailable)
 
     def _log_rotated(self):
-        """If the file is smaller than the last reported size
-        or the first line hash is different, we can probably assume
-        the file changed under our nose.
+        """If the file is smaller than the last reported size, is not
+        the file last published or the first line hash is different, we
+        can probably assume the file changed under our nose.
         """
         if (self._published_size > 0 and
                 (self._size < self._published_size or
+                 self._inode_changed() or
                  self._published_header_digest != self._header_digest)):
             return True
 
+    def _inode_changed(self):
+        return (self._published_inode is not None and
+                self._inode != self._published_inode)
+
     def _update_log_header_digest(self, log_file):
         with open(log_file, 'r') as log:
             self._header_digest = hashlib.md5(log.readline()).hexdigest()
@@ -297,6 +336,10 @@ class GuestLog(object):
         return {'X-Delete-After': CONF.guest_log_expiry}
 
     def publish_log(self):
+        with self._lock:
+            return self._publish_log()
+
+    def _publish_log(self):
         if self.exposed:
             if self._log_rotated():
                 LOG.debug("Log file rotation detected for '%s' - "
@@ -313,7 +356,60 @@ class GuestLog(object):
             raise exception.UnauthorizedRequest(_(
                 "Not authorized to publish log '%s'.") % self._name)
 
+    def ship(self):
+        """Publish the lines appended to the log since the last batch.
+
+        This is called by the shipper every SHIP_POLL_INTERVAL seconds.
+        The new lines are published once guest_log_ship_batch_size bytes
+        are pending, or guest_log_ship_interval seconds after the last
+        batch, and the metafile is written once per batch. Unlike
+        publish_log, rotation is detected by the inode of the file rather
+        than by hashing its first line on every call. Returns whether a
+        batch was published.
+        """
+        with self._lock:
+            shipped = self._ship()
+            self.ship_stopped = False
+            return shipped
+
+    def _ship(self):
+        if not self.enabled or not os.path.isfile(self._file):
+            return False
+        if self._published_size is None:
+            self._refresh_details()
+
+        logstat = os.stat(self._file)
+        self._size = logstat.st_size
+        self._inode = logstat.st_ino
+        if self._published_size > 0 and (
+                self._size < self._published_size or self._inode_changed()):
+            LOG.debug("Log file rotation detected for '%s' - "
+                      "discarding old log" % self._name)
+            self._delete_log_components()
+
+        pending = self._size - self._published_size
+        if pending <= 0 or (
+                pending < CONF.guest_log_ship_batch_size and
+                time.time() - self._shipped_at <
+                CONF.guest_log_ship_interval):
+            return False
+
+        if not self._published_size:
+            self._update_log_header_digest(self._file)
+        self._shipped_at = time.time()
+        container_name = self.get_container_name()
+        if self._publish_components(container_name, self._file):
+            self._put_meta_details()
+            self._set_status(self._size > self._published_size,
+                             LogStatus.Partial, LogStatus.Published)
+            return True
+        return False
+
     def discard_log(self):
+        with self._lock:
+            return self._discard_log()
+
+    def _discard_log(self):
         if self.exposed:
             self._delete_log_components()
             return self.show()
@@ -334,45 +430,66 @@ class GuestLog(object):
                          LogStatus.Disabled, LogStatus.Enabled)
         self._published_size = 0
 
+    @staticmethod
+    def _log_components(log, limit):
+        """Split the log read from its current position into components of
+        at most limit bytes made of complete lines.
+
+        The log is read in blocks of limit bytes, so that at most two
+        blocks are held in memory. A partial last line is not returned,
+        it is published once complete; a line longer than limit is split.
+        """
+        pending = ''
+        while True:
+            block = log.read(limit)
+            if not block:
+                break
+            pending = pending + block if pending else block
+            while len(pending) >= limit:
+                end = pending.rfind('\n', 0, limit) + 1
+                if not end:
+                    end = limit
+                yield pending[:end]
+                pending = pending[end:]
+        end = pending.rfind('\n') + 1
+        if end:
+            yield pending[:end]
+
     def _publish_to_container(self, log_filename):
-        log_component, log_lines = '', 0
-        chunk_size = CONF.guest_log_limit
         container_name = self.get_container_name(force=True)
+        self._refresh_details()
+        self._put_meta_details()
+        self._publish_components(container_name, log_filename)
+        self._put_meta_details()
 
-        def _read_chunk(f):
-            while True:
-                current_chunk = f.read(chunk_size)
-                if not current_chunk:
-                    break
-                yield current_chunk
+    def _publish_components(self, container_name, log_filename):
+        """Write the unpublished lines of the log to the container and
+        return the number of components written.
+        """
+        chunk_size = CONF.guest_log_limit
 
-        def _write_log_component():
-            object_headers.update({'x-object-meta-lines': log_lines})
+        def _write_log_component(log_component):
+            headers = dict(object_headers)
+            headers['x-object-meta-lines'] = log_component.count('\n')
             component_name = '%s%s' % (self._object_prefix(),
                                        self._object_name())
             self.swift_client.put_object(container_name,
                                          component_name, log_component,
-                                         headers=object_headers)
+                                         headers=headers)
             self._published_size = (
                 self._published_size + len(log_component))
             self._published_header_digest = self._header_digest
+            self._published_inode = self._inode
 
-        self._refresh_details()
-        self._put_meta_details()
         object_headers = self._get_headers()
+        count = 0
         with open(log_filename, 'r') as log:
             LOG.debug("seeking to %s", self._published_size)
             log.seek(self._published_size)
-            for chunk in _read_chunk(log):
-                for log_line in chunk.splitlines():
-                    if len(log_component) + len(log_line) > chunk_size:
-                        _write_log_component()
-                        log_component, log_lines = '', 0
-                    log_component = log_component + log_line + '\n'
-                    log_lines += 1
-        if log_lines > 0:
-            _write_log_component()
-        self._put_meta_details()
+            for log_component in self._log_components(log, chunk_size):
+                _write_log_component(log_component)
+                count += 1
+        return count
 
     def _put_meta_details(self):
         metafile_name = self._metafile_name()
@@ -382,6 +499,7 @@ class GuestLog(object):
             self.MF_LABEL_LOG_FILE: self._file,
             self.MF_LABEL_LOG_SIZE: self._published_size,
             self.MF_LABEL_LOG_HEADER: self._header_digest,
+            self.MF_LABEL_LOG_INODE: self._inode,
         }
         container_name = self.get_container_name()
         self.swift_client.put_object(container_name, metafile_name,
@@ -21,6 +21,7 @@ from oslo_log import log as logging
 from eventlet.green import subprocess
 from trove.common import cfg, utils
 from trove.common.strategies.strategy import Strategy
+from trove.guestagent.common import stream_transform
 
 CONF = cfg.CONF
 
@@ -45,11 +46,14 @@ class BackupRunner(Strategy):
     is_zipped = CONF.backup_use_gzip_compression
     is_encrypted = CONF.backup_use_openssl_encryption
     encrypt_key = CONF.backup_aes_cbc_key
+    compression_workers = CONF.backup_compression_workers
+    compression_block_size = CONF.backup_compression_block_size
 
     def __init__(self, filename, **kwargs):
         self.base_filename = filename
         self.process = None
         self.pid = None
+        self.stream = None
         kwargs.update({'filename': filename})
         self.command = self.cmd % kwargs
         super(BackupRunner, self).__init__()
@@ -65,6 +69,24 @@ class BackupRunner(Strategy):
                                         stderr=subprocess.PIPE,
                                         preexec_fn=os.setsid)
         self.pid = self.process.pid
+        self.stream = self._transform(self.process.stdout)
+
+    @property
+    def transform_in_agent(self):
+        """Whether the output is compressed, and then encrypted, by the
+        agent rather than by the backup command.
+        """
+        return self.is_zipped and self.compression_workers > 1
+
+    def _transform(self, stream):
+        if not self.transform_in_agent:
+            return stream
+        stream = stream_transform.ParallelGzipStream(
+            stream, self.compression_workers, self.compression_block_size)
+        if self.is_encrypted:
+            stream = stream_transform.CommandStream(
+                stream, self.openssl_cmd, self.compression_block_size)
+        return stream
 
     def __enter__(self):
         """Start up the process."""
@@ -74,6 +96,9 @@ class BackupRunner(Strategy):
 
     def __exit__(self, exc_type, exc_value, traceback):
         """Clean up everything."""
+        if self.stream is not None and self.stream is not self.process.stdout:
+            self.stream.close()
+
         if exc_type is not None:
             return False
 
@@ -113,16 +138,25 @@ class BackupRunner(Strategy):
 
     @property
     def zip_cmd(self):
+        if self.transform_in_agent:
+            return ''
         return ' | gzip' if self.is_zipped else ''
 
     @property
     def zip_manifest(self):
         return '.gz' if self.is_zipped else ''
 
+    @property
+    def openssl_cmd(self):
+        return ('openssl enc -aes-256-cbc -salt -pass pass:%s' %
+                self.encrypt_key)
+
     @property
     def encrypt_cmd(self):
-        return (' | openssl enc -aes-256-cbc -salt -pass pass:%s' %
-                self.encrypt_key) if self.is_encrypted else ''
+        # Encryption follows compression, so it moves to the agent with it.
+        if self.transform_in_agent:
+            return ''
+        return ' | %s' % self.openssl_cmd if self.is_encrypted else ''
 
     @property
     def encrypt_manifest(self):
@@ -133,7 +167,7 @@ class BackupRunner(Strategy):
         return True
 
     def read(self, chunk_size):
-        return self.process.stdout.read(chunk_size)
+        return self.stream.read(chunk_size)
 
     def _run_pre_backup(self):
         pass
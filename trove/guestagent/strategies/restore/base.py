@@ -84,10 +84,22 @@ class RestoreRunner(Strategy):
                                    stdin=subprocess.PIPE,
                                    stderr=subprocess.PIPE)
         content_length = 0
-        for chunk in stream:
-            process.stdin.write(chunk)
-            content_length += len(chunk)
-        process.stdin.close()
+        try:
+            for chunk in stream:
+                process.stdin.write(chunk)
+                content_length += len(chunk)
+            process.stdin.close()
+        finally:
+            if not process.stdin.closed:
+                # The stream failed, or the restore was killed: do not
+                # leave the restore command running.
+                LOG.debug("Terminating the restore command.")
+                process.terminate()
+                try:
+                    process.stdin.close()
+                except IOError:
+                    pass
+                process.wait()
         utils.raise_if_process_errored(process, RestoreError)
         LOG.debug("Restored %s bytes from stream." % content_length)
 
@@ -17,10 +17,14 @@
 import glob
 import os
 import re
+import sys
 import tempfile
 
+import eventlet
+from eventlet.support import greenlets as greenlet
 from oslo_log import log as logging
 import pexpect
+import six
 
 from trove.common import cfg
 from trove.common import exception
@@ -256,43 +260,85 @@ class InnoBackupExIncremental(InnoBackupEx):
         utils.execute(prepare_cmd, shell=True)
         LOG.info(_("Innobackupex prepare finished successfully."))
 
-    def _incremental_restore(self, location, checksum):
-        """Recursively apply backups from all parents.
-
-        If we are the parent then we restore to the restore_location and
-        we apply the logs to the restore_location only.
-
-        Otherwise if we are an incremental we restore to a subfolder to
-        prevent stomping on the full restore data. Then we run apply log
-        with the '--incremental-dir' flag
+    def _resolve_chain(self, location, checksum):
+        """Return the (location, checksum) of the backups of the chain,
+        from the full backup to this backup, by walking the
+        'parent_location' metadata.
+        """
+        chain = []
+        while location:
+            chain.append((location, checksum))
+            metadata = self.storage.load_metadata(location, checksum)
+            location = metadata.get('parent_location')
+            checksum = metadata.get('parent_checksum')
+        chain.reverse()
+        return chain
+
+    def _incremental_dir(self, checksum):
+        # just use the checksum for the incremental path as it is
+        # sufficiently unique /var/lib/mysql/<checksum>
+        return os.path.join(
+            cfg.get_configuration_property('mount_point'), checksum)
+
+    def _unpack_link(self, location, checksum, incremental_dir):
+        """Unpack a backup of the chain.
+
+        The full backup is restored to the restore_location; incrementals
+        are restored to a subfolder to prevent stomping on the full
+        restore data.
         """
-        metadata = self.storage.load_metadata(location, checksum)
-        incremental_dir = None
-        if 'parent_location' in metadata:
-            LOG.info(_("Restoring parent: %(parent_location)s"
-                       " checksum: %(parent_checksum)s.") % metadata)
-            parent_location = metadata['parent_location']
-            parent_checksum = metadata['parent_checksum']
-            # Restore parents recursively so backup are applied sequentially
-            self._incremental_restore(parent_location, parent_checksum)
-            # for *this* backup set the incremental_dir
-            # just use the checksum for the incremental path as it is
-            # sufficiently unique /var/lib/mysql/<checksum>
-            incremental_dir = os.path.join(
-                cfg.get_configuration_property('mount_point'), checksum)
+        if incremental_dir is None:
+            # The parent (full backup) use the same command from
+            # InnobackupEx super class and do not set an incremental_dir.
+            command = self.restore_cmd
+        else:
+            LOG.info(_("Restoring incremental: %(location)s"
+                       " checksum: %(checksum)s.") %
+                     {'location': location, 'checksum': checksum})
             operating_system.create_directory(incremental_dir, as_root=True)
             command = self._incremental_restore_cmd(incremental_dir)
-        else:
-            # The parent (full backup) use the same command from InnobackupEx
-            # super class and do not set an incremental_dir.
-            command = self.restore_cmd
-
         self.content_length += self._unpack(location, checksum, command)
-        self._incremental_prepare(incremental_dir)
 
-        # Delete unpacked incremental backup metadata
-        if incremental_dir:
-            operating_system.remove(incremental_dir, force=True, as_root=True)
+    def _incremental_restore(self, location, checksum):
+        """Apply the backups of the chain in order.
+
+        The backups are applied with apply log; incrementals with the
+        '--incremental-dir' flag. While a backup is prepared, which is
+        bound on CPU and disk, the next one is downloaded and unpacked,
+        which is bound on the network, so the two overlap.
+        """
+        chain = self._resolve_chain(location, checksum)
+        incremental_dirs = [None] + [self._incremental_dir(link_checksum)
+                                     for link_location, link_checksum
+                                     in chain[1:]]
+
+        self._unpack_link(chain[0][0], chain[0][1], None)
+        for index, incremental_dir in enumerate(incremental_dirs):
+            prefetch = None
+            if index + 1 < len(chain):
+                next_location, next_checksum = chain[index + 1]
+                prefetch = eventlet.spawn(self._unpack_link, next_location,
+                                          next_checksum,
+                                          incremental_dirs[index + 1])
+            try:
+                self._incremental_prepare(incremental_dir)
+
+                # Delete unpacked incremental backup metadata
+                if incremental_dir:
+                    operating_system.remove(incremental_dir, force=True,
+                                            as_root=True)
+            except Exception:
+                exc_info = sys.exc_info()
+                if prefetch:
+                    # Wait for the unpack to terminate its restore command.
+                    prefetch.kill()
+                    try:
+                        prefetch.wait()
+                    except greenlet.GreenletExit:
+                        pass
+                six.reraise(*exc_info)
+            if prefetch:
+                prefetch.wait()
 
     def _run_restore(self):
         """Run incremental restore.
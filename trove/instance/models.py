@@ -20,6 +20,8 @@ from datetime import timedelta
 import os.path
 import re
 
+from eventlet import greenpool
+from eventlet.timeout import Timeout
 from novaclient import exceptions as nova_exceptions
 from oslo_config.cfg import NoSuchOptError
 from oslo_log import log as logging
@@ -1410,22 +1412,31 @@ class Instance(BuiltInstance):
 
 def create_server_list_matcher(server_list):
     # Returns a method which finds a server from the given list.
-    def find_server(instance_id, server_id):
-        matches = [server for server in server_list if server.id == server_id]
-        if len(matches) == 1:
-            return matches[0]
-        elif len(matches) < 1:
-            # The instance was not found in the list and
-            # this can happen if the instance is deleted from
-            # nova but still in trove database
-            raise exception.ComputeInstanceNotFound(
-                instance_id=instance_id, server_id=server_id)
+    # The list is indexed by server id once so that each lookup is O(1)
+    # instead of a scan of the whole list.
+    servers_by_id = {}
+    duplicate_ids = set()
+    for server in server_list or []:
+        if server.id in servers_by_id:
+            duplicate_ids.add(server.id)
         else:
+            servers_by_id[server.id] = server
+
+    def find_server(instance_id, server_id):
+        if server_id in duplicate_ids:
             # Should never happen, but never say never.
             LOG.error(_LE("Server %(server)s for instance %(instance)s was "
                           "found twice!"), {'server': server_id,
                                             'instance': instance_id})
             raise exception.TroveError(uuid=instance_id)
+        try:
+            return servers_by_id[server_id]
+        except KeyError:
+            # The instance was not found in the list and
+            # this can happen if the instance is deleted from
+            # nova but still in trove database
+            raise exception.ComputeInstanceNotFound(
+                instance_id=instance_id, server_id=server_id)
 
     return find_server
 
@@ -1442,7 +1453,6 @@ class Instances(object):
         if context is None:
             raise TypeError("Argument context not defined.")
         client = create_nova_client(context)
-        servers = client.servers.list()
         query_opts = {'tenant_id': context.tenant,
                       'deleted': False}
         if not include_clustered:
@@ -1461,6 +1471,11 @@ class Instances(object):
                                                   marker=context.marker)
         next_marker = data_view.next_page_marker
 
+        if CONF.instances_list_page_servers:
+            servers = Instances._load_page_servers(client,
+                                                   data_view.collection)
+        else:
+            servers = client.servers.list()
         find_server = create_server_list_matcher(servers)
         for db in db_infos:
             LOG.debug("Checking for db [id=%(db_id)s, "
@@ -1479,46 +1494,128 @@ class Instances(object):
                                   load_server=load_servers)
                 for db_inst in db_instances]
 
+    @staticmethod
+    def _load_page_servers(client, db_items):
+        """Fetch only the Nova servers backing the given instances.
+
+        Servers are fetched concurrently with one servers.get call each.
+        Instances that are still building or live in another region are
+        skipped since _load_servers_status does not look them up in the
+        server list.
+        """
+        server_ids = set(
+            db.compute_instance_id for db in db_items
+            if (db.compute_instance_id
+                and InstanceTasks.BUILDING != db.task_status
+                and (not db.region_id
+                     or db.region_id == CONF.os_region_name)))
+
+        def get_server(server_id):
+            try:
+                return client.servers.get(server_id)
+            except nova_exceptions.NotFound:
+                # The server was deleted from nova but the instance is still
+                # in the trove database; the matcher will report it missing.
+                LOG.debug("Could not find nova server_id(%s).", server_id)
+                return None
+
+        pool = greenpool.GreenPool(CONF.instances_list_server_workers)
+        return [server for server in pool.imap(get_server, server_ids)
+                if server is not None]
+
+    @staticmethod
+    def _load_remote_servers(context, db_items):
+        """Fetch the Nova servers of instances living in other regions.
+
+        A single Nova client is created per region and all the servers are
+        fetched concurrently, each request bounded by
+        instances_list_remote_server_timeout. Servers that could not be
+        fetched are left out of the result.
+        :return: the servers keyed by (region, compute instance id)
+        :rtype: dict
+        """
+        server_ids = set(
+            (db.region_id, db.compute_instance_id) for db in db_items
+            if (InstanceTasks.BUILDING != db.task_status
+                and db.region_id
+                and db.region_id != CONF.os_region_name))
+        if not server_ids:
+            return {}
+        clients = dict((region, create_nova_client(context,
+                                                   region_name=region))
+                       for region in set(region for region, _ in server_ids))
+
+        def get_server(region_server_id):
+            region, server_id = region_server_id
+            timeout = Timeout(CONF.instances_list_remote_server_timeout)
+            try:
+                return (region_server_id,
+                        clients[region].servers.get(server_id))
+            except Timeout as t:
+                if t is not timeout:
+                    raise  # not my timeout
+                LOG.warning(_LW("Timeout fetching server %(server)s from "
+                                "region %(region)s."),
+                            {'server': server_id, 'region': region})
+            except nova_exceptions.NotFound:
+                LOG.error(_LE("Could not find nova server_id(%(server)s) "
+                              "in region %(region)s."),
+                          {'server': server_id, 'region': region})
+            except nova_exceptions.ClientException as e:
+                LOG.warning(_LW("Error fetching server %(server)s from "
+                                "region %(region)s: %(error)s"),
+                            {'server': server_id, 'region': region,
+                             'error': e})
+            finally:
+                timeout.cancel()
+            return region_server_id, None
+
+        pool = greenpool.GreenPool(CONF.instances_list_server_workers)
+        return dict((region_server_id, server) for region_server_id, server
+                    in pool.imap(get_server, server_ids)
+                    if server is not None)
+
     @staticmethod
     def _load_servers_status(load_instance, context, db_items, find_server):
         ret = []
+        db_items = list(db_items)
+        service_statuses = InstanceServiceStatus.find_all_by_instance_ids(
+            [db.id for db in db_items])
+        remote_servers = Instances._load_remote_servers(context, db_items)
         for db in db_items:
             server = None
-            try:
-                # TODO(tim.simpson): Delete when we get notifications working!
-                if InstanceTasks.BUILDING == db.task_status:
-                    db.server_status = "BUILD"
+            # TODO(tim.simpson): Delete when we get notifications working!
+            if InstanceTasks.BUILDING == db.task_status:
+                db.server_status = "BUILD"
+                db.addresses = {}
+            else:
+                try:
+                    if (not db.region_id
+                            or db.region_id == CONF.os_region_name):
+                        server = find_server(db.id, db.compute_instance_id)
+                    else:
+                        server = remote_servers.get(
+                            (db.region_id, db.compute_instance_id))
+                        if server is None:
+                            raise exception.ComputeInstanceNotFound(
+                                instance_id=db.id,
+                                server_id=db.compute_instance_id)
+                    db.server_status = server.status
+                    db.addresses = server.addresses
+                except exception.ComputeInstanceNotFound:
+                    db.server_status = "SHUTDOWN"  # Fake it...
                     db.addresses = {}
-                else:
-                    try:
-                        if (not db.region_id
-                                or db.region_id == CONF.os_region_name):
-                            server = find_server(db.id, db.compute_instance_id)
-                        else:
-                            nova_client = create_nova_client(
-                                context, region_name=db.region_id)
-                            server = nova_client.servers.get(
-                                db.compute_instance_id)
-                        db.server_status = server.status
-                        db.addresses = server.addresses
-                    except exception.ComputeInstanceNotFound:
-                        db.server_status = "SHUTDOWN"  # Fake it...
-                        db.addresses = {}
-                # TODO(tim.simpson): End of hack.
-
-                # volumes = find_volumes(server.id)
-                datastore_status = InstanceServiceStatus.find_by(
-                    instance_id=db.id)
-                if not datastore_status.status:  # This should never happen.
-                    LOG.error(_LE("Server status could not be read for "
-                                  "instance id(%s)."), db.id)
-                    continue
-                LOG.debug("Server api_status(%s).",
-                          datastore_status.status.api_status)
-            except exception.ModelNotFoundError:
+            # TODO(tim.simpson): End of hack.
+
+            # volumes = find_volumes(server.id)
+            datastore_status = service_statuses.get(db.id)
+            # This should never happen.
+            if datastore_status is None or not datastore_status.status:
                 LOG.error(_LE("Server status could not be read for "
                               "instance id(%s)."), db.id)
                 continue
+            LOG.debug("Server api_status(%s).",
+                      datastore_status.status.api_status)
             ret.append(load_instance(context, db, datastore_status,
                                      server=server))
         return ret
@@ -1614,6 +1711,9 @@ class InstanceServiceStatus(dbmodels.DatabaseModelBase):
     _data_fields = ['instance_id', 'status_id', 'status_description',
                     'updated_at']
 
+    # Keeps IN clauses below the bound parameter limit of SQLite.
+    MAX_IDS_PER_QUERY = 500
+
     def __init__(self, status, **kwargs):
         kwargs["status_id"] = status.code
         kwargs["status_description"] = status.description
@@ -1649,6 +1749,25 @@ class InstanceServiceStatus(dbmodels.DatabaseModelBase):
         self['updated_at'] = utils.utcnow()
         return get_db_api().save(self)
 
+    @classmethod
+    def find_all_by_instance_ids(cls, instance_ids):
+        """
+        Loads the service statuses of many instances at once, using a
+        single IN query per batch of ids rather than a query per instance.
+        :param instance_ids: ids of the instances whose statuses to load
+        :return: the statuses keyed by instance id; instances that have no
+        status yet are not in the result
+        :rtype: dict
+        """
+        instance_ids = list(set(instance_ids))
+        statuses = {}
+        for index in range(0, len(instance_ids), cls.MAX_IDS_PER_QUERY):
+            batch = instance_ids[index:index + cls.MAX_IDS_PER_QUERY]
+            query = cls.query().filter(cls.instance_id.in_(batch))
+            for status in query.all():
+                statuses[status.instance_id] = status
+        return statuses
+
     status = property(get_status, set_status)
 
 
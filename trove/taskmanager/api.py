@@ -76,6 +76,14 @@ class API(object):
         except exception.ModelNotFoundError as e:
             LOG.error(e.message)
 
+    def instance_status_changed(self, instance_id, status):
+        LOG.debug("Notifying task managers that instance %(id)s is "
+                  "%(status)s." % {'id': instance_id, 'status': status})
+        # Sent to every task manager, as any of them may be waiting for it.
+        cctxt = self.client.prepare(version=self.version_cap, fanout=True)
+        cctxt.cast(self.context, "instance_status_changed",
+                   instance_id=instance_id, status=status)
+
     def resize_volume(self, new_size, instance_id):
         LOG.debug("Making async call to resize volume for instance: %s"
                   % instance_id)
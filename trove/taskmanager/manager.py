@@ -15,10 +15,12 @@
 
 from sets import Set
 
+from eventlet.timeout import Timeout
 from oslo_log import log as logging
 import oslo_messaging as messaging
 from oslo_service import periodic_task
 from oslo_utils import importutils
+import six
 
 from trove.backup.models import Backup
 import trove.common.cfg as cfg
@@ -32,12 +34,14 @@ from trove.common import remote
 import trove.common.rpc.version as rpc_version
 from trove.common import server_group as srv_grp
 from trove.common.strategies.cluster import strategy
+from trove.common import utils
 from trove.datastore.models import DatastoreVersion
 import trove.extensions.mgmt.instances.models as mgmtmodels
 from trove.instance.tasks import InstanceTasks
 from trove.taskmanager import models
 from trove.taskmanager.models import FreshInstanceTasks, BuiltInstanceTasks
 from trove.quota.quota import QUOTAS
+from trove.taskmanager import status_events
 
 LOG = logging.getLogger(__name__)
 CONF = cfg.CONF
@@ -82,6 +86,11 @@ class Manager(periodic_task.PeriodicTasks):
                                                             instance_id)
             instance_tasks.restart()
 
+    def instance_status_changed(self, context, instance_id, status):
+        LOG.debug("Instance %(id)s is %(status)s." %
+                  {'id': instance_id, 'status': status})
+        status_events.STATUS_EVENTS.notify(instance_id)
+
     def detach_replica(self, context, instance_id):
         with EndNotification(context):
             slave = models.BuiltInstanceTasks.load(context, instance_id)
@@ -91,10 +100,52 @@ class Manager(periodic_task.PeriodicTasks):
             if master.post_processing_required_for_replication():
                 slave_instances = [BuiltInstanceTasks.load(
                     context, slave_model.id) for slave_model in master.slaves]
-                slave_detail = [slave_instance.get_replication_detail()
-                                for slave_instance in slave_instances]
+                slave_detail = self._get_replication_details(
+                    slave_instances)
                 master.complete_master_setup(slave_detail)
 
+    def _get_replication_details(self, slaves):
+        def _get_replication_detail(slave):
+            return slave.get_replication_detail()
+
+        return utils.fan_out(_get_replication_detail, slaves,
+                             timeout=CONF.agent_call_high_timeout)
+
+    def _migrate_replicas(self, action, old_master, master_candidate,
+                          replica_models, replica_info):
+        """Move the replicas of old_master to master_candidate, all at
+        once, and return those that could not be moved. replica_info is
+        the replica context of master_candidate.
+        """
+        def _migrate_replica(replica):
+            replica.detach_replica(old_master, for_failover=True)
+            replica.attach_replica(master_candidate, replica_info)
+
+        replicas = [replica for replica in replica_models
+                    if replica.id != master_candidate.id]
+        try:
+            # Detaching and attaching are an agent call each.
+            utils.fan_out(_migrate_replica, replicas,
+                          timeout=2 * CONF.agent_call_high_timeout)
+        except exception.FanOutError as e:
+            exception_replicas = []
+            for (replica, error), exc_info in zip(e.failures, e.exc_infos):
+                if not isinstance(error, (exception.TroveError, Timeout)):
+                    six.reraise(*exc_info)
+                msg = _("%(action)s: Unable to migrate replica %(slave)s "
+                        "from old replica source %(old_master)s to new "
+                        "source %(new_master)s.")
+                msg_values = {
+                    "action": action,
+                    "slave": replica.id,
+                    "old_master": old_master.id,
+                    "new_master": master_candidate.id
+                }
+                LOG.error(msg % msg_values)
+                exception_replicas.append(replica)
+            return exception_replicas
+        return []
+
     def _set_task_status(self, instances, status):
         for instance in instances:
             setattr(instance.db_info, 'task_status', status)
@@ -110,10 +161,9 @@ class Manager(periodic_task.PeriodicTasks):
             master_ips = old_master.detach_public_ips()
             slave_ips = master_candidate.detach_public_ips()
             latest_txn_id = old_master.get_latest_txn_id()
-            master_candidate.wait_for_txn(latest_txn_id)
-            master_candidate.detach_replica(old_master, for_failover=True)
-            master_candidate.enable_as_master()
-            old_master.attach_replica(master_candidate)
+            replica_info = master_candidate.promote_to_master(
+                old_master, latest_txn_id)
+            old_master.attach_replica(master_candidate, replica_info)
             master_candidate.attach_public_ips(master_ips)
             master_candidate.make_read_only(False)
             old_master.attach_public_ips(slave_ips)
@@ -122,23 +172,9 @@ class Manager(periodic_task.PeriodicTasks):
             # should be a working master with some number of working slaves,
             # and possibly some number of "orphaned" slaves
 
-            exception_replicas = []
-            for replica in replica_models:
-                try:
-                    if replica.id != master_candidate.id:
-                        replica.detach_replica(old_master, for_failover=True)
-                        replica.attach_replica(master_candidate)
-                except exception.TroveError:
-                    msg = _("promote-to-replica-source: Unable to migrate "
-                            "replica %(slave)s from old replica source "
-                            "%(old_master)s to new source %(new_master)s.")
-                    msg_values = {
-                        "slave": replica.id,
-                        "old_master": old_master.id,
-                        "new_master": master_candidate.id
-                    }
-                    LOG.exception(msg % msg_values)
-                    exception_replicas.append(replica)
+            exception_replicas = self._migrate_replicas(
+                "promote-to-replica-source", old_master, master_candidate,
+                replica_models, replica_info)
 
             try:
                 old_master.demote_replication_master()
@@ -150,8 +186,8 @@ class Manager(periodic_task.PeriodicTasks):
                 new_slaves = list(replica_models)
                 new_slaves.remove(master_candidate)
                 new_slaves.append(old_master)
-                new_slaves_detail = [slave.get_replication_detail()
-                                     for slave in new_slaves]
+                new_slaves_detail = self._get_replication_details(
+                    new_slaves)
                 master_candidate.complete_master_setup(new_slaves_detail)
 
             self._set_task_status([old_master] + replica_models,
@@ -192,7 +228,11 @@ class Manager(periodic_task.PeriodicTasks):
 
     # pulled out to facilitate testing
     def _get_replica_txns(self, replica_models):
-        return [[repl] + repl.get_last_txn() for repl in replica_models]
+        def _get_replica_txn(repl):
+            return [repl] + repl.get_last_txn()
+
+        return utils.fan_out(_get_replica_txn, replica_models,
+                             timeout=CONF.agent_call_high_timeout)
 
     def _most_current_replica(self, old_master, replica_models):
         last_txns = self._get_replica_txns(replica_models)
@@ -211,35 +251,20 @@ class Manager(periodic_task.PeriodicTasks):
 
             master_ips = old_master.detach_public_ips()
             slave_ips = master_candidate.detach_public_ips()
-            master_candidate.detach_replica(old_master, for_failover=True)
-            master_candidate.enable_as_master()
+            replica_info = master_candidate.promote_to_master(old_master)
             master_candidate.attach_public_ips(master_ips)
             master_candidate.make_read_only(False)
             old_master.attach_public_ips(slave_ips)
 
-            exception_replicas = []
-            for replica in replica_models:
-                try:
-                    if replica.id != master_candidate.id:
-                        replica.detach_replica(old_master, for_failover=True)
-                        replica.attach_replica(master_candidate)
-                except exception.TroveError:
-                    msg = _("eject-replica-source: Unable to migrate "
-                            "replica %(slave)s from old replica source "
-                            "%(old_master)s to new source %(new_master)s.")
-                    msg_values = {
-                        "slave": replica.id,
-                        "old_master": old_master.id,
-                        "new_master": master_candidate.id
-                    }
-                    LOG.exception(msg % msg_values)
-                    exception_replicas.append(replica.id)
+            exception_replicas = self._migrate_replicas(
+                "eject-replica-source", old_master, master_candidate,
+                replica_models, replica_info)
 
             if master_candidate.post_processing_required_for_replication():
                 new_slaves = list(replica_models)
                 new_slaves.remove(master_candidate)
-                new_slaves_detail = [slave.get_replication_detail()
-                                     for slave in new_slaves]
+                new_slaves_detail = self._get_replication_details(
+                    new_slaves)
                 master_candidate.complete_master_setup(new_slaves_detail)
 
             self._set_task_status([old_master] + replica_models,
@@ -358,8 +383,8 @@ class Manager(periodic_task.PeriodicTasks):
                                    for slave in master_instance_tasks.slaves]
 
                 # Collect info from each slave post instance launch
-                slave_detail = [slave_instance.get_replication_detail()
-                                for slave_instance in slave_instances]
+                slave_detail = self._get_replication_details(
+                    slave_instances)
 
                 # Pass info of all replication nodes to the master for
                 # replication setup completion
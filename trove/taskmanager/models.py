@@ -12,16 +12,21 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import json
 import os.path
+import sys
 import time
 import traceback
+import urllib
 
 from cinderclient import exceptions as cinder_exceptions
+from eventlet import greenpool
 from eventlet import greenthread
 from heatclient import exc as heat_exceptions
 from novaclient import exceptions as nova_exceptions
 from oslo_log import log as logging
 from oslo_utils import timeutils
+import six
 from swiftclient.client import ClientException
 
 from trove.backup import models as bkup_models
@@ -55,6 +60,7 @@ from trove.common.remote import create_dns_client
 from trove.common.remote import create_heat_client
 from trove.common import server_group as srv_grp
 from trove.common.strategies.cluster import strategy
+from trove.common.strategies.storage import dedup
 from trove.common.strategies.storage import get_storage_strategy
 from trove.common import template
 from trove.common import utils
@@ -73,6 +79,7 @@ from trove.instance.models import InstanceStatus
 from trove.instance.tasks import InstanceTasks
 from trove.quota.quota import run_with_quotas
 from trove import rpc
+from trove.taskmanager import status_events
 
 LOG = logging.getLogger(__name__)
 CONF = cfg.CONF
@@ -241,10 +248,15 @@ class ClusterTasks(Cluster):
                     ((status == fast_fail_statuses) or
                      (status in fast_fail_statuses)))
 
+        def _get_statuses(ids):
+            # A single query for all the instances.
+            statuses = InstanceServiceStatus.find_all_by_instance_ids(ids)
+            return [(instance_id, statuses[instance_id].get_status()
+                     if instance_id in statuses else None)
+                    for instance_id in ids]
+
         def _all_have_status(ids):
-            for instance_id in ids:
-                status = InstanceServiceStatus.find_by(
-                    instance_id=instance_id).get_status()
+            for instance_id, status in _get_statuses(ids):
                 if _is_fast_fail_status(status):
                     # if one has failed, no need to continue polling
                     LOG.debug("Instance %s has acquired a fast-fail status %s."
@@ -260,21 +272,19 @@ class ClusterTasks(Cluster):
         def _instance_ids_with_failures(ids):
             LOG.debug("Checking for service failures on instances: %s"
                       % ids)
-            failed_instance_ids = []
-            for instance_id in ids:
-                status = InstanceServiceStatus.find_by(
-                    instance_id=instance_id).get_status()
-                if _is_fast_fail_status(status):
-                    failed_instance_ids.append(instance_id)
-            return failed_instance_ids
+            return [instance_id for instance_id, status in _get_statuses(ids)
+                    if _is_fast_fail_status(status)]
 
         LOG.debug("Polling until all instances acquire %s status: %s"
                   % (expected_status, instance_ids))
+        sleep_time = USAGE_SLEEP_TIME
+        if CONF.conductor_status_notifications:
+            # Woken up by the status changes, poll only in case one is lost.
+            sleep_time = CONF.cluster_status_fallback_interval
         try:
-            utils.poll_until(lambda: instance_ids,
-                             lambda ids: _all_have_status(ids),
-                             sleep_time=USAGE_SLEEP_TIME,
-                             time_out=CONF.usage_timeout)
+            status_events.STATUS_EVENTS.poll_until(
+                instance_ids, lambda: _all_have_status(instance_ids),
+                sleep_time=sleep_time, time_out=CONF.usage_timeout)
         except PollTimeOut:
             LOG.exception(_("Timed out while waiting for all instances "
                             "to become %s.") % expected_status)
@@ -297,9 +307,8 @@ class ClusterTasks(Cluster):
         LOG.debug("begin delete_cluster for id: %s" % cluster_id)
 
         def all_instances_marked_deleted():
-            db_instances = DBInstance.find_all(cluster_id=cluster_id,
-                                               deleted=False).all()
-            return len(db_instances) == 0
+            return DBInstance.find_all(cluster_id=cluster_id,
+                                       deleted=False).count() == 0
 
         try:
             utils.poll_until(all_instances_marked_deleted,
@@ -1213,10 +1222,11 @@ class BuiltInstanceTasks(BuiltInstance, NotifyMixin, ConfigurationMixin):
             if not for_failover:
                 self.reset_task_status()
 
-    def attach_replica(self, master):
+    def attach_replica(self, master, replica_info=None):
         LOG.debug("Calling attach_replica on %s" % self.id)
         try:
-            replica_info = master.guest.get_replica_context()
+            if replica_info is None:
+                replica_info = master.guest.get_replica_context()
             flavor = self.nova_client.flavors.get(self.flavor_id)
             slave_config = self._render_replica_config(flavor).config_contents
             self.guest.attach_replica(replica_info, slave_config)
@@ -1264,6 +1274,31 @@ class BuiltInstanceTasks(BuiltInstance, NotifyMixin, ConfigurationMixin):
         self.slave_list = None
         self.guest.enable_as_master(replica_source_config.config_contents)
 
+    def promote_to_master(self, old_master, txn=None):
+        """Detach this replica from old_master, once it has caught up to
+        txn, and enable it as the master. The guest calls are made in two
+        batches so that the replication link is cleared in the database as
+        soon as the replica is detached, and the replica context of the new
+        master is returned for the other replicas to attach to it.
+        """
+        LOG.debug("Calling promote_to_master on %s" % self.id)
+        flavor = self.nova_client.flavors.get(self.flavor_id)
+        replica_source_config = self._render_replica_source_config(flavor)
+        try:
+            with self.guest.batch() as batch:
+                if txn:
+                    batch.wait_for_txn(txn)
+                batch.detach_replica(True)
+            self.update_db(slave_of_id=None)
+            self.slave_list = None
+            with self.guest.batch() as batch:
+                batch.enable_as_master(replica_source_config.config_contents)
+                batch.get_replica_context()
+        except (GuestError, GuestTimeout):
+            LOG.exception(_("Failed to promote replica %s.") % self.id)
+            raise
+        return batch.results[-1]
+
     def complete_master_setup(self, dbs):
         self.guest.complete_master_setup(dbs)
 
@@ -1473,26 +1508,138 @@ class BackupTasks(object):
         container = storage.get_container_name()
         client = remote.create_swift_client(context)
         obj = client.head_object(container, filename)
+        if dedup.is_manifest(obj):
+            cls._delete_chunk_manifest(context, client, container, filename)
+            return
         manifest = obj.get('x-object-manifest', '')
         cont, prefix = cls._parse_manifest(manifest)
         if all([cont, prefix]):
             # This is a manifest file, first delete all segments.
             LOG.debug("Deleting files with prefix: %(cont)s/%(prefix)s" %
                       {'cont': cont, 'prefix': prefix})
-            # list files from container/prefix specified by manifest
-            headers, segments = client.get_container(cont, prefix=prefix)
+            # list all files from container/prefix specified by manifest
+            headers, segments = client.get_container(cont, prefix=prefix,
+                                                     full_listing=True)
             LOG.debug(headers)
-            for segment in segments:
-                name = segment.get('name')
-                if name:
-                    LOG.debug("Deleting file: %(cont)s/%(name)s" %
-                              {'cont': cont, 'name': name})
-                    client.delete_object(cont, name)
+            names = [segment['name'] for segment in segments
+                     if segment.get('name')]
+            cls._delete_segments(context, client, cont, names, filename)
         # Delete the manifest file
         LOG.debug("Deleting file: %(cont)s/%(filename)s" %
                   {'cont': cont, 'filename': filename})
         client.delete_object(container, filename)
 
+    @classmethod
+    def _bulk_delete_limit(cls, client):
+        """Return the maximum number of objects deleted by a bulk-delete
+        request, or None if Swift does not support bulk-delete.
+        """
+        try:
+            capabilities = client.get_capabilities()
+        except Exception:
+            LOG.debug("Could not get the capabilities of Swift.")
+            return None
+        bulk_delete = capabilities.get('bulk_delete')
+        if not bulk_delete:
+            return None
+        return bulk_delete.get('max_deletes_per_request', 10000)
+
+    @classmethod
+    def _bulk_delete(cls, client, cont, names):
+        """Delete objects with a single bulk-delete request."""
+        data = '\n'.join(
+            urllib.quote('/%s/%s' % (cont, name.encode('utf-8')))
+            for name in names)
+        headers = {'Accept': 'application/json',
+                   'Content-Type': 'text/plain'}
+        resp_headers, body = client.post_account(
+            headers, query_string='bulk-delete', data=data)
+        result = json.loads(body)
+        if result.get('Errors'):
+            raise ClientException(
+                "Bulk delete failed: %(status)s %(errors)s" %
+                {'status': result.get('Response Status'),
+                 'errors': result['Errors']})
+        return len(names)
+
+    @classmethod
+    def _delete_segments(cls, context, client, cont, names, filename):
+        """Delete the segments of a backup.
+
+        Segments are deleted with Swift bulk-delete requests when Swift
+        supports them, otherwise with a pool of concurrent deletes, each
+        over its own connection.
+        """
+        total = len(names)
+        LOG.info(_("Deleting %(total)d segments of %(filename)s.") %
+                 {'total': total, 'filename': filename})
+        limit = cls._bulk_delete_limit(client)
+        if limit:
+            deleted = 0
+            try:
+                for start in range(0, total, limit):
+                    deleted += cls._bulk_delete(client, cont,
+                                                names[start:start + limit])
+                    LOG.info(_("Deleted %(deleted)d of %(total)d segments "
+                               "of %(filename)s.") %
+                             {'deleted': deleted, 'total': total,
+                              'filename': filename})
+                return
+            except (TypeError, ClientException) as e:
+                # The post_account of older python-swiftclient releases
+                # does not take query_string and data, and raises
+                # TypeError. The objects that a bulk-delete request failed
+                # on are retried one at a time as well, so that the error
+                # of the object delete is reported.
+                LOG.warning(_("Bulk-delete of the segments of %(filename)s "
+                              "failed, deleting them one at a time: "
+                              "%(error)s") %
+                            {'filename': filename, 'error': e})
+                names = names[deleted:]
+                total = len(names)
+
+        connections = [client]
+
+        def _delete(name):
+            if connections:
+                connection = connections.pop()
+            else:
+                connection = remote.create_swift_client(context)
+            try:
+                LOG.debug("Deleting file: %(cont)s/%(name)s" %
+                          {'cont': cont, 'name': name})
+                connection.delete_object(cont, name)
+            except ClientException as e:
+                if e.http_status != 404:
+                    return sys.exc_info()
+            except Exception:
+                return sys.exc_info()
+            finally:
+                connections.append(connection)
+
+        pool = greenpool.GreenPool(CONF.backup_delete_workers)
+        for deleted, error in enumerate(pool.imap(_delete, names), 1):
+            if error:
+                six.reraise(*error)
+            if deleted % 1000 == 0 or deleted == total:
+                LOG.info(_("Deleted %(deleted)d of %(total)d segments of "
+                           "%(filename)s.") %
+                         {'deleted': deleted, 'total': total,
+                          'filename': filename})
+
+    @classmethod
+    def _delete_chunk_manifest(cls, context, client, container, filename):
+        # The chunks of a deduplicated backup may be shared with other
+        # backups; delete those no backup refers to anymore.
+        LOG.debug("Deleting chunk manifest: %(cont)s/%(filename)s" %
+                  {'cont': container, 'filename': filename})
+        client.delete_object(container, filename)
+        if bkup_models.Backup.running_for_tenant(context.tenant):
+            LOG.debug("A backup is running, not deleting unreferenced "
+                      "chunks of %s." % container)
+            return
+        dedup.sweep_chunks(client, container)
+
     @classmethod
     def delete_backup(cls, context, backup_id):
         """Delete backup from swift."""
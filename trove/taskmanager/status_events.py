@@ -0,0 +1,88 @@
+# Copyright 2016 Tesora Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import contextlib
+import time
+
+from eventlet import queue
+from oslo_log import log as logging
+
+from trove.common import exception
+
+LOG = logging.getLogger(__name__)
+
+
+class InstanceStatusEvents(object):
+    """Wakes up the green threads of the task manager that wait for
+    instances to change status.
+
+    When conductor_status_notifications is set, the Conductor casts
+    instance_status_changed to all the task managers whenever a heartbeat
+    changes the service status of an instance, and the task manager passes
+    it on to notify().
+    """
+
+    def __init__(self):
+        # instance_id -> queues of the waiters watching it
+        self._watchers = collections.defaultdict(set)
+
+    @contextlib.contextmanager
+    def watch(self, instance_ids):
+        """Yield a queue that receives the ids of the given instances when
+        they change status.
+        """
+        changes = queue.LightQueue()
+        for instance_id in instance_ids:
+            self._watchers[instance_id].add(changes)
+        try:
+            yield changes
+        finally:
+            for instance_id in instance_ids:
+                watchers = self._watchers.get(instance_id)
+                if watchers is not None:
+                    watchers.discard(changes)
+                    if not watchers:
+                        del self._watchers[instance_id]
+
+    def notify(self, instance_id):
+        for changes in list(self._watchers.get(instance_id, ())):
+            changes.put(instance_id)
+
+    def poll_until(self, instance_ids, condition, sleep_time, time_out):
+        """Wait until condition() is true, like utils.poll_until, checking
+        it as soon as one of the instances changes status and at least
+        every sleep_time seconds otherwise.
+
+        PollTimeOut is raised after time_out seconds.
+        """
+        deadline = time.time() + time_out
+        with self.watch(instance_ids) as changes:
+            while not condition():
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise exception.PollTimeOut
+                try:
+                    instance_id = changes.get(
+                        timeout=min(sleep_time, remaining))
+                    LOG.debug("Instance %s changed status." % instance_id)
+                    # Check the condition once for all pending changes.
+                    while not changes.empty():
+                        changes.get_nowait()
+                except queue.Empty:
+                    pass
+
+
+STATUS_EVENTS = InstanceStatusEvents()
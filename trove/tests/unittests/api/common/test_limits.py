@@ -18,7 +18,9 @@ Tests dealing with HTTP rate-limiting.
 """
 
 import httplib
-
+import os
+import shutil
+import tempfile
 
 from mock import Mock, MagicMock, patch
 from oslo_serialization import jsonutils
@@ -485,6 +487,248 @@ class LimiterTest(BaseLimitTestSuite):
         self.assertEqual(expected, results)
 
 
+class BucketLimiterTest(BaseLimitTestSuite):
+    """
+    Tests for the in-memory `limits.BucketLimiter` class.
+    """
+
+    def setUp(self):
+        super(BucketLimiterTest, self).setUp()
+        userlimits = {'user:user3': '', 'eviction_interval': '60'}
+        self.limiter = limits.BucketLimiter(TEST_LIMITS, **userlimits)
+        self.set_time(0.0)
+
+    def set_time(self, now):
+        self.limiter._get_time = Mock(return_value=now)
+
+    def _check(self, num, verb, url, username=None):
+        """Check and yield results from checks."""
+        for x in range(num):
+            yield self.limiter.check_for_delay(verb, url, username)[0]
+
+    def test_no_delay_GET(self):
+        delay = self.limiter.check_for_delay("GET", "/anything")
+        self.assertEqual((None, None), delay)
+
+    def test_delay_PUT(self):
+        expected = [None] * 10 + [6.0]
+        results = list(self._check(11, "PUT", "/anything"))
+        self.assertEqual(expected, results)
+
+    def test_delay_POST_mgmt(self):
+        expected = [None] * 3
+        results = list(self._check(3, "POST", "/mgmt"))
+        self.assertEqual(expected, results)
+
+        delay, error = self.limiter.check_for_delay("POST", "/mgmt")
+        self.assertAlmostEqual(60.0 / 3.0, delay, 4)
+        self.assertEqual(
+            "Only 3 POST request(s) can be made to /mgmt every minute.",
+            error)
+
+    def test_delay_GET_dispatch(self):
+        self.assertEqual([None], list(self._check(1, "GET", "/delayed")))
+        self.assertEqual([60.0], list(self._check(1, "GET", "/delayed")))
+        self.assertEqual([None] * 5, list(self._check(5, "GET", "/other")))
+
+    def test_multiple_delays(self):
+        expected = [None] * 10 + [6.0] * 10
+        results = list(self._check(20, "PUT", "/anything"))
+        self.assertEqual(expected, results)
+
+        self.set_time(1.0)
+        expected = [5.0] * 10
+        results = list(self._check(10, "PUT", "/anything"))
+        self.assertEqual(expected, results)
+
+    def test_delay_PUT_wait(self):
+        list(self._check(11, "PUT", "/anything"))
+        self.set_time(6.0)
+        expected = [None, 6.0]
+        results = list(self._check(2, "PUT", "/anything"))
+        self.assertEqual(expected, results)
+
+    def test_multiple_users(self):
+        expected = [None] * 10 + [6.0] * 10
+        results = list(self._check(20, "PUT", "/anything", "user1"))
+        self.assertEqual(expected, results)
+
+        expected = [None] * 10 + [6.0] * 5
+        results = list(self._check(15, "PUT", "/anything", "user2"))
+        self.assertEqual(expected, results)
+
+        expected = [None] * 20
+        results = list(self._check(20, "PUT", "/anything", "user3"))
+        self.assertEqual(expected, results)
+
+    def test_get_limits(self):
+        list(self._check(5, "PUT", "/anything", "user1"))
+        put_limit = [limit for limit in self.limiter.get_limits("user1")
+                     if limit["verb"] == "PUT"][0]
+        self.assertEqual(5, put_limit["remaining"])
+        self.assertEqual(0, put_limit["resetTime"])
+        self.assertEqual([], self.limiter.get_limits("user3"))
+
+    def test_idle_users_evicted(self):
+        list(self._check(10, "PUT", "/anything", "user1"))
+        list(self._check(1, "PUT", "/anything", "user2"))
+        self.assertEqual(2, self.limiter.stats()["users"])
+
+        # user2's bucket has drained, user1's has not.
+        self.set_time(60.0 / 10 + 1)
+        self.limiter.next_eviction = 0
+        self.limiter.check_for_delay("GET", "/anything")
+
+        stats = self.limiter.stats()
+        self.assertEqual(1, stats["users"])
+        self.assertEqual(1, stats["evicted"])
+        self.assertEqual(12, stats["checks"])
+
+    def test_middleware_selects_bucket_limiter(self):
+        app = limits.RateLimitingMiddleware(
+            Mock(), '(GET, *, .*, 1, MINUTE)',
+            'trove.common.limits.BucketLimiter')
+        self.assertIsInstance(app._limiter, limits.BucketLimiter)
+
+
+class FakeMemcacheClient(object):
+
+    def __init__(self):
+        self.data = {}
+        self.cas_ids = {}
+        self.requests = 0
+
+    def _set(self, key, value):
+        self.data[key] = value
+        self.cas_ids[key] = self.cas_ids.get(key, 0) + 1
+
+    def gets_many(self, keys):
+        self.requests += 1
+        return {key: (self.data[key], self.cas_ids[key])
+                for key in keys if key in self.data}
+
+    def add(self, key, value, expire=0):
+        self.requests += 1
+        if key in self.data:
+            return False
+        self._set(key, value)
+        return True
+
+    def cas(self, key, value, cas, expire=0):
+        self.requests += 1
+        if self.cas_ids.get(key) != cas:
+            return False
+        self._set(key, value)
+        return True
+
+    def get_many(self, keys):
+        self.requests += 1
+        return {key: self.data[key] for key in keys if key in self.data}
+
+
+class SharedBucketLimiterTest(BaseLimitTestSuite):
+    """
+    Tests for the `limits.SharedBucketLimiter` class.
+    """
+
+    def setUp(self):
+        super(SharedBucketLimiterTest, self).setUp()
+        self.state_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.state_dir)
+        self.path = os.path.join(self.state_dir, 'ratelimit')
+
+    def _workers(self, count, **kwargs):
+        workers = []
+        for x in range(count):
+            worker = limits.SharedBucketLimiter(
+                TEST_LIMITS, path=self.path, **kwargs)
+            worker._get_time = Mock(return_value=0.0)
+            workers.append(worker)
+        return workers
+
+    def _accepted(self, workers, num, username="tenant"):
+        accepted = 0
+        for x in range(num):
+            for worker in workers:
+                delay, error = worker.check_for_delay(
+                    "PUT", "/anything", username)
+                if not delay:
+                    accepted += 1
+        return accepted
+
+    def test_workers_share_limits(self):
+        workers = self._workers(2, sync_interval='0')
+        # A worker only learns about the last request of the other one on
+        # its next sync, so it may accept one request too many.
+        self.assertEqual(11, self._accepted(workers, 10))
+
+    def test_unshared_workers_each_get_limits(self):
+        workers = self._workers(2, sync_interval='60')
+        self.assertEqual(20, self._accepted(workers, 10))
+
+    def test_state_survives_restart(self):
+        worker, = self._workers(1, sync_interval='0')
+        self.assertEqual(10, self._accepted([worker], 10))
+        worker.sync()
+
+        restarted, = self._workers(1, sync_interval='0')
+        self.assertEqual(0, self._accepted([restarted], 5))
+
+    def test_sync_interval(self):
+        worker, = self._workers(1, sync_interval='5')
+        self._accepted([worker], 3)
+        self.assertEqual(1, worker.stats()["syncs"])
+        worker._get_time.return_value = 5.0
+        self._accepted([worker], 1)
+        self.assertEqual(2, worker.stats()["syncs"])
+
+    def test_memcached_shared_state(self):
+        client = FakeMemcacheClient()
+        workers = []
+        for x in range(2):
+            worker = limits.SharedBucketLimiter(
+                TEST_LIMITS, shared_state=limits.MemcachedSharedState,
+                client=client, sync_interval='0')
+            worker._get_time = Mock(return_value=0.0)
+            workers.append(worker)
+        self.assertEqual(11, self._accepted(workers, 10))
+
+    def test_memcached_shared_state_requests(self):
+        client = FakeMemcacheClient()
+        state = limits.MemcachedSharedState(client=client)
+        consumed = dict(('key-%d' % x, 1.0) for x in range(10))
+        others = ['other-%d' % x for x in range(10)]
+        result = state.sync(consumed, list(consumed) + others, 0.0)
+        self.assertEqual(1.0, result['key-0'])
+        self.assertEqual(0.0, result['other-0'])
+        # One read of the consumed keys, one add per key and one read of
+        # the other keys.
+        self.assertEqual(12, client.requests)
+
+    @patch.object(limits.LOG, 'warning')
+    def test_memcached_shared_state_contention(self, mock_warning):
+        client = FakeMemcacheClient()
+        state = limits.MemcachedSharedState(client=client)
+        state.sync({'key': 1.0}, [], 0.0)
+        # Another worker updates the key between every read and write.
+        real_gets_many = client.gets_many
+
+        def gets_many(keys):
+            values = real_gets_many(keys)
+            for key in keys:
+                client._set(key, client.data[key])
+            return values
+
+        with patch.object(client, 'gets_many', side_effect=gets_many):
+            state.sync({'key': 2.0}, [], 0.0)
+        self.assertEqual(1, mock_warning.call_count)
+        self.assertEqual({'key': 2.0}, state.unsynced)
+
+        result = state.sync({'key': 3.0}, [], 0.0)
+        self.assertEqual(6.0, result['key'])
+        self.assertEqual({}, state.unsynced)
+
+
 class WsgiLimiterTest(BaseLimitTestSuite):
     """
     Tests for `limits.WsgiLimiter` class.
@@ -304,6 +304,29 @@ class BackupORMTest(trove_testtools.TestCase):
             self.context, self.instance_id, include_incremental=False)
         self.assertEqual(BACKUP_NAME_4, backup.name)
 
+    def test_get_last_completed_not_on_first_page(self):
+        self.patch_conf_property('backups_page_size', 1)
+        models.DBBackup.create(tenant_id=self.context.tenant,
+                               name=BACKUP_NAME_3,
+                               state=BACKUP_STATE_COMPLETED,
+                               instance_id=self.instance_id,
+                               size=2.0,
+                               deleted=False)
+        models.DBBackup.create(tenant_id=self.context.tenant,
+                               name=BACKUP_NAME_4,
+                               state=BACKUP_STATE,
+                               instance_id=self.instance_id,
+                               size=2.0,
+                               deleted=False)
+
+        backup = models.Backup.get_last_completed(
+            self.context, self.instance_id)
+        self.assertEqual(BACKUP_NAME_3, backup.name)
+
+    def test_get_last_completed_none(self):
+        self.assertIsNone(models.Backup.get_last_completed(
+            self.context, 'non-existent'))
+
     def test_running(self):
         running = models.Backup.running(instance_id=self.instance_id)
         self.assertTrue(running)
@@ -317,6 +340,13 @@ class BackupORMTest(trove_testtools.TestCase):
                                             exclude=self.backup.id)
         self.assertFalse(not_running)
 
+    def test_running_for_tenant(self):
+        running = models.Backup.running_for_tenant(self.context.tenant)
+        self.assertEqual(self.backup.id, running.id)
+
+    def test_not_running_for_tenant(self):
+        self.assertIsNone(models.Backup.running_for_tenant('non-existent'))
+
     def test_is_running(self):
         self.assertTrue(self.backup.is_running)
 
@@ -384,36 +414,69 @@ class PaginationTests(trove_testtools.TestCase):
     def test_pagination_list(self):
         # page one
         backups, marker = models.Backup.list(self.context)
-        self.assertEqual(20, marker)
+        self.assertIsNotNone(marker)
         self.assertEqual(20, len(backups))
+        seen = set(backup.id for backup in backups)
         # page two
-        self.context.marker = 20
+        self.context.marker = marker
         backups, marker = models.Backup.list(self.context)
-        self.assertEqual(40, marker)
+        self.assertIsNotNone(marker)
         self.assertEqual(20, len(backups))
+        seen.update(backup.id for backup in backups)
         # page three
-        self.context.marker = 40
+        self.context.marker = marker
         backups, marker = models.Backup.list(self.context)
         self.assertIsNone(marker)
         self.assertEqual(10, len(backups))
+        seen.update(backup.id for backup in backups)
+        self.assertEqual(50, len(seen))
 
     def test_pagination_list_for_instance(self):
         # page one
         backups, marker = models.Backup.list_for_instance(self.context,
                                                           self.instance_id)
-        self.assertEqual(20, marker)
+        self.assertIsNotNone(marker)
         self.assertEqual(20, len(backups))
+        seen = set(backup.id for backup in backups)
         # page two
-        self.context.marker = 20
-        backups, marker = models.Backup.list(self.context)
-        self.assertEqual(40, marker)
+        self.context.marker = marker
+        backups, marker = models.Backup.list_for_instance(self.context,
+                                                          self.instance_id)
+        self.assertIsNotNone(marker)
         self.assertEqual(20, len(backups))
+        seen.update(backup.id for backup in backups)
         # page three
-        self.context.marker = 40
+        self.context.marker = marker
         backups, marker = models.Backup.list_for_instance(self.context,
                                                           self.instance_id)
         self.assertIsNone(marker)
         self.assertEqual(10, len(backups))
+        seen.update(backup.id for backup in backups)
+        self.assertEqual(50, len(seen))
+
+    def test_pagination_new_backup(self):
+        backups, marker = models.Backup.list(self.context)
+        models.DBBackup.create(tenant_id=self.context.tenant,
+                               name='Backup-new', state=BACKUP_STATE,
+                               instance_id=self.instance_id, size=2.0,
+                               deleted=False)
+        self.context.marker = marker
+        next_backups, marker = models.Backup.list(self.context)
+        # the next page is not shifted by the new backup
+        self.assertEqual(20, len(next_backups))
+        self.assertFalse(set(backup.id for backup in backups) &
+                         set(backup.id for backup in next_backups))
+
+    def test_pagination_offset_marker(self):
+        self.context.marker = 40
+        backups, marker = models.Backup.list(self.context)
+        self.assertIsNone(marker)
+        self.assertEqual(10, len(backups))
+
+    def test_pagination_invalid_marker(self):
+        self.context.marker = 'not-a-marker'
+        self.assertRaises(exception.BadRequest,
+                          models.Backup.list, self.context)
 
 
 class OrderingTests(trove_testtools.TestCase):
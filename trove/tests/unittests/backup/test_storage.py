@@ -12,11 +12,20 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import functools
 import hashlib
+import os
+import StringIO
+import time
 
+import eventlet
 from mock import Mock, MagicMock, patch
+from oslo_utils import timeutils
+from swiftclient.client import ClientException
 
 from trove.common import remote
+from trove.common.strategies.storage import dedup
+from trove.common.strategies.storage import swift
 from trove.common.strategies.storage.swift import StreamReader
 from trove.common.strategies.storage.swift \
     import SwiftDownloadIntegrityError
@@ -131,6 +140,183 @@ class SwiftStorageSaveChecksumTests(trove_testtools.TestCase):
                          "Incorrect swift location was returned.")
 
 
+class SwiftStorageParallelSaveTests(trove_testtools.TestCase):
+    """SwiftStorage.save uploading several segments concurrently."""
+
+    def setUp(self):
+        super(SwiftStorageParallelSaveTests, self).setUp()
+        self.context = trove_testtools.TroveTestContext(self)
+        self.swift_client = FakeSwiftConnection()
+        create_swift_client_patch = patch.object(
+            remote, 'create_swift_client', return_value=self.swift_client)
+        self.create_swift_client = create_swift_client_patch.start()
+        self.addCleanup(create_swift_client_patch.stop)
+        # Segments of two chunks each.
+        stream_reader_patch = patch.object(
+            swift, 'StreamReader', functools.partial(
+                StreamReader, max_file_size=2 * swift.CHUNK_SIZE))
+        stream_reader_patch.start()
+        self.addCleanup(stream_reader_patch.stop)
+        workers_patch = patch.object(swift, 'UPLOAD_WORKERS', 3)
+        workers_patch.start()
+        self.addCleanup(workers_patch.stop)
+        self.data = os.urandom(6 * swift.CHUNK_SIZE + 10)
+
+    def _save(self, filename):
+        storage_strategy = SwiftStorage(self.context)
+        return storage_strategy.save(filename, StringIO.StringIO(self.data))
+
+    def test_save(self):
+        success, note, checksum, location = self._save('123.gz.enc')
+
+        self.assertTrue(success, "The backup should have been successful.")
+        objects = self.swift_client.container_objects
+        self.assertEqual(['123_%08d' % i for i in range(4)], sorted(objects))
+        self.assertEqual(self.data,
+                         ''.join(objects[name] for name in sorted(objects)))
+        swift_checksum = hashlib.md5()
+        for name in sorted(objects):
+            swift_checksum.update(hashlib.md5(objects[name]).hexdigest())
+        self.assertEqual(swift_checksum.hexdigest(), checksum)
+        self.assertEqual('database_backups/123_',
+                         self.swift_client.manifest_prefix)
+
+    def test_save_matches_sequential_save(self):
+        success, note, checksum, location = self._save('123.gz.enc')
+        with patch.object(swift, 'UPLOAD_WORKERS', 1):
+            self.assertEqual((success, note, checksum, location),
+                             self._save('123.gz.enc'))
+
+    def test_each_upload_has_its_own_connection(self):
+        def _put_object(*args, **kwargs):
+            # Yield so that the other uploads run concurrently.
+            eventlet.sleep(0)
+            return put_object(*args, **kwargs)
+
+        put_object = self.swift_client.put_object
+        with patch.object(self.swift_client, 'put_object',
+                          side_effect=_put_object):
+            success, note, checksum, location = self._save('123.gz.enc')
+
+        self.assertTrue(success, "The backup should have been successful.")
+        # The first upload reuses the strategy connection.
+        self.assertEqual(3, self.create_swift_client.call_count)
+
+    @patch.object(swift, 'LOG')
+    def test_segment_checksum_etag_mismatch(self, mock_logging):
+        success, note, checksum, location = self._save(
+            'bad_segment_etag_123.gz.enc')
+
+        self.assertFalse(success, "The backup should have failed!")
+        self.assertTrue(note.startswith("Error saving data to Swift!"))
+        self.assertIsNone(checksum)
+        self.assertIsNone(self.swift_client.manifest_name)
+
+    def test_upload_error_raised(self):
+        with patch.object(self.swift_client, 'put_object',
+                          side_effect=swift.DownloadError()):
+            self.assertRaises(swift.DownloadError, self._save, '123.gz.enc')
+
+
+class SwiftStorageParallelLoadTests(trove_testtools.TestCase):
+    """SwiftStorage.load downloading several segments concurrently."""
+
+    def setUp(self):
+        super(SwiftStorageParallelLoadTests, self).setUp()
+        self.context = trove_testtools.TroveTestContext(self)
+        self.swift_client = FakeSwiftConnection()
+        create_swift_client_patch = patch.object(
+            remote, 'create_swift_client', return_value=self.swift_client)
+        self.create_swift_client = create_swift_client_patch.start()
+        self.addCleanup(create_swift_client_patch.stop)
+        workers_patch = patch.object(swift, 'DOWNLOAD_WORKERS', 3)
+        workers_patch.start()
+        self.addCleanup(workers_patch.stop)
+
+        self.segments = dict(('123_%08d' % i, os.urandom(1000 + i))
+                             for i in range(12))
+        self.data = ''.join(self.segments[name]
+                            for name in sorted(self.segments))
+        manifest_checksum = hashlib.md5()
+        for name in sorted(self.segments):
+            manifest_checksum.update(
+                hashlib.md5(self.segments[name]).hexdigest())
+        self.checksum = manifest_checksum.hexdigest()
+        self.location = 'http://mockswift/v1/database_backups/123.gz.enc'
+
+        self.swift_client.head_object = Mock(return_value={
+            'etag': '"%s"' % self.checksum,
+            'x-object-manifest': 'database_backups/123_'})
+        # Listed out of order, like any listing the manifest does not trust.
+        self.swift_client.get_container = Mock(return_value=(
+            {}, [{'name': name} for name in reversed(sorted(self.segments))]))
+        self.swift_client.get_object = Mock(side_effect=self._get_object)
+
+    def _get_object(self, container, name, resp_chunk_size=None):
+        # Yield so that the other downloads run concurrently.
+        eventlet.sleep(0)
+        data = self.segments[name]
+        headers = {'etag': hashlib.md5(data).hexdigest()}
+        return headers, iter([data[:100], data[100:]])
+
+    def test_load(self):
+        storage_strategy = SwiftStorage(self.context)
+        stream = storage_strategy.load(self.location, self.checksum)
+
+        self.assertEqual(self.data, ''.join(stream))
+        self.swift_client.get_container.assert_called_once_with(
+            'database_backups', prefix='123_', full_listing=True)
+        self.assertEqual(12, self.swift_client.get_object.call_count)
+        # The first download reuses the strategy connection.
+        self.assertEqual(3, self.create_swift_client.call_count)
+
+    def test_read_ahead_is_bounded(self):
+        storage_strategy = SwiftStorage(self.context)
+        stream = storage_strategy.load(self.location, self.checksum)
+
+        next(stream)
+        eventlet.sleep(0)
+        eventlet.sleep(0)
+        # The segment being streamed and the ones read ahead.
+        self.assertEqual(4, self.swift_client.get_object.call_count)
+        stream.close()
+
+    @patch.object(swift, 'LOG')
+    def test_manifest_checksum_mismatch(self, mock_logging):
+        storage_strategy = SwiftStorage(self.context)
+        self.assertRaises(SwiftDownloadIntegrityError,
+                          storage_strategy.load, self.location, 'bad-md5')
+        self.assertFalse(self.swift_client.get_object.called)
+
+    @patch.object(swift, 'LOG')
+    def test_segment_checksum_mismatch(self, mock_logging):
+        def _get_object(container, name, resp_chunk_size=None):
+            headers, body = self._get_object(container, name)
+            if name == '123_00000005':
+                # Truncated while downloading.
+                body = iter([self.segments[name][:-1]])
+            return headers, body
+
+        self.swift_client.get_object = Mock(side_effect=_get_object)
+        storage_strategy = SwiftStorage(self.context)
+        stream = storage_strategy.load(self.location, self.checksum)
+
+        self.assertRaises(SwiftDownloadIntegrityError, ''.join, stream)
+
+    def test_not_a_manifest(self):
+        self.swift_client.head_object = Mock(return_value={
+            'etag': '"fake-md5-sum"'})
+        self.swift_client.get_object = Mock(return_value=(
+            {'etag': '"fake-md5-sum"'}, iter(['data'])))
+        storage_strategy = SwiftStorage(self.context)
+        with patch.object(storage_strategy, '_load_segments_parallel') as \
+                load_segments:
+            stream = storage_strategy.load(self.location, 'fake-md5-sum')
+        self.assertEqual('data', ''.join(stream))
+        self.assertFalse(load_segments.called)
+        self.assertFalse(self.swift_client.get_container.called)
+
+
 class SwiftStorageUtils(trove_testtools.TestCase):
 
     def setUp(self):
@@ -332,3 +518,287 @@ class SwiftMetadataTests(trove_testtools.TestCase):
         }
         self.swift_client.post_object.assert_called_with(
             'backups', 'mybackup.tar', headers=headers)
+
+
+class InMemorySwiftConnection(object):
+    """A Swift connection keeping the objects of a container in memory."""
+
+    url = 'http://mockswift/v1'
+
+    def __init__(self):
+        self.objects = {}
+        self.content_types = {}
+        self.metadata = {}
+        self.last_modified = {}
+        self.put_object = Mock(side_effect=self._put_object)
+        self.head_object = Mock(side_effect=self._head_object)
+
+    def put_container(self, container):
+        pass
+
+    def _put_object(self, container, name, contents, content_type=None,
+                    **kwargs):
+        self.objects[name] = contents
+        self.content_types[name] = content_type
+        self.metadata[name] = {}
+        self.last_modified[name] = timeutils.utcnow().isoformat()
+        return hashlib.md5(contents).hexdigest()
+
+    def post_object(self, container, name, headers):
+        self.metadata[name] = dict((key.lower(), value)
+                                   for key, value in headers.items())
+
+    def _head_object(self, container, name):
+        if name not in self.objects:
+            raise ClientException('Not found', http_status=404)
+        headers = {'etag': '"%s"' % hashlib.md5(
+                   self.objects[name]).hexdigest(),
+                   'content-type': self.content_types[name]}
+        headers.update(self.metadata[name])
+        return headers
+
+    def get_object(self, container, name, resp_chunk_size=None):
+        return self._head_object(container, name), self.objects[name]
+
+    def get_container(self, container, prefix='', **kwargs):
+        return {}, [{'name': name, 'content_type': self.content_types[name],
+                     'last_modified': self.last_modified[name]}
+                    for name in sorted(self.objects)
+                    if name.startswith(prefix)]
+
+    def delete_object(self, container, name):
+        if name not in self.objects:
+            raise ClientException('Not found', http_status=404)
+        del self.objects[name]
+        del self.content_types[name]
+        del self.metadata[name]
+        del self.last_modified[name]
+
+
+class ContentDefinedChunkerTest(trove_testtools.TestCase):
+
+    def _chunks(self, data):
+        return list(dedup.ContentDefinedChunker(
+            StringIO.StringIO(data), average_size=4096, read_size=1000))
+
+    def test_chunks(self):
+        data = os.urandom(100000)
+        chunks = self._chunks(data)
+
+        self.assertEqual(data, ''.join(chunks))
+        for chunk in chunks[:-1]:
+            self.assertTrue(1024 <= len(chunk) <= 16384)
+
+    def test_boundaries_follow_content(self):
+        data = os.urandom(100000)
+        chunks = self._chunks(data)
+        shifted_chunks = self._chunks(os.urandom(10) + data)
+
+        # Only the chunks around the insertion change.
+        self.assertTrue(len(set(chunks) - set(shifted_chunks)) <= 2)
+
+    def test_empty_stream(self):
+        self.assertEqual([], self._chunks(''))
+
+    def test_boundary_sequence(self):
+        for average_size in [4096, 2 ** 20, 3 * 10 ** 6]:
+            chunker = dedup.ContentDefinedChunker(
+                StringIO.StringIO(''), average_size=average_size)
+            # A set of bytes for each index of the sequence.
+            size = chunker.table.count('A')
+            distance = 256.0 ** len(chunker.needle) / size ** len(
+                chunker.needle)
+            # A boundary follows min_size by about 3/4 of the average.
+            self.assertTrue(0.75 < distance / (0.75 * average_size) < 1.25)
+
+    def test_throughput(self):
+        # 32 MB of random data with the default average chunk size.
+        data = os.urandom(32 * 2 ** 20)
+        start = time.time()
+        chunks = list(dedup.ContentDefinedChunker(StringIO.StringIO(data)))
+        elapsed = time.time() - start
+
+        self.assertEqual(len(data), sum(len(chunk) for chunk in chunks))
+        # The scan runs in C at hundreds of MB/s; a bytewise loop in
+        # Python takes several seconds.
+        self.assertTrue(elapsed < 2, "Chunked 32 MB in %.2fs." % elapsed)
+
+
+class SwiftDedupStorageTest(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(SwiftDedupStorageTest, self).setUp()
+        self.context = trove_testtools.TroveTestContext(self)
+        self.swift_client = InMemorySwiftConnection()
+        create_swift_client_patch = patch.object(
+            remote, 'create_swift_client', return_value=self.swift_client)
+        create_swift_client_patch.start()
+        self.addCleanup(create_swift_client_patch.stop)
+        chunk_size_patch = patch.object(dedup, 'AVERAGE_CHUNK_SIZE', 4096)
+        chunk_size_patch.start()
+        self.addCleanup(chunk_size_patch.stop)
+        self.storage = dedup.SwiftDedupStorage(self.context)
+        self.data = os.urandom(200000)
+
+    def _chunk_names(self):
+        return [name for name in self.swift_client.objects
+                if name.startswith(dedup.CHUNK_PREFIX)]
+
+    def test_save_and_load(self):
+        success, note, checksum, location = self.storage.save(
+            '123.xbstream', StringIO.StringIO(self.data))
+
+        self.assertTrue(success, "The backup should have been successful.")
+        self.assertEqual('http://mockswift/v1/database_backups/123.xbstream',
+                         location)
+        self.assertTrue(dedup.is_manifest(
+            self.swift_client.head_object('database_backups',
+                                          '123.xbstream')))
+        # Chunks are stored compressed and encrypted.
+        for name in self._chunk_names():
+            self.assertNotIn(self.swift_client.objects[name], self.data)
+
+        stream = self.storage.load(location, checksum)
+        self.assertEqual(self.data, ''.join(stream))
+
+    @patch.object(dedup, 'LOG')
+    def test_save_compressed_refused(self, mock_logging):
+        for filename in ['123.xbstream.gz', '123.xbstream.gz.enc']:
+            success, note, checksum, location = self.storage.save(
+                filename, StringIO.StringIO(self.data))
+
+            self.assertFalse(success)
+            self.assertEqual({}, self.swift_client.objects)
+
+    def test_unchanged_chunks_not_uploaded(self):
+        self.storage.save('1.xbstream', StringIO.StringIO(self.data))
+        chunk_count = len(self._chunk_names())
+        self.swift_client.put_object.reset_mock()
+
+        changed = self.data[:100000] + 'changed' + self.data[100000:]
+        success, note, checksum, location = self.storage.save(
+            '2.xbstream', StringIO.StringIO(changed))
+
+        self.assertTrue(success, "The backup should have been successful.")
+        # The manifest and the chunks around the change.
+        self.assertTrue(self.swift_client.put_object.call_count <= 4)
+        self.assertTrue(len(self._chunk_names()) <= chunk_count + 3)
+        self.assertEqual(changed, ''.join(self.storage.load(location,
+                                                            checksum)))
+
+    @patch.object(dedup, 'LOG')
+    def test_corrupted_chunk(self, mock_logging):
+        success, note, checksum, location = self.storage.save(
+            '123.xbstream', StringIO.StringIO(self.data))
+        name = self._chunk_names()[0]
+        self.swift_client.objects[name] = dedup.encode_chunk('corrupted')
+
+        stream = self.storage.load(location, checksum)
+        self.assertRaises(swift.SwiftDownloadIntegrityError, ''.join, stream)
+
+    def test_sweep_chunks(self):
+        self.storage.save('1.xbstream', StringIO.StringIO(self.data))
+        first_chunks = set(self._chunk_names())
+        other = os.urandom(50000)
+        self.storage.save('2.xbstream', StringIO.StringIO(other))
+        self.swift_client.delete_object('database_backups', '2.xbstream')
+
+        # The unreferenced chunks are marked first, and deleted by the
+        # next sweep after the grace period.
+        self.assertEqual(0, dedup.sweep_chunks(
+            self.swift_client, 'database_backups', grace=3600))
+        self.assertEqual(0, dedup.sweep_chunks(
+            self.swift_client, 'database_backups', grace=3600))
+        deleted = dedup.sweep_chunks(self.swift_client, 'database_backups',
+                                     grace=0)
+
+        self.assertTrue(deleted > 0)
+        self.assertEqual(first_chunks, set(self._chunk_names()))
+        location = 'http://mockswift/v1/database_backups/1.xbstream'
+        self.assertEqual(self.data, ''.join(self.storage.load(
+            location, self.swift_client.head_object(
+                'database_backups', '1.xbstream')['etag'].strip('"'))))
+
+    def _tombstone_names(self):
+        return [name for name in self.swift_client.objects
+                if name.startswith(dedup.TOMBSTONE_PREFIX)]
+
+    def test_save_lists_chunks(self):
+        self.storage.save('1.xbstream', StringIO.StringIO(self.data))
+        self.swift_client.put_object.reset_mock()
+
+        self.storage.save('2.xbstream', StringIO.StringIO(self.data))
+        # Only the manifest, and no request per chunk to find the stored
+        # chunks.
+        self.assertEqual(1, self.swift_client.put_object.call_count)
+        self.assertFalse(self.swift_client.head_object.called)
+
+    def test_save_clears_marked_chunks(self):
+        self.storage.save('1.xbstream', StringIO.StringIO(self.data))
+        self.swift_client.delete_object('database_backups', '1.xbstream')
+        dedup.sweep_chunks(self.swift_client, 'database_backups')
+        chunk_count = len(self._chunk_names())
+        self.assertEqual(chunk_count, len(self._tombstone_names()))
+        self.swift_client.put_object.reset_mock()
+
+        # A backup that reuses the marked chunks clears their tombstones,
+        # so the next sweep does not delete them.
+        success, note, checksum, location = self.storage.save(
+            '2.xbstream', StringIO.StringIO(self.data))
+        self.assertEqual(1, self.swift_client.put_object.call_count)
+        self.assertEqual([], self._tombstone_names())
+        self.assertEqual(0, dedup.sweep_chunks(
+            self.swift_client, 'database_backups', grace=0))
+
+        self.assertEqual(chunk_count, len(self._chunk_names()))
+        self.assertEqual(self.data, ''.join(self.storage.load(location,
+                                                              checksum)))
+
+    def test_save_reuploads_swept_chunks(self):
+        self.storage.save('1.xbstream', StringIO.StringIO(self.data))
+        self.swift_client.delete_object('database_backups', '1.xbstream')
+        dedup.sweep_chunks(self.swift_client, 'database_backups')
+        chunk_count = len(self._chunk_names())
+        self.swift_client.put_object.reset_mock()
+
+        # A sweep deletes the chunks after the backup listed them.
+        list_keys = self.storage._list_keys
+
+        def _list_keys(container, prefix):
+            keys = list_keys(container, prefix)
+            if prefix == dedup.TOMBSTONE_PREFIX:
+                dedup.sweep_chunks(self.swift_client, container, grace=0)
+            return keys
+
+        with patch.object(self.storage, '_list_keys',
+                          side_effect=_list_keys):
+            success, note, checksum, location = self.storage.save(
+                '2.xbstream', StringIO.StringIO(self.data))
+        self.assertEqual(chunk_count + 1,
+                         self.swift_client.put_object.call_count)
+        self.assertEqual(self.data, ''.join(self.storage.load(location,
+                                                              checksum)))
+
+    def test_sweep_clears_referenced_chunks(self):
+        self.storage.save('1.xbstream', StringIO.StringIO(self.data))
+        # A chunk marked while a backup that refers to it was running.
+        name = self._chunk_names()[0]
+        self.swift_client.put_object(
+            'database_backups',
+            dedup.TOMBSTONE_PREFIX + name[len(dedup.CHUNK_PREFIX):], '')
+
+        self.assertEqual(0, dedup.sweep_chunks(
+            self.swift_client, 'database_backups', grace=0))
+        self.assertEqual([], self._tombstone_names())
+        self.assertIn(name, self._chunk_names())
+
+    def test_save_metadata_keeps_manifest(self):
+        self.swift_client.post_object = Mock()
+        location = 'http://mockswift/v1/database_backups/1.xbstream'
+
+        self.storage.save_metadata(location, metadata={'lsn': '1234567'})
+
+        self.swift_client.post_object.assert_called_with(
+            'database_backups', '1.xbstream',
+            headers={'X-Object-Meta-lsn': '1234567',
+                     'Content-Type': dedup.MANIFEST_CONTENT_TYPE})
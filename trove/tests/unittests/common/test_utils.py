@@ -14,7 +14,10 @@
 #    under the License.
 #
 
-from mock import Mock
+import traceback
+
+import eventlet
+from mock import Mock, patch
 
 from testtools import ExpectedException
 from trove.common import exception
@@ -99,3 +102,51 @@ class TestUtils(trove_testtools.TestCase):
         for index, datum in enumerate(data):
             self.assertEqual(datum[1], utils.format_output(datum[0]),
                              "Error formatting line %d of data" % index)
+
+    def test_fan_out(self):
+        def _call(item):
+            # Finish in the reverse order of the items.
+            eventlet.sleep(0.01 * (3 - item))
+            return item * 2
+
+        self.assertEqual([2, 4, 6], utils.fan_out(_call, [1, 2, 3]))
+
+    def test_fan_out_concurrent(self):
+        self.patch_conf_property('fan_out_workers', 2)
+        running = []
+        peak = []
+
+        def _call(item):
+            running.append(item)
+            peak.append(len(running))
+            eventlet.sleep(0.01)
+            running.remove(item)
+
+        utils.fan_out(_call, range(5))
+        self.assertEqual(2, max(peak))
+
+    @patch.object(utils.LOG, 'exception')
+    @patch.object(utils.LOG, 'error')
+    def test_fan_out_failures(self, mock_error, mock_exception):
+        completed = []
+
+        def _call(item):
+            if item == 1:
+                raise exception.GuestError(original_message='failed')
+            if item == 2:
+                eventlet.sleep(1)
+            completed.append(item)
+            return item
+
+        error = self.assertRaises(exception.FanOutError, utils.fan_out,
+                                  _call, [0, 1, 2, 3], timeout=0.1)
+        self.assertEqual([0, 3], completed)
+        self.assertEqual([0, None, None, 3], error.results)
+        self.assertEqual([1, 2], [item for item, e in error.failures])
+        self.assertIsInstance(error.failures[0][1], exception.GuestError)
+        self.assertIsInstance(error.failures[1][1], eventlet.Timeout)
+        self.assertEqual([e for item, e in error.failures],
+                         [exc_info[1] for exc_info in error.exc_infos])
+        self.assertEqual('_call',
+                         traceback.extract_tb(error.exc_infos[0][2])[-1][2])
+        self.assertIn('2 of 4', str(error))
@@ -13,8 +13,13 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 #
+import jsonschema
+from mock import call
+from mock import patch
 from testtools.matchers import Equals, Is, Not
+from trove.common import exception
 from trove.common import wsgi
+from trove.db.sqlalchemy import session
 from trove.tests.unittests import trove_testtools
 import webob
 
@@ -40,3 +45,73 @@ class TestWsgi(trove_testtools.TestCase):
         self.assertThat(ctx.user, Equals(user_id))
         self.assertThat(ctx.auth_token, Equals(token))
         self.assertEqual(0, len(ctx.service_catalog))
+
+    @patch.object(session, 'start_request')
+    def test_process_request_read_routing(self, mock_start_request):
+        self.patch_conf_property('db_read_replica_routing', True)
+        middleware = wsgi.ContextMiddleware("test_trove")
+        for method, read_only in [('GET', True), ('POST', False)]:
+            req = webob.Request.blank('/', method=method)
+            req.headers.update({'X-Auth-Token': 'MI23fdf2defg123',
+                                'X-Tenant-Id': 'test_tenant'})
+            middleware.process_request(req)
+            mock_start_request.assert_called_with('test_tenant', read_only)
+
+    @patch.object(session, 'start_request')
+    def test_process_request_no_read_routing(self, mock_start_request):
+        middleware = wsgi.ContextMiddleware("test_trove")
+        req = webob.Request.blank('/', method='GET')
+        req.headers.update({'X-Auth-Token': 'MI23fdf2defg123',
+                            'X-Tenant-Id': 'test_tenant'})
+        middleware.process_request(req)
+        self.assertFalse(mock_start_request.called)
+
+
+class TestController(trove_testtools.TestCase):
+
+    class SchemaController(wsgi.Controller):
+        schemas = {
+            'create': {
+                'type': 'object',
+                'required': ['name'],
+                'properties': {'name': {'type': 'string'}}},
+            'action': {
+                'restart': {'type': 'object'}}
+        }
+
+    def setUp(self):
+        super(TestController, self).setUp()
+        self.controller = self.SchemaController()
+
+    def test_get_validator_cached(self):
+        schema = self.SchemaController.schemas['create']
+        self.assertIs(wsgi.Controller.get_validator(schema),
+                      wsgi.Controller.get_validator(schema))
+
+    @patch.dict(wsgi._VALIDATORS, clear=True)
+    @patch.object(wsgi.jsonschema, 'Draft4Validator',
+                  wraps=jsonschema.Draft4Validator)
+    def test_validate_request_reuses_validator(self, mock_validator):
+        for name in ['test', 1, 'test']:
+            try:
+                self.controller.validate_request(
+                    'create', {'body': {'name': name}})
+            except exception.BadRequest:
+                pass
+        self.assertEqual([call(self.SchemaController.schemas['create'])],
+                         mock_validator.call_args_list)
+
+    def test_check_schemas(self):
+        self.SchemaController.check_schemas()
+        for schema in [self.SchemaController.schemas['create'],
+                       self.SchemaController.schemas['action']['restart']]:
+            self.assertIs(schema, wsgi._VALIDATORS[id(schema)][0])
+
+    def test_validate_request(self):
+        self.controller.validate_request(
+            'create', {'body': {'name': 'test'}})
+
+    def test_validate_request_invalid(self):
+        self.assertRaisesRegexp(
+            exception.BadRequest, "name 1 is not of type 'string'",
+            self.controller.validate_request, 'create', {'body': {'name': 1}})
@@ -0,0 +1,179 @@
+# Copyright 2016 Tesora Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from mock import Mock, patch
+
+from trove.common.instance import ServiceStatuses
+from trove.common.rpc import service as rpc_service
+from trove.common import utils
+from trove.conductor import heartbeat
+from trove.conductor import manager as conductor_manager
+from trove.conductor.models import LastSeen
+from trove.guestagent.common import timeutils
+from trove.instance import models as t_models
+from trove.tests.unittests import trove_testtools
+from trove.tests.unittests.util import util
+
+
+class HeartbeatCoalescerTest(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(HeartbeatCoalescerTest, self).setUp()
+        util.init_db()
+        self.coalescer = heartbeat.HeartbeatCoalescer()
+        self.instance_id = utils.generate_uuid()
+        self.iss_id = utils.generate_uuid()
+        t_models.InstanceServiceStatus(
+            id=self.iss_id, instance_id=self.instance_id,
+            status=ServiceStatuses.NEW).save()
+
+    def _get_iss(self):
+        return t_models.InstanceServiceStatus.find_by(id=self.iss_id)
+
+    def _payload(self, status):
+        return {'service_status': status.description}
+
+    def test_newest_heartbeat_is_written(self):
+        now = timeutils.float_utcnow()
+        self.coalescer.add(self.instance_id,
+                           self._payload(ServiceStatuses.BUILDING), sent=now)
+        self.coalescer.add(self.instance_id,
+                           self._payload(ServiceStatuses.RUNNING),
+                           sent=now + 1)
+        self.assertEqual(ServiceStatuses.NEW, self._get_iss().status)
+
+        self.coalescer.flush()
+
+        self.assertEqual(ServiceStatuses.RUNNING, self._get_iss().status)
+        seen = LastSeen.load(self.instance_id, 'heartbeat')
+        self.assertEqual(now + 1, float(seen.sent))
+
+    @patch.object(heartbeat, 'LOG')
+    def test_older_pending_heartbeat_discarded(self, mock_logging):
+        now = timeutils.float_utcnow()
+        self.assertTrue(self.coalescer.add(
+            self.instance_id, self._payload(ServiceStatuses.RUNNING),
+            sent=now))
+        self.assertFalse(self.coalescer.add(
+            self.instance_id, self._payload(ServiceStatuses.BUILDING),
+            sent=now - 60))
+
+        self.coalescer.flush()
+
+        self.assertEqual(ServiceStatuses.RUNNING, self._get_iss().status)
+
+    @patch.object(heartbeat, 'LOG')
+    def test_older_than_last_seen_discarded(self, mock_logging):
+        now = timeutils.float_utcnow()
+        LastSeen.create(self.instance_id, 'heartbeat', now)
+        self.coalescer.add(self.instance_id,
+                           self._payload(ServiceStatuses.RUNNING),
+                           sent=now - 60)
+
+        self.coalescer.flush()
+
+        self.assertEqual(ServiceStatuses.NEW, self._get_iss().status)
+
+    def test_unchanged_status_not_written(self):
+        self.coalescer.add(self.instance_id,
+                           self._payload(ServiceStatuses.NEW))
+        with patch.object(heartbeat.get_db_api(), 'save_all') as save_all:
+            self.coalescer.flush()
+        self.assertFalse(save_all.called)
+
+    def test_status_kept_by_heartbeat_without_status(self):
+        now = timeutils.float_utcnow()
+        self.coalescer.add(self.instance_id,
+                           self._payload(ServiceStatuses.RUNNING), sent=now)
+        self.coalescer.add(self.instance_id, {}, sent=now + 1)
+
+        self.coalescer.flush()
+
+        self.assertEqual(ServiceStatuses.RUNNING, self._get_iss().status)
+
+    def test_status_change_reported(self):
+        on_status_change = Mock()
+        self.coalescer = heartbeat.HeartbeatCoalescer(
+            on_status_change=on_status_change)
+        self.coalescer.add(self.instance_id,
+                           self._payload(ServiceStatuses.RUNNING))
+        self.coalescer.flush()
+        on_status_change.assert_called_once_with(self.instance_id,
+                                                 ServiceStatuses.RUNNING)
+
+        self.coalescer.add(self.instance_id,
+                           self._payload(ServiceStatuses.RUNNING))
+        self.coalescer.flush()
+        self.assertEqual(1, on_status_change.call_count)
+
+    def test_bogus_status_rejected(self):
+        self.assertRaises(ValueError, self.coalescer.add,
+                          self.instance_id, {'service_status': 'potato salad'})
+
+    @patch.object(heartbeat, 'LOG')
+    def test_unknown_instance_discarded(self, mock_logging):
+        self.coalescer.add(utils.generate_uuid(),
+                           self._payload(ServiceStatuses.RUNNING))
+        self.coalescer.flush()
+        self.assertTrue(mock_logging.error.called)
+
+
+class ConductorCoalescedHeartbeatTest(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(ConductorCoalescedHeartbeatTest, self).setUp()
+        self.patch_conf_property('conductor_heartbeat_flush_interval', 10)
+        self.cond_mgr = conductor_manager.Manager()
+
+    @patch.object(conductor_manager.loopingcall, 'FixedIntervalLoopingCall')
+    @patch.object(t_models.InstanceServiceStatus, 'find_by')
+    def test_heartbeat_coalesced(self, mock_find_by, mock_looping_call):
+        instance_id = utils.generate_uuid()
+        payload = {'service_status': ServiceStatuses.RUNNING.description}
+
+        with patch.object(self.cond_mgr._heartbeats, 'add') as mock_add:
+            self.cond_mgr.heartbeat(None, instance_id, payload, sent=1.0)
+            self.cond_mgr.heartbeat(None, instance_id, payload, sent=2.0)
+
+        self.assertEqual(2, mock_add.call_count)
+        self.assertFalse(mock_find_by.called)
+        mock_looping_call.assert_called_once_with(
+            self.cond_mgr._heartbeats.flush)
+        mock_looping_call.return_value.start.assert_called_once_with(
+            interval=10, initial_delay=10)
+
+    @patch.object(conductor_manager.loopingcall, 'FixedIntervalLoopingCall')
+    def test_stop_flushes_heartbeats(self, mock_looping_call):
+        payload = {'service_status': ServiceStatuses.RUNNING.description}
+        self.cond_mgr.heartbeat(None, utils.generate_uuid(), payload)
+
+        with patch.object(self.cond_mgr._heartbeats, '_write') as mock_write:
+            self.cond_mgr.stop()
+
+        mock_looping_call.return_value.stop.assert_called_once_with()
+        self.assertIsNone(self.cond_mgr._heartbeat_flusher)
+        self.assertEqual(1, mock_write.call_count)
+
+    @patch.object(rpc_service.rpc, 'get_server')
+    def test_service_stop_flushes_heartbeats(self, mock_get_server):
+        self.patch_conf_property('report_interval', 0)
+        service = rpc_service.RpcService(
+            manager='trove.conductor.manager.Manager', topic='conductor',
+            rpc_api_version='1.0')
+        service.start()
+        with patch.object(service.manager_impl, 'stop') as mock_stop:
+            service.stop()
+        mock_get_server.return_value.stop.assert_called_once_with()
+        mock_stop.assert_called_once_with()
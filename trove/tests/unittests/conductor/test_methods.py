@@ -12,7 +12,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-from mock import patch
+from mock import Mock, patch
 
 from trove.backup import models as bkup_models
 from trove.backup import state
@@ -109,6 +109,17 @@ class ConductorMethodTests(trove_testtools.TestCase):
         iss = self._get_iss(iss_id)
         self.assertEqual(ServiceStatuses.BUILDING, iss.status)
 
+    @patch('trove.conductor.manager.LOG')
+    def test_heartbeat_status_change_notified(self, mock_logging):
+        self._create_iss()
+        self.cond_mgr._status_notifier = Mock()
+        payload = {'service_status': ServiceStatuses.BUILDING.description}
+        self.cond_mgr.heartbeat(None, self.instance_id, payload)
+        self.cond_mgr.heartbeat(None, self.instance_id, payload)
+        (self.cond_mgr._status_notifier.instance_status_changed.
+            assert_called_once_with(self.instance_id,
+                                    ServiceStatuses.BUILDING.description))
+
     # --- Tests for update_backup ---
 
     def test_backup_not_found(self):
@@ -0,0 +1,93 @@
+# Copyright 2016 Tesora Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import random
+
+from mock import patch
+
+from trove.common import utils
+from trove.conductor.models import LastSeen
+from trove.conductor.models import LastSeenCache
+from trove.tests.unittests import trove_testtools
+from trove.tests.unittests.util import util
+
+
+class LastSeenCacheTest(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(LastSeenCacheTest, self).setUp()
+        util.init_db()
+        self.cache = LastSeenCache(100)
+        self.instance_id = utils.generate_uuid()
+
+    def test_out_of_order_delivery(self):
+        sent_times = [1000.0 + i for i in range(50)]
+        random.shuffle(sent_times)
+
+        accepted = [sent for sent in sent_times
+                    if not self.cache.message_too_old(self.instance_id,
+                                                      'heartbeat', sent)]
+
+        self.assertEqual(sorted(accepted), accepted)
+        self.assertEqual(max(sent_times), accepted[-1])
+        seen = LastSeen.load(self.instance_id, 'heartbeat')
+        self.assertEqual(max(sent_times), float(seen.sent))
+
+    def test_older_message_needs_no_db_access(self):
+        self.assertFalse(self.cache.message_too_old(self.instance_id,
+                                                    'heartbeat', 10.0))
+        with patch.object(LastSeen, 'load') as mock_load:
+            with patch.object(LastSeen, 'update_if_newer') as mock_update:
+                self.assertTrue(self.cache.message_too_old(
+                    self.instance_id, 'heartbeat', 5.0))
+                self.assertTrue(self.cache.message_too_old(
+                    self.instance_id, 'heartbeat', 10.0))
+        self.assertFalse(mock_load.called)
+        self.assertFalse(mock_update.called)
+        self.assertEqual(2, self.cache.stats()['hits'])
+
+    def test_seeded_from_db_on_miss(self):
+        LastSeen.create(self.instance_id, 'update_backup', 20.0)
+        self.assertTrue(self.cache.message_too_old(self.instance_id,
+                                                   'update_backup', 10.0))
+        self.assertFalse(self.cache.message_too_old(self.instance_id,
+                                                    'update_backup', 30.0))
+        self.assertEqual(1, self.cache.stats()['misses'])
+
+    def test_newer_message_seen_by_another_worker(self):
+        self.assertFalse(self.cache.message_too_old(self.instance_id,
+                                                    'heartbeat', 10.0))
+        # Another worker records a newer message behind our back.
+        LastSeen.create(self.instance_id, 'heartbeat', 30.0)
+
+        self.assertTrue(self.cache.message_too_old(self.instance_id,
+                                                   'heartbeat', 20.0))
+        self.assertTrue(self.cache.message_too_old(self.instance_id,
+                                                   'heartbeat', 25.0))
+        self.assertFalse(self.cache.message_too_old(self.instance_id,
+                                                    'heartbeat', 40.0))
+
+    def test_eviction(self):
+        cache = LastSeenCache(2)
+        for method_name in ['heartbeat', 'update_backup', 'report_root']:
+            cache.message_too_old(self.instance_id, method_name, 1.0)
+        # The least recently used entry has been evicted and is reloaded.
+        self.assertTrue(cache.message_too_old(self.instance_id,
+                                              'heartbeat', 1.0))
+
+        stats = cache.stats()
+        self.assertEqual(2, stats['size'])
+        self.assertEqual(2, stats['evictions'])
+        self.assertEqual(4, stats['misses'])
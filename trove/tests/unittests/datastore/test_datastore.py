@@ -13,10 +13,16 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import time
+
+from mock import Mock
+from mock import patch
+
 from trove.common import exception
 from trove.datastore import models as datastore_models
 from trove.datastore.models import Datastore
 from trove.tests.unittests.datastore.base import TestDatastoreBase
+from trove.tests.unittests import trove_testtools
 
 
 class TestDatastore(TestDatastoreBase):
@@ -29,3 +35,56 @@ class TestDatastore(TestDatastoreBase):
     def test_load_datastore(self):
         datastore = Datastore.load(self.ds_name)
         self.assertEqual(self.ds_name, datastore.name)
+
+    def test_load_datastore_cached(self):
+        datastore = Datastore.load(self.ds_name)
+        with patch.object(datastore_models.DBDatastore, 'find_by') as find:
+            self.assertIs(datastore, Datastore.load(self.ds_name))
+            self.assertFalse(find.called)
+
+    def test_load_datastore_cache_disabled(self):
+        self.patch_conf_property('datastore_cache_ttl', 0)
+        datastore = Datastore.load(self.ds_name)
+        self.assertIsNot(datastore, Datastore.load(self.ds_name))
+
+    def test_load_datastore_invalidated(self):
+        datastore = Datastore.load(self.ds_name)
+        datastore_models.update_datastore(self.ds_name,
+                                          self.datastore_version.id)
+        reloaded = Datastore.load(self.ds_name)
+        self.assertIsNot(datastore, reloaded)
+        self.assertEqual(self.datastore_version.id,
+                         reloaded.default_version_id)
+
+    def test_load_datastore_expired(self):
+        datastore = Datastore.load(self.ds_name)
+        with patch.object(datastore_models.time, 'time',
+                          return_value=time.time() + 3600):
+            self.assertIsNot(datastore, Datastore.load(self.ds_name))
+
+
+class TestCatalogCache(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(TestCatalogCache, self).setUp()
+        self.cache = datastore_models.CatalogCache()
+
+    def test_get_loads_once(self):
+        loader = Mock(return_value='value')
+        self.assertEqual('value', self.cache.get('key', loader))
+        self.assertEqual('value', self.cache.get('key', loader))
+        loader.assert_called_once_with()
+
+    def test_get_does_not_cache_errors(self):
+        loader = Mock(side_effect=[exception.DatastoreNotFound, 'value'])
+        self.assertRaises(exception.DatastoreNotFound,
+                          self.cache.get, 'key', loader)
+        self.assertEqual('value', self.cache.get('key', loader))
+
+    def test_invalidated_while_loading(self):
+        def loader():
+            self.cache.invalidate()
+            return 'stale'
+
+        self.assertEqual('stale', self.cache.get('key', loader))
+        self.assertEqual('fresh', self.cache.get('key', lambda: 'fresh'))
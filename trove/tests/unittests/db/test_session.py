@@ -0,0 +1,97 @@
+# Copyright 2016 Tesora Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+import time
+
+from mock import Mock
+from mock import patch
+
+from trove.db.sqlalchemy import api
+from trove.db.sqlalchemy import session
+from trove.tests.unittests import trove_testtools
+
+
+class TestReadReplicaRouting(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(TestReadReplicaRouting, self).setUp()
+        self.patch_conf_property('db_read_replica_routing', True)
+        session._RECENT_WRITES.clear()
+        self.addCleanup(session._RECENT_WRITES.clear)
+        self.addCleanup(session.start_request, None, False)
+
+    def test_read_only_request(self):
+        session.start_request('tenant', read_only=True)
+        self.assertTrue(session.reads_use_slave())
+
+    def test_write_request(self):
+        session.start_request('tenant', read_only=False)
+        self.assertFalse(session.reads_use_slave())
+
+    def test_routing_disabled(self):
+        self.patch_conf_property('db_read_replica_routing', False)
+        session.start_request('tenant', read_only=True)
+        self.assertFalse(session.reads_use_slave())
+
+    def test_read_your_writes(self):
+        session.start_request('tenant', read_only=True)
+        session.record_write()
+        # the rest of the request reads from the primary
+        self.assertFalse(session.reads_use_slave())
+        # and so do the next requests of the tenant
+        session.start_request('tenant', read_only=True)
+        self.assertFalse(session.reads_use_slave())
+        session.start_request('other', read_only=True)
+        self.assertTrue(session.reads_use_slave())
+
+    def test_write_window_expired(self):
+        session.start_request('tenant', read_only=False)
+        session.record_write()
+        with patch.object(session.time, 'time',
+                          return_value=time.time() + 3600):
+            session.start_request('tenant', read_only=True)
+        self.assertTrue(session.reads_use_slave())
+        self.assertNotIn('tenant', session._RECENT_WRITES)
+
+    @patch.object(session, '_NEXT_PRUNE', 0)
+    def test_write_window_expired_without_reads(self):
+        for tenant_id in ['tenant', 'other']:
+            session.start_request(tenant_id, read_only=False)
+            session.record_write()
+        with patch.object(session.time, 'time',
+                          return_value=time.time() + 3600):
+            session.start_request('last', read_only=False)
+            session.record_write()
+        self.assertEqual(['last'], list(session._RECENT_WRITES))
+
+    def test_primary_reads(self):
+        session.start_request('tenant', read_only=True)
+        with session.primary_reads():
+            self.assertFalse(session.reads_use_slave())
+        self.assertTrue(session.reads_use_slave())
+
+    @patch.object(session, 'get_session')
+    def test_query_uses_slave(self, mock_get_session):
+        model = Mock()
+        session.start_request('tenant', read_only=True)
+        api._base_query(model)
+        mock_get_session.assert_called_once_with(use_slave=True)
+
+    @patch.object(session, 'get_session')
+    def test_save_uses_primary(self, mock_get_session):
+        session.start_request('tenant', read_only=True)
+        api.save(Mock())
+        mock_get_session.assert_called_once_with()
+        self.assertFalse(session.reads_use_slave())
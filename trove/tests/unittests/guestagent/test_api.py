@@ -17,6 +17,7 @@ import oslo_messaging as messaging
 from oslo_messaging.rpc.client import RemoteError
 from testtools.matchers import Is
 
+from trove.common import cfg
 import trove.common.context as context
 from trove.common import exception
 from trove.common.remote import guest_client
@@ -386,6 +387,113 @@ class ApiTest(trove_testtools.TestCase):
         self._verify_rpc_prepare_before_call()
         self._verify_call('wait_for_txn', txn="")
 
+    def test_batch(self):
+        self.api.client.can_send_version.return_value = True
+        self.call_context.call.return_value = {'results': [10, 'txn-id'],
+                                               'error': None}
+        with self.api.batch() as batch:
+            self.assertIsNone(batch.get_txn_count())
+            self.assertIsNone(batch.wait_for_txn('txn'))
+        self.assertEqual([10, 'txn-id'], batch.results)
+        self.api.client.can_send_version.assert_called_once_with(
+            api.BATCH_CALL_VERSION)
+        self.api.client.prepare.assert_called_once_with(
+            version=api.BATCH_CALL_VERSION,
+            timeout=2 * api.AGENT_HIGH_TIMEOUT)
+        self._verify_call('batch_call',
+                          calls=[['get_txn_count', {}],
+                                 ['wait_for_txn', {'txn': 'txn'}]])
+
+    def test_batch_old_guest(self):
+        self.api.client.can_send_version.return_value = False
+        self.call_context.call.side_effect = [10, None]
+        with self.api.batch() as batch:
+            batch.get_txn_count()
+            batch.wait_for_txn('txn')
+        self.assertEqual([10, None], batch.results)
+        self.api.client.prepare.assert_has_calls([
+            mock.call(version=RPC_API_VERSION,
+                      timeout=api.AGENT_HIGH_TIMEOUT),
+            mock.call(version=RPC_API_VERSION,
+                      timeout=api.AGENT_HIGH_TIMEOUT)])
+        self.call_context.call.assert_has_calls([
+            mock.call(self.context, 'get_txn_count'),
+            mock.call(self.context, 'wait_for_txn', txn='txn')])
+
+    def test_batch_cast(self):
+        with self.api.batch() as batch:
+            self.assertRaises(exception.TroveError, batch.delete_user,
+                              {'name': 'user'})
+        self.assertFalse(self.call_context.cast.called)
+
+    @mock.patch.object(api.LOG, 'error')
+    def test_batch_error(self, mock_log):
+        self.api.client.can_send_version.return_value = True
+        self.call_context.call.return_value = {'results': [10],
+                                               'error': 'failed'}
+
+        def _batch():
+            with self.api.batch() as batch:
+                batch.get_txn_count()
+                batch.get_latest_txn_id()
+                batch.get_last_txn()
+            return batch
+
+        self.assertRaisesRegexp(exception.GuestError, 'failed', _batch)
+        self.assertIn('get_latest_txn_id', mock_log.call_args[0][0])
+
+    def test_batch_empty(self):
+        with self.api.batch() as batch:
+            pass
+        self.assertEqual([], batch.results)
+        self.assertFalse(self.api.client.prepare.called)
+
+    def test_batch_error_in_block(self):
+        def _batch():
+            with self.api.batch() as batch:
+                batch.get_txn_count()
+                raise ValueError()
+
+        self.assertRaises(ValueError, _batch)
+        self.assertFalse(self.api.client.prepare.called)
+
+    @mock.patch.object(rpc, 'TRANSPORT', mock.Mock())
+    def _api_at_upgrade_level(self, level):
+        cfg.CONF.set_override('guestagent', level, group='upgrade_levels')
+        self.addCleanup(cfg.CONF.clear_override, 'guestagent',
+                        group='upgrade_levels')
+        return api.API(self.context, 'instance-id')
+
+    def test_batch_mitaka_upgrade_level(self):
+        guest = self._api_at_upgrade_level('mitaka')
+        with mock.patch.object(guest, '_call', return_value={
+                'results': [10, 'txn-id'], 'error': None}) as mock_call:
+            with guest.batch() as batch:
+                batch.get_txn_count()
+                batch.get_latest_txn_id()
+        self.assertEqual([10, 'txn-id'], batch.results)
+        mock_call.assert_called_once_with(
+            'batch_call', 2 * api.AGENT_HIGH_TIMEOUT, '1.1',
+            calls=[['get_txn_count', {}], ['get_latest_txn_id', {}]])
+
+    @mock.patch.object(api.GuestBatch, '_logged_unbatched', False)
+    @mock.patch.object(api.LOG, 'info')
+    def test_batch_default_upgrade_level(self, mock_info):
+        guest = self._api_at_upgrade_level('icehouse')
+        with mock.patch.object(guest, '_call',
+                               side_effect=[10, 'txn-id', 11]) as mock_call:
+            with guest.batch() as batch:
+                batch.get_txn_count()
+                batch.get_latest_txn_id()
+            with guest.batch() as batch:
+                batch.get_txn_count()
+        self.assertEqual([11], batch.results)
+        mock_call.assert_has_calls([
+            mock.call('get_txn_count', api.AGENT_HIGH_TIMEOUT, '1.0'),
+            mock.call('get_latest_txn_id', api.AGENT_HIGH_TIMEOUT, '1.0'),
+            mock.call('get_txn_count', api.AGENT_HIGH_TIMEOUT, '1.0')])
+        self.assertEqual(1, mock_info.call_count)
+
     def test_cleanup_source_on_replica_detach(self):
         # execute
         self.api.cleanup_source_on_replica_detach({'replication_user':
@@ -14,6 +14,7 @@
 import mock
 import os
 
+import eventlet
 from mock import ANY, DEFAULT, Mock, patch, PropertyMock
 from testtools.testcase import ExpectedException
 from trove.common import exception
@@ -29,6 +30,7 @@ from trove.guestagent.strategies.backup.postgresql_impl \
     import PgBaseBackupUtil
 from trove.guestagent.strategies.backup.mysql_impl import MySqlApp
 from trove.guestagent.strategies.restore import base as restoreBase
+from trove.guestagent.strategies.restore import mysql_impl as mysql_restore
 from trove.guestagent.strategies.restore.mysql_impl import MySQLRestoreMixin
 from trove.tests.unittests import trove_testtools
 
@@ -179,6 +181,15 @@ class GuestAgentBackupTest(trove_testtools.TestCase):
                          bkup.command)
         self.assertEqual("12345.xbstream.gz.enc", bkup.manifest)
 
+    def test_backup_xtrabackup_compressed_in_agent(self):
+        RunnerClass = utils.import_class(BACKUP_XTRA_CLS)
+        with patch.object(RunnerClass, 'compression_workers', 4):
+            bkup = RunnerClass(12345, extra_opts="")
+            self.assertTrue(bkup.transform_in_agent)
+            self.assertEqual(XTRA_BACKUP, bkup.command)
+            self.assertEqual(ENCRYPT, bkup.openssl_cmd)
+        self.assertEqual("12345.xbstream.gz.enc", bkup.manifest)
+
     def test_backup_xtrabackup_incremental(self):
         backupBase.BackupRunner.is_encrypted = False
         RunnerClass = utils.import_class(BACKUP_XTRA_INCR_CLS)
@@ -261,6 +272,128 @@ class GuestAgentBackupTest(trove_testtools.TestCase):
         observed = restr._incremental_prepare_cmd(None)
         self.assertEqual(expected, observed)
 
+    @patch.object(operating_system, 'remove')
+    @patch.object(operating_system, 'create_directory')
+    def test_restore_xtrabackup_incremental_chain(self, mock_create_dir,
+                                                  mock_remove):
+        metadata = {
+            'full': {},
+            'incr1': {'parent_location': 'full', 'parent_checksum': 'md5-0'},
+            'incr2': {'parent_location': 'incr1', 'parent_checksum': 'md5-1'},
+        }
+        storage = Mock()
+        storage.load_metadata.side_effect = (
+            lambda location, checksum: metadata[location])
+        RunnerClass = utils.import_class(RESTORE_XTRA_INCR_CLS)
+        restr = RunnerClass(storage, restore_location="/var/lib/mysql/data",
+                            location="incr2", checksum="md5-2")
+        events = []
+
+        def _unpack(location, checksum, command):
+            events.append(('unpack start', location))
+            eventlet.sleep(0)
+            events.append(('unpack end', location))
+            return 10
+
+        def _prepare(incremental_dir):
+            events.append(('prepare start', incremental_dir))
+            eventlet.sleep(0)
+            eventlet.sleep(0)
+            events.append(('prepare end', incremental_dir))
+
+        mount_point = '/var/lib/mysql'
+        with patch.object(restr, '_unpack', side_effect=_unpack):
+            with patch.object(restr, '_incremental_prepare',
+                              side_effect=_prepare):
+                with patch.object(mysql_restore.cfg,
+                                  'get_configuration_property',
+                                  return_value=mount_point):
+                    self.assertEqual(30, restr._run_restore())
+
+        incr1_dir = os.path.join(mount_point, 'md5-1')
+        incr2_dir = os.path.join(mount_point, 'md5-2')
+        self.assertEqual([('unpack start', 'full'),
+                          ('unpack end', 'full'),
+                          # The next backup is unpacked during the prepare.
+                          ('prepare start', None),
+                          ('unpack start', 'incr1'),
+                          ('unpack end', 'incr1'),
+                          ('prepare end', None),
+                          ('prepare start', incr1_dir),
+                          ('unpack start', 'incr2'),
+                          ('unpack end', 'incr2'),
+                          ('prepare end', incr1_dir),
+                          ('prepare start', incr2_dir),
+                          ('prepare end', incr2_dir)], events)
+        mock_remove.assert_has_calls([
+            mock.call(incr1_dir, force=True, as_root=True),
+            mock.call(incr2_dir, force=True, as_root=True)])
+
+    @patch.object(operating_system, 'remove')
+    @patch.object(operating_system, 'create_directory')
+    def test_restore_xtrabackup_incremental_prepare_error(
+            self, mock_create_dir, mock_remove):
+        metadata = {
+            'full': {},
+            'incr1': {'parent_location': 'full', 'parent_checksum': 'md5-0'},
+        }
+        storage = Mock()
+        storage.load_metadata.side_effect = (
+            lambda location, checksum: metadata[location])
+        RunnerClass = utils.import_class(RESTORE_XTRA_INCR_CLS)
+        restr = RunnerClass(storage, restore_location="/var/lib/mysql/data",
+                            location="incr1", checksum="md5-1")
+        events = []
+
+        def _unpack(location, checksum, command):
+            try:
+                events.append(('unpack start', location))
+                eventlet.sleep(1)
+                events.append(('unpack end', location))
+            finally:
+                eventlet.sleep(0)
+                events.append(('unpack cleanup', location))
+            return 10
+
+        def _prepare(incremental_dir):
+            eventlet.sleep(0)
+            raise exception.ProcessExecutionError('prepare failed')
+
+        with patch.object(restr, '_unpack', side_effect=_unpack):
+            with patch.object(restr, '_incremental_prepare',
+                              side_effect=_prepare):
+                self.assertRaises(exception.ProcessExecutionError,
+                                  restr._run_restore)
+
+        # The unpack of the next backup was killed, and had cleaned up
+        # before the error was raised.
+        self.assertEqual([('unpack start', 'full'),
+                          ('unpack end', 'full'),
+                          ('unpack cleanup', 'full'),
+                          ('unpack start', 'incr1'),
+                          ('unpack cleanup', 'incr1')], events)
+
+    @patch.object(restoreBase.subprocess, 'Popen')
+    def test_restore_unpack_stream_error(self, mock_popen):
+        process = mock_popen.return_value
+        process.stdin.closed = False
+
+        def _stream():
+            yield 'data'
+            raise IOError('stream failed')
+
+        storage = Mock()
+        storage.load.return_value = _stream()
+        RunnerClass = utils.import_class(RESTORE_XTRA_CLS)
+        restr = RunnerClass(storage, restore_location="/var/lib/mysql/data",
+                            location="filename", checksum="md5")
+        self.assertRaisesRegexp(IOError, 'stream failed', restr._unpack,
+                                'filename', 'md5', 'restore')
+        process.stdin.write.assert_called_once_with('data')
+        process.terminate.assert_called_once_with()
+        process.stdin.close.assert_called_once_with()
+        process.wait.assert_called_once_with()
+
     def test_restore_decrypted_xtrabackup_incremental_command(self):
         restoreBase.RestoreRunner.is_encrypted = False
         RunnerClass = utils.import_class(RESTORE_XTRA_INCR_CLS)
@@ -0,0 +1,209 @@
+# Copyright 2016 Tesora Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import StringIO
+import tempfile
+import threading
+
+from mock import ANY, MagicMock, patch
+
+from trove.guestagent.common import operating_system
+from trove.guestagent import guest_log
+from trove.tests.unittests import trove_testtools
+
+
+class GuestLogComponentsTest(trove_testtools.TestCase):
+
+    def _components(self, data, limit):
+        return list(guest_log.GuestLog._log_components(
+            StringIO.StringIO(data), limit))
+
+    def test_complete_lines(self):
+        data = ''.join('line %d\n' % i for i in range(100))
+        components = self._components(data, 50)
+
+        self.assertEqual(data, ''.join(components))
+        for component in components:
+            self.assertTrue(len(component) <= 50)
+            self.assertTrue(component.endswith('\n'))
+
+    def test_partial_last_line_held_back(self):
+        components = self._components('one\ntwo\nthr', 50)
+        self.assertEqual(['one\ntwo\n'], components)
+
+    def test_long_line_split(self):
+        data = 'x' * 120 + '\n'
+        components = self._components(data, 50)
+
+        self.assertEqual(data, ''.join(components))
+        self.assertEqual([50, 50, 21], [len(c) for c in components])
+
+    def test_lines_across_blocks_kept_whole(self):
+        data = 'a' * 30 + '\n' + 'b' * 30 + '\n'
+        self.assertEqual(['a' * 30 + '\n', 'b' * 30 + '\n'],
+                         self._components(data, 40))
+
+    def test_empty_log(self):
+        self.assertEqual([], self._components('', 50))
+
+
+class GuestLogPublishTest(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(GuestLogPublishTest, self).setUp()
+        log_file = tempfile.NamedTemporaryFile(delete=False)
+        log_file.close()
+        self.log_filename = log_file.name
+        self.addCleanup(os.unlink, self.log_filename)
+        with patch.object(operating_system, 'chmod'):
+            self.guest_log = guest_log.GuestLog(
+                MagicMock(), 'general', guest_log.LogType.USER, None,
+                self.log_filename, True)
+        self.guest_log._published_size = 0
+        self.guest_log._container_name = 'log_container'
+        self.guest_log._cached_swift_client = MagicMock()
+        self.guest_log._cached_context = self.guest_log.context
+        self.guest_log._refresh_details = MagicMock()
+        self.guest_log._put_meta_details = MagicMock()
+        self.guest_log._get_headers = MagicMock(return_value={})
+
+    def _append(self, data):
+        with open(self.log_filename, 'a') as log:
+            log.write(data)
+
+    def _published(self):
+        put_object = self.guest_log.swift_client.put_object
+        return ''.join(args[2] for args, kwargs in put_object.call_args_list)
+
+    def test_publish_partial_line_across_publishes(self):
+        self.patch_conf_property('guest_log_limit', 50)
+        self._append('first line\nsecond li')
+        self.guest_log._publish_to_container(self.log_filename)
+        self.assertEqual('first line\n', self._published())
+        self.assertEqual(11, self.guest_log._published_size)
+
+        self._append('ne\nthird line\n')
+        self.guest_log._publish_to_container(self.log_filename)
+        self.assertEqual('first line\nsecond line\nthird line\n',
+                         self._published())
+        self.assertEqual(34, self.guest_log._published_size)
+
+    def test_publish_lines_header(self):
+        self.patch_conf_property('guest_log_limit', 50)
+        self._append(''.join('line %d\n' % i for i in range(20)))
+        self.guest_log._publish_to_container(self.log_filename)
+
+        put_object = self.guest_log.swift_client.put_object
+        for args, kwargs in put_object.call_args_list:
+            self.assertEqual(args[2].count('\n'),
+                             kwargs['headers']['x-object-meta-lines'])
+
+
+class GuestLogShipTest(GuestLogPublishTest):
+
+    def setUp(self):
+        super(GuestLogShipTest, self).setUp()
+        self.guest_log._enabled = True
+        self.patch_conf_property('guest_log_limit', 50)
+        self.patch_conf_property('guest_log_ship_interval', 60)
+        self.patch_conf_property('guest_log_ship_batch_size', 20)
+
+    def test_ship_nothing_pending(self):
+        self.assertFalse(self.guest_log.ship())
+        self.assertFalse(self.guest_log.swift_client.put_object.called)
+
+    def test_ship_disabled(self):
+        self.guest_log._enabled = False
+        self._append('first line\nsecond line\n')
+        self.assertFalse(self.guest_log.ship())
+
+    def test_ship_batch_size(self):
+        self._append('first line\n')
+        self.assertTrue(self.guest_log.ship())
+        self.assertEqual(1, self.guest_log._put_meta_details.call_count)
+
+        # Less than a batch, and shipped less than an interval ago.
+        self._append('second line\n')
+        self.assertFalse(self.guest_log.ship())
+
+        self._append('third line\n')
+        self.assertTrue(self.guest_log.ship())
+        self.assertEqual('first line\nsecond line\nthird line\n',
+                         self._published())
+        self.assertEqual(2, self.guest_log._put_meta_details.call_count)
+        self.assertEqual(guest_log.LogStatus.Published,
+                         self.guest_log.status)
+
+    @patch.object(guest_log.time, 'time')
+    def test_ship_interval(self, mock_time):
+        mock_time.return_value = 1000
+        self._append('first line\n')
+        self.assertTrue(self.guest_log.ship())
+        self._append('second line\n')
+        mock_time.return_value = 1059
+        self.assertFalse(self.guest_log.ship())
+        mock_time.return_value = 1060
+        self.assertTrue(self.guest_log.ship())
+        self.assertEqual('first line\nsecond line\n', self._published())
+
+    def test_ship_rotated(self):
+        self._append('first line\nsecond line\n')
+        self.assertTrue(self.guest_log.ship())
+        inode = self.guest_log._published_inode
+        self.assertEqual(os.stat(self.log_filename).st_ino, inode)
+
+        # A file of the same size, but another inode.
+        self.guest_log._published_inode = inode + 1
+        self.assertTrue(self.guest_log.ship())
+        self.guest_log.swift_client.delete_object.assert_called_with(
+            ANY, self.guest_log._metafile_name())
+        self.assertEqual('first line\nsecond line\n' * 2, self._published())
+        self.assertEqual(inode, self.guest_log._published_inode)
+
+    def test_ship_stopped_status(self):
+        self._append('first line\n')
+        self.assertTrue(self.guest_log.ship())
+        self.guest_log.ship_stopped = True
+        self.assertEqual('Shipping Stopped', self.guest_log.show()['status'])
+
+        self.assertFalse(self.guest_log.ship())
+        self.assertEqual('Published', self.guest_log.show()['status'])
+
+    def test_ship_interleaved_with_discard(self):
+        events = []
+        discard = threading.Thread(target=self.guest_log.discard_log)
+
+        def _put_object(*args, **kwargs):
+            events.append('put')
+            if not discard.is_alive():
+                # Discard the log while the batch is being written.
+                discard.start()
+                discard.join(0.1)
+                self.assertTrue(discard.is_alive())
+
+        def _delete_object(*args, **kwargs):
+            events.append('delete')
+
+        swift_client = self.guest_log.swift_client
+        swift_client.put_object.side_effect = _put_object
+        swift_client.get_container.return_value = {}, []
+        swift_client.delete_object.side_effect = _delete_object
+        self._append('first line\nsecond line\n')
+        self.assertTrue(self.guest_log.ship())
+        discard.join()
+
+        self.assertEqual(['put', 'delete'], events)
+        self.assertEqual(0, self.guest_log._published_size)
@@ -24,6 +24,7 @@ from mock import Mock
 from mock import patch
 from proboscis.asserts import assert_equal
 from proboscis.asserts import assert_true
+from swiftclient.client import ClientException
 
 from trove.common import exception
 from trove.guestagent.common import operating_system
@@ -116,6 +117,39 @@ class ManagerTest(trove_testtools.TestCase):
         self.manager.update_status(self.context)
         self.manager.status.update.assert_any_call()
 
+    def test_batch_call(self):
+        self.manager.get_txn_count = MagicMock(return_value=10)
+        self.manager.wait_for_txn = MagicMock(return_value=None)
+        result = self.manager.batch_call(
+            self.context, [['get_txn_count', {}],
+                           ['wait_for_txn', {'txn': 'txn'}]])
+        self.assertEqual({'results': [10, None], 'error': None}, result)
+        self.manager.wait_for_txn.assert_called_once_with(self.context,
+                                                          txn='txn')
+
+    @patch.object(manager.LOG, 'exception')
+    def test_batch_call_stops_at_error(self, mock_log):
+        self.manager.get_txn_count = MagicMock(return_value=10)
+        self.manager.wait_for_txn = MagicMock(
+            side_effect=RuntimeError('failed'))
+        self.manager.get_last_txn = MagicMock()
+        result = self.manager.batch_call(
+            self.context, [['get_txn_count', {}],
+                           ['wait_for_txn', {'txn': 'txn'}],
+                           ['get_last_txn', {}]])
+        self.assertEqual({'results': [10], 'error': 'failed'}, result)
+        self.assertFalse(self.manager.get_last_txn.called)
+
+    def test_batch_call_not_allowed(self):
+        self.manager.get_txn_count = MagicMock(return_value=10)
+        self.manager.prepare = MagicMock()
+        result = self.manager.batch_call(
+            self.context, [['get_txn_count', {}], ['prepare', {}],
+                           ['_refresh_guest_log_cache', {}]])
+        self.assertEqual([10], result['results'])
+        self.assertIn('prepare', result['error'])
+        self.assertFalse(self.manager.prepare.called)
+
     def test_guest_log_list(self):
         log_list = self.manager.guest_log_list(self.context)
         expected = [self.expected_details_sys, self.expected_details_user]
@@ -225,6 +259,79 @@ class ManagerTest(trove_testtools.TestCase):
                      (log_details, self.expected_details_user))
         assert_equal(1, self.guest_log_user._delete_log_components.call_count)
 
+    def test_guest_log_shipper_disabled(self):
+        self.manager.guest_log_list(self.context)
+        self.assertIsNone(self.manager._guest_log_shipper)
+
+    @patch.object(manager.loopingcall, 'FixedIntervalLoopingCall')
+    def test_guest_log_shipper_started_once(self, mock_loop):
+        self.patch_conf_property('guest_log_ship_interval', 10)
+        self.manager.guest_log_list(self.context)
+        self.manager.guest_log_list(self.context)
+        mock_loop.assert_called_once_with(self.manager.ship_guest_logs)
+        mock_loop.return_value.start.assert_called_once_with(
+            interval=guest_log.SHIP_POLL_INTERVAL)
+
+    @patch.object(manager.LOG, 'exception')
+    def test_ship_guest_logs(self, mock_log):
+        self.guest_log_user.ship = MagicMock(
+            side_effect=RuntimeError('ship failed'))
+        self.guest_log_sys.ship = MagicMock()
+        self.guest_log_user._enabled = True
+        self.manager.ship_guest_logs()
+        self.guest_log_user.ship.assert_called_once_with()
+        self.guest_log_sys.ship.assert_called_once_with()
+        self.assertEqual(1, mock_log.call_count)
+
+    @patch.object(manager.LOG, 'debug')
+    @patch.object(manager.LOG, 'exception')
+    def test_ship_guest_logs_backoff(self, mock_log, mock_debug):
+        self.guest_log_sys.ship = MagicMock(
+            side_effect=RuntimeError('ship failed'))
+        with patch.object(manager.time, 'time', return_value=100):
+            self.manager.ship_guest_logs()
+            self.manager.ship_guest_logs()
+        self.assertEqual(1, self.guest_log_sys.ship.call_count)
+        with patch.object(manager.time, 'time',
+                          return_value=100 + guest_log.SHIP_POLL_INTERVAL):
+            self.manager.ship_guest_logs()
+        self.assertEqual(2, self.guest_log_sys.ship.call_count)
+        self.assertEqual(1, mock_log.call_count)
+        self.assertEqual(
+            (2, 100 + 3 * guest_log.SHIP_POLL_INTERVAL),
+            self.manager._guest_log_ship_backoff[self.log_name_sys])
+
+        self.guest_log_sys.ship.side_effect = None
+        with patch.object(manager.time, 'time', return_value=1000):
+            self.manager.ship_guest_logs()
+        self.assertEqual({}, self.manager._guest_log_ship_backoff)
+
+    @patch.object(manager.LOG, 'warning')
+    @patch.object(manager.loopingcall, 'FixedIntervalLoopingCall')
+    def test_ship_guest_logs_token_rejected(self, mock_loop, mock_log):
+        self.patch_conf_property('guest_log_ship_interval', 10)
+        self.manager.guest_log_list(self.context)
+        self.guest_log_sys.ship = MagicMock(side_effect=ClientException(
+            'Unauthorized', http_status=401))
+        self.assertRaises(manager.loopingcall.LoopingCallDone,
+                          self.manager.ship_guest_logs)
+        self.assertIsNone(self.manager._guest_log_shipper)
+        self.assertEqual(1, mock_log.call_count)
+        self.assertTrue(self.guest_log_sys.ship_stopped)
+        self.assertFalse(self.guest_log_user.ship_stopped)
+
+        # The next guest log request restarts shipping with its token.
+        self.manager.guest_log_list(self.context)
+        self.assertEqual(2, mock_loop.call_count)
+        self.assertEqual(2, mock_loop.return_value.start.call_count)
+
+    def test_ship_guest_logs_skips_disabled(self):
+        self.guest_log_user.ship = MagicMock()
+        self.guest_log_sys.ship = MagicMock()
+        self.manager.ship_guest_logs()
+        self.assertFalse(self.guest_log_user.ship.called)
+        self.guest_log_sys.ship.assert_called_once_with()
+
     def test_set_guest_log_status_disabled(self):
         data = [
             {'orig': guest_log.LogStatus.Enabled,
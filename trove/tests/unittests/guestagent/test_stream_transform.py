@@ -0,0 +1,104 @@
+# Copyright 2016 Tesora Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import gzip
+import os
+import StringIO
+
+from mock import patch
+
+from trove.guestagent.common import stream_transform
+from trove.tests.unittests import trove_testtools
+
+
+def read_all(stream, chunk_size=1000):
+    chunks = []
+    chunk = stream.read(chunk_size)
+    while chunk:
+        chunks.append(chunk)
+        chunk = stream.read(chunk_size)
+    return ''.join(chunks)
+
+
+def gunzip(data):
+    return gzip.GzipFile(fileobj=StringIO.StringIO(data)).read()
+
+
+class ParallelGzipStreamTest(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(ParallelGzipStreamTest, self).setUp()
+        # Compressible, but not trivially.
+        self.data = ''.join(os.urandom(16) * 64 for x in range(200))
+
+    def test_output_is_gzip(self):
+        stream = stream_transform.ParallelGzipStream(
+            StringIO.StringIO(self.data), workers=3, block_size=4096)
+
+        self.assertEqual(self.data, gunzip(read_all(stream)))
+
+    def test_one_member_per_block(self):
+        stream = stream_transform.ParallelGzipStream(
+            StringIO.StringIO(self.data), workers=3, block_size=4096)
+        output = read_all(stream)
+
+        blocks = [self.data[i:i + 4096]
+                  for i in range(0, len(self.data), 4096)]
+        self.assertEqual(''.join(stream_transform.gzip_member(block, 6)
+                                 for block in blocks), output)
+
+    def test_read_ahead_is_bounded(self):
+        source = StringIO.StringIO(self.data)
+        stream = stream_transform.ParallelGzipStream(
+            source, workers=2, block_size=4096)
+        stream.read(10)
+        self.assertEqual(2 * 4096, source.tell())
+        stream.close()
+
+    def test_empty_stream(self):
+        stream = stream_transform.ParallelGzipStream(
+            StringIO.StringIO(''), workers=2, block_size=4096)
+        self.assertEqual('', stream.read(10))
+
+
+class CommandStreamTest(trove_testtools.TestCase):
+
+    def test_pipe_through_command(self):
+        data = os.urandom(100000)
+        stream = stream_transform.CommandStream(
+            StringIO.StringIO(data), 'gzip', 4096)
+
+        self.assertEqual(data, gunzip(read_all(stream)))
+
+    def test_command_error_raised(self):
+        stream = stream_transform.CommandStream(
+            StringIO.StringIO('data'), 'cat > /dev/null; exit 3', 4096)
+
+        self.assertRaises(stream_transform.StreamTransformError,
+                          read_all, stream)
+
+    @patch.object(stream_transform, 'LOG')
+    def test_encrypted_output_read_by_openssl(self, mock_logging):
+        data = os.urandom(100000)
+        key = 'default_aes_cbc_key'
+        encrypted = read_all(stream_transform.CommandStream(
+            stream_transform.ParallelGzipStream(
+                StringIO.StringIO(data), workers=2, block_size=8192),
+            'openssl enc -aes-256-cbc -salt -pass pass:%s' % key, 4096))
+
+        decrypted = read_all(stream_transform.CommandStream(
+            StringIO.StringIO(encrypted),
+            'openssl enc -d -aes-256-cbc -salt -pass pass:%s' % key, 4096))
+        self.assertEqual(data, gunzip(decrypted))
@@ -13,7 +13,9 @@
 #    under the License.
 import uuid
 
+import eventlet
 from mock import Mock, patch
+from novaclient import exceptions as nova_exceptions
 
 from trove.backup import models as backup_models
 from trove.common import cfg
@@ -402,3 +404,220 @@ class TestReplication(trove_testtools.TestCase):
                           None, 'name', 2, "UUID", [], [], self.datastore,
                           self.datastore_version, 1,
                           None, slave_of_id=self.replica_info.id)
+
+
+class FakeServer(object):
+
+    def __init__(self, id, status='ACTIVE'):
+        self.id = id
+        self.status = status
+        self.addresses = {}
+
+
+class TestServerListMatcher(trove_testtools.TestCase):
+
+    def test_find_server(self):
+        servers = [FakeServer('s1'), FakeServer('s2')]
+        find_server = models.create_server_list_matcher(servers)
+        self.assertEqual(servers[1], find_server('i2', 's2'))
+
+    def test_find_server_not_found(self):
+        find_server = models.create_server_list_matcher([FakeServer('s1')])
+        self.assertRaises(exception.ComputeInstanceNotFound,
+                          find_server, 'i2', 's2')
+
+    @patch('trove.instance.models.LOG')
+    def test_find_server_found_twice(self, mock_logging):
+        servers = [FakeServer('s1'), FakeServer('s1'), FakeServer('s2')]
+        find_server = models.create_server_list_matcher(servers)
+        self.assertRaises(exception.TroveError, find_server, 'i1', 's1')
+        self.assertEqual(servers[2], find_server('i2', 's2'))
+
+    @patch.object(InstanceServiceStatus, 'find_all_by_instance_ids')
+    def test_load_servers_status_reads_server_ids_once(
+            self, mock_find_statuses):
+        # A scan of the server list per instance would read the id of
+        # every server for each of the instances.
+        id_reads = []
+
+        class CountingServer(FakeServer):
+
+            @property
+            def id(self):
+                id_reads.append(self._id)
+                return self._id
+
+            @id.setter
+            def id(self, value):
+                self._id = value
+
+        count = 1000
+        servers = [CountingServer('server-%d' % i) for i in range(count)]
+        db_infos = [DBInstance(InstanceTasks.NONE,
+                               id='instance-%d' % i,
+                               compute_instance_id='server-%d' % i,
+                               region_id=None)
+                    for i in range(count)]
+        status = InstanceServiceStatus(ServiceStatuses.RUNNING)
+        mock_find_statuses.return_value = dict(
+            (db_info.id, status) for db_info in db_infos)
+        find_server = models.create_server_list_matcher(servers)
+
+        instances = models.Instances._load_servers_status(
+            lambda context, db, status, server=None: db,
+            None, db_infos, find_server)
+
+        self.assertEqual(count, len(instances))
+        self.assertEqual('ACTIVE', instances[-1].server_status)
+        self.assertEqual(2 * count, len(id_reads))
+
+
+class TestInstancesLoadPageServers(trove_testtools.TestCase):
+
+    def _db_info(self, id, task_status=InstanceTasks.NONE, region_id=None):
+        return DBInstance(task_status, id=id,
+                          compute_instance_id='server-' + id,
+                          region_id=region_id)
+
+    def test_load_page_servers(self):
+        client = Mock()
+        client.servers.get.side_effect = lambda server_id: FakeServer(
+            server_id)
+        db_items = [self._db_info('1'), self._db_info('2'),
+                    self._db_info('3', task_status=InstanceTasks.BUILDING),
+                    self._db_info('4', region_id='OtherRegion')]
+
+        servers = models.Instances._load_page_servers(client, db_items)
+
+        self.assertEqual(['server-1', 'server-2'],
+                         sorted(server.id for server in servers))
+        self.assertEqual(2, client.servers.get.call_count)
+        self.assertFalse(client.servers.list.called)
+
+    def test_load_page_servers_not_found(self):
+        client = Mock()
+
+        def get_server(server_id):
+            if server_id == 'server-2':
+                raise nova_exceptions.NotFound(404)
+            return FakeServer(server_id)
+
+        client.servers.get.side_effect = get_server
+        db_items = [self._db_info('1'), self._db_info('2')]
+
+        servers = models.Instances._load_page_servers(client, db_items)
+        find_server = models.create_server_list_matcher(servers)
+
+        self.assertEqual('server-1', find_server('1', 'server-1').id)
+        self.assertRaises(exception.ComputeInstanceNotFound,
+                          find_server, '2', 'server-2')
+
+
+class TestInstancesLoadRemoteServers(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(TestInstancesLoadRemoteServers, self).setUp()
+        self.clients = {}
+
+        def create_client(context, region_name=None):
+            client = Mock()
+            client.servers.get.side_effect = (
+                lambda server_id: FakeServer(server_id))
+            self.clients[region_name] = client
+            return client
+
+        patcher = patch.object(models, 'create_nova_client',
+                               side_effect=create_client)
+        self.addCleanup(patcher.stop)
+        self.mock_create_client = patcher.start()
+
+    def _db_info(self, id, region_id, task_status=InstanceTasks.NONE):
+        return DBInstance(task_status, id=id,
+                          compute_instance_id='server-' + id,
+                          region_id=region_id)
+
+    def test_load_remote_servers(self):
+        db_items = [self._db_info('1', 'RegionTwo'),
+                    self._db_info('2', 'RegionTwo'),
+                    self._db_info('3', 'RegionThree'),
+                    self._db_info('4', CONF.os_region_name),
+                    self._db_info('5', 'RegionTwo',
+                                  task_status=InstanceTasks.BUILDING)]
+
+        servers = models.Instances._load_remote_servers(None, db_items)
+
+        self.assertEqual(
+            set([('RegionTwo', 'server-1'), ('RegionTwo', 'server-2'),
+                 ('RegionThree', 'server-3')]),
+            set(servers))
+        self.assertEqual(2, self.mock_create_client.call_count)
+        self.assertEqual(2, self.clients['RegionTwo'].servers.get.call_count)
+
+    @patch('trove.instance.models.LOG')
+    def test_load_remote_servers_not_found(self, mock_logging):
+        db_items = [self._db_info('1', 'RegionTwo'),
+                    self._db_info('2', 'RegionTwo')]
+        self.mock_create_client.side_effect = None
+        client = self.mock_create_client.return_value
+
+        def get_server(server_id):
+            if server_id == 'server-2':
+                raise nova_exceptions.NotFound(404)
+            return FakeServer(server_id)
+
+        client.servers.get.side_effect = get_server
+
+        servers = models.Instances._load_remote_servers(None, db_items)
+
+        self.assertEqual([('RegionTwo', 'server-1')], list(servers))
+
+    @patch('trove.instance.models.LOG')
+    def test_load_remote_servers_timeout(self, mock_logging):
+        self.patch_conf_property('instances_list_remote_server_timeout', 0)
+        self.mock_create_client.side_effect = None
+        client = self.mock_create_client.return_value
+        client.servers.get.side_effect = lambda server_id: eventlet.sleep(1)
+
+        servers = models.Instances._load_remote_servers(
+            None, [self._db_info('1', 'RegionTwo')])
+
+        self.assertEqual({}, servers)
+        self.assertTrue(mock_logging.warning.called)
+
+
+class TestInstanceServiceStatusBulkLoad(trove_testtools.TestCase):
+
+    def setUp(self):
+        util.init_db()
+        super(TestInstanceServiceStatusBulkLoad, self).setUp()
+        self.statuses = []
+        for status in [ServiceStatuses.RUNNING, ServiceStatuses.BUILDING]:
+            service_status = InstanceServiceStatus(
+                status, id=str(uuid.uuid4()), instance_id=str(uuid.uuid4()))
+            service_status.save()
+            self.statuses.append(service_status)
+
+    def tearDown(self):
+        for service_status in self.statuses:
+            service_status.delete()
+        super(TestInstanceServiceStatusBulkLoad, self).tearDown()
+
+    def test_find_all_by_instance_ids(self):
+        missing_id = str(uuid.uuid4())
+        instance_ids = [status.instance_id for status in self.statuses]
+        statuses = InstanceServiceStatus.find_all_by_instance_ids(
+            instance_ids + [missing_id])
+        self.assertEqual(set(instance_ids), set(statuses))
+        self.assertEqual(ServiceStatuses.BUILDING,
+                         statuses[instance_ids[1]].status)
+
+    @patch.object(InstanceServiceStatus, 'MAX_IDS_PER_QUERY', 1)
+    def test_find_all_by_instance_ids_batched(self):
+        instance_ids = [status.instance_id for status in self.statuses]
+        statuses = InstanceServiceStatus.find_all_by_instance_ids(
+            instance_ids)
+        self.assertEqual(set(instance_ids), set(statuses))
+
+    def test_find_all_by_instance_ids_empty(self):
+        self.assertEqual(
+            {}, InstanceServiceStatus.find_all_by_instance_ids([]))
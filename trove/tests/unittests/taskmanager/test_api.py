@@ -67,6 +67,14 @@ class ApiTest(trove_testtools.TestCase):
             root_password='pwd', slave_of_id='slv-id', users={'name': 'usr1'},
             volume_size=1, volume_type='type')
 
+    def test_instance_status_changed(self):
+        self.api.instance_status_changed('some-instance-id', 'running')
+
+        self.api.client.prepare.assert_called_once_with(
+            version=RPC_API_VERSION, fanout=True)
+        self._verify_cast('instance_status_changed',
+                          instance_id='some-instance-id', status='running')
+
     def test_detach_replica(self):
         self.api.detach_replica('some-instance-id')
 
@@ -95,24 +95,29 @@ class MongoDbClusterTasksTest(trove_testtools.TestCase):
                                          datastore_version=mock_dv1)
 
     @patch.object(ClusterTasks, 'update_statuses_on_failure')
-    @patch.object(InstanceServiceStatus, 'find_by')
+    @patch.object(InstanceServiceStatus, 'find_all_by_instance_ids')
     @patch('trove.taskmanager.models.LOG')
     def test_all_instances_ready_bad_status(self, mock_logging,
                                             mock_find, mock_update):
-        (mock_find.return_value.
-         get_status.return_value) = ServiceStatuses.FAILED
+        mock_status = Mock()
+        mock_status.get_status.return_value = ServiceStatuses.FAILED
+        mock_find.return_value = dict.fromkeys(["1", "2", "3", "4"],
+                                               mock_status)
         ret_val = self.clustertasks._all_instances_ready(["1", "2", "3", "4"],
                                                          self.cluster_id)
         mock_update.assert_called_with(self.cluster_id, None)
         self.assertFalse(ret_val)
 
-    @patch.object(InstanceServiceStatus, 'find_by')
+    @patch.object(InstanceServiceStatus, 'find_all_by_instance_ids')
     def test_all_instances_ready(self, mock_find):
-        (mock_find.return_value.
-         get_status.return_value) = ServiceStatuses.INSTANCE_READY
+        mock_status = Mock()
+        mock_status.get_status.return_value = ServiceStatuses.INSTANCE_READY
+        mock_find.return_value = dict.fromkeys(["1", "2", "3", "4"],
+                                               mock_status)
         ret_val = self.clustertasks._all_instances_ready(["1", "2", "3", "4"],
                                                          self.cluster_id)
         self.assertTrue(ret_val)
+        mock_find.assert_called_with(["1", "2", "3", "4"])
 
     @patch.object(ClusterTasks, 'update_statuses_on_failure')
     @patch.object(ClusterTasks, 'get_guest')
@@ -263,7 +268,7 @@ class MongoDbClusterTasksTest(trove_testtools.TestCase):
     @patch.object(DBCluster, 'find_by')
     @patch.object(DBInstance, 'find_all')
     def test_delete_cluster(self, mock_find_all, mock_find_by, mock_save):
-        mock_find_all.return_value.all.return_value = []
+        mock_find_all.return_value.count.return_value = 0
         mock_find_by.return_value = self.db_cluster
         self.clustertasks.delete_cluster(Mock(), self.cluster_id)
         self.assertEqual(ClusterTaskStatus.NONE, self.db_cluster.task_status)
@@ -14,18 +14,26 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import sys
+import traceback
+
+import eventlet
 from mock import ANY, DEFAULT, Mock, patch, PropertyMock
 from proboscis.asserts import assert_equal
 
 from trove.backup.models import Backup
+from trove.common import cfg
 from trove.common.exception import TroveError, ReplicationSlaveAttachError
 from trove.common import server_group as srv_grp
+from trove.common import utils
 from trove.instance.tasks import InstanceTasks
 from trove.taskmanager.manager import Manager
 from trove.taskmanager import models
 from trove.taskmanager import service
 from trove.tests.unittests import trove_testtools
 
+CONF = cfg.CONF
+
 
 class TestManager(trove_testtools.TestCase):
 
@@ -99,15 +107,19 @@ class TestManager(trove_testtools.TestCase):
             self.manager.promote_to_replica_source(
                 self.context, 'some-inst-id')
 
-        self.mock_slave1.detach_replica.assert_called_with(
-            self.mock_old_master, for_failover=True)
+        replica_info = self.mock_slave1.promote_to_master.return_value
+        self.mock_slave1.promote_to_master.assert_called_with(
+            self.mock_old_master,
+            self.mock_old_master.get_latest_txn_id.return_value)
+        self.assertFalse(self.mock_slave1.detach_replica.called)
         self.mock_old_master.attach_replica.assert_called_with(
-            self.mock_slave1)
+            self.mock_slave1, replica_info)
         self.mock_slave1.make_read_only.assert_called_with(False)
 
         self.mock_slave2.detach_replica.assert_called_with(
             self.mock_old_master, for_failover=True)
-        self.mock_slave2.attach_replica.assert_called_with(self.mock_slave1)
+        self.mock_slave2.attach_replica.assert_called_with(
+            self.mock_slave1, replica_info)
 
         self.mock_old_master.demote_replication_master.assert_any_call()
 
@@ -132,6 +144,11 @@ class TestManager(trove_testtools.TestCase):
                                                   'some-inst-id')
                 mock_most_current_replica.assert_called_with(
                     self.mock_master, [self.mock_slave1, self.mock_slave2])
+                self.mock_slave1.promote_to_master.assert_called_with(
+                    self.mock_master)
+                self.mock_slave2.attach_replica.assert_called_with(
+                    self.mock_slave1,
+                    self.mock_slave1.promote_to_master.return_value)
                 mock_set_task_status.assert_called_with(([self.mock_master] +
                                                          [self.mock_slave1,
                                                           self.mock_slave2]),
@@ -141,6 +158,7 @@ class TestManager(trove_testtools.TestCase):
 
     @patch.object(Manager, '_set_task_status')
     @patch('trove.taskmanager.manager.LOG')
+    @patch('trove.common.utils.LOG')
     def test_exception_TroveError_promote_to_replica_source(self, *args):
         self.mock_slave2.detach_replica = Mock(side_effect=TroveError)
         with patch.object(models.BuiltInstanceTasks, 'load',
@@ -153,8 +171,9 @@ class TestManager(trove_testtools.TestCase):
     @patch.object(Manager, '_set_task_status')
     @patch.object(Manager, '_most_current_replica')
     @patch('trove.taskmanager.manager.LOG')
+    @patch('trove.common.utils.LOG')
     def test_exception_TroveError_eject_replica_source(
-            self, mock_logging, mock_most_current_replica,
+            self, mock_utils_logging, mock_logging, mock_most_current_replica,
             mock_set_tast_status):
         self.mock_slave2.detach_replica = Mock(side_effect=TroveError)
         mock_most_current_replica.return_value = self.mock_slave1
@@ -164,8 +183,11 @@ class TestManager(trove_testtools.TestCase):
             self.assertRaises(ReplicationSlaveAttachError,
                               self.manager.eject_replica_source,
                               self.context, 'some-inst-id')
+        mock_set_tast_status.assert_called_with(
+            [self.mock_slave2], InstanceTasks.EJECTION_ERROR)
 
     @patch.object(Manager, '_set_task_status')
+    @patch('trove.common.utils.LOG')
     def test_error_promote_to_replica_source(self, *args):
         self.mock_slave2.detach_replica = Mock(
             side_effect=RuntimeError('Error'))
@@ -177,6 +199,56 @@ class TestManager(trove_testtools.TestCase):
                                     self.manager.promote_to_replica_source,
                                     self.context, 'some-inst-id')
 
+    @patch.object(Manager, '_set_task_status')
+    @patch('trove.common.utils.LOG')
+    def test_error_traceback_promote_to_replica_source(self, *args):
+        def _detach_replica(*args, **kwargs):
+            raise RuntimeError('Error')
+
+        self.mock_slave2.detach_replica = _detach_replica
+        with patch.object(models.BuiltInstanceTasks, 'load',
+                          side_effect=[self.mock_slave1, self.mock_old_master,
+                                       self.mock_slave2]):
+            try:
+                self.manager.promote_to_replica_source(self.context,
+                                                       'some-inst-id')
+            except RuntimeError:
+                frames = traceback.extract_tb(sys.exc_info()[2])
+            else:
+                self.fail("RuntimeError not raised.")
+        self.assertEqual(['_migrate_replica', '_detach_replica'],
+                         [frame[2] for frame in frames[-2:]])
+
+    @patch.object(Manager, '_set_task_status')
+    @patch('trove.taskmanager.manager.LOG')
+    @patch('trove.common.utils.LOG')
+    def test_timeout_promote_to_replica_source(self, *args):
+        self.patch_conf_property('agent_call_high_timeout', 0.05)
+        self.mock_slave2.detach_replica = lambda *args, **kwargs: (
+            eventlet.sleep(1))
+        with patch.object(models.BuiltInstanceTasks, 'load',
+                          side_effect=[self.mock_slave1, self.mock_old_master,
+                                       self.mock_slave2]):
+            self.assertRaises(ReplicationSlaveAttachError,
+                              self.manager.promote_to_replica_source,
+                              self.context, 'some-inst-id')
+
+    @patch.object(utils, 'fan_out')
+    def test_replica_fan_out_timeouts(self, mock_fan_out):
+        self.manager._get_replication_details([self.mock_slave1])
+        mock_fan_out.assert_called_with(
+            ANY, [self.mock_slave1], timeout=CONF.agent_call_high_timeout)
+        self.manager._get_replica_txns([self.mock_slave1])
+        mock_fan_out.assert_called_with(
+            ANY, [self.mock_slave1], timeout=CONF.agent_call_high_timeout)
+        self.manager._migrate_replicas('action', self.mock_old_master,
+                                       self.mock_slave1,
+                                       [self.mock_slave1, self.mock_slave2],
+                                       Mock())
+        mock_fan_out.assert_called_with(
+            ANY, [self.mock_slave2],
+            timeout=2 * CONF.agent_call_high_timeout)
+
     @patch('trove.taskmanager.manager.LOG')
     def test_error_demote_replication_master_promote_to_replica_source(
             self, mock_logging):
@@ -192,7 +264,9 @@ class TestManager(trove_testtools.TestCase):
 
     @patch.object(Manager, '_set_task_status')
     @patch.object(Manager, '_most_current_replica')
-    def test_error_eject_replica_source(self, mock_most_current_replica,
+    @patch('trove.common.utils.LOG')
+    def test_error_eject_replica_source(self, mock_logging,
+                                        mock_most_current_replica,
                                         mock_set_tast_status):
         self.mock_slave2.detach_replica = Mock(
             side_effect=RuntimeError('Error'))
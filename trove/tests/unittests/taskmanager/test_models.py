@@ -19,7 +19,7 @@ import uuid
 from cinderclient import exceptions as cinder_exceptions
 import cinderclient.v2.client as cinderclient
 from cinderclient.v2 import volumes as cinderclient_volumes
-from mock import Mock, MagicMock, patch, PropertyMock, call
+from mock import ANY, Mock, MagicMock, patch, PropertyMock, call
 from novaclient import exceptions as nova_exceptions
 import novaclient.v2.flavors
 import novaclient.v2.servers
@@ -39,6 +39,7 @@ from trove.common.instance import ServiceStatuses
 from trove.common.notification import TroveInstanceModifyVolume
 from trove.common import remote
 from trove.common.strategies import storage
+from trove.common.strategies.storage import dedup
 import trove.common.template as template
 from trove.common import utils
 from trove.datastore import models as datastore_models
@@ -857,6 +858,60 @@ class BuiltInstanceTasksTest(trove_testtools.TestCase):
             replica_context, config_content)
         mock_update_db.assert_called_with(slave_of_id=master.id)
 
+    @patch.object(BaseInstance, 'update_db')
+    def test_attach_replica_with_context(self, mock_update_db):
+        master = MagicMock()
+        replica_context = trove_testtools.TroveTestContext(self)
+        with patch.object(taskmanager_models.BuiltInstanceTasks,
+                          '_render_replica_config'):
+            self.instance_task.attach_replica(master, replica_context)
+        self.assertFalse(master.guest.get_replica_context.called)
+        self.instance_task._guest.attach_replica.assert_called_with(
+            replica_context, ANY)
+
+    @patch.object(BaseInstance, 'update_db')
+    def test_promote_to_master(self, mock_update_db):
+        detach_batch, master_batch = MagicMock(), MagicMock()
+        self.instance_task._guest.batch.return_value.__enter__.side_effect = [
+            detach_batch, master_batch]
+        master_batch.results = [None, 'replica-context']
+        replica_source_config = MagicMock()
+        with patch.object(self.instance_task, '_render_replica_source_config',
+                          return_value=replica_source_config):
+            replica_info = self.instance_task.promote_to_master(Mock(),
+                                                                'txn')
+        self.assertEqual('replica-context', replica_info)
+        detach_batch.wait_for_txn.assert_called_once_with('txn')
+        detach_batch.detach_replica.assert_called_once_with(True)
+        master_batch.enable_as_master.assert_called_once_with(
+            replica_source_config.config_contents)
+        master_batch.get_replica_context.assert_called_once_with()
+        mock_update_db.assert_called_with(slave_of_id=None)
+
+    @patch.object(BaseInstance, 'update_db')
+    @patch('trove.taskmanager.models.LOG')
+    def test_error_promote_to_master(self, mock_logging, mock_update_db):
+        self.instance_task._guest.batch.return_value.__exit__.side_effect = (
+            GuestError)
+        with patch.object(self.instance_task, '_render_replica_source_config'):
+            self.assertRaises(GuestError,
+                              self.instance_task.promote_to_master, Mock())
+        batch = self.instance_task._guest.batch.return_value.__enter__()
+        self.assertFalse(batch.wait_for_txn.called)
+        self.assertFalse(batch.enable_as_master.called)
+        mock_update_db.assert_not_called()
+
+    @patch.object(BaseInstance, 'update_db')
+    @patch('trove.taskmanager.models.LOG')
+    def test_error_enable_as_master_after_detach(self, mock_logging,
+                                                 mock_update_db):
+        self.instance_task._guest.batch.return_value.__exit__.side_effect = [
+            None, GuestError]
+        with patch.object(self.instance_task, '_render_replica_source_config'):
+            self.assertRaises(GuestError,
+                              self.instance_task.promote_to_master, Mock())
+        mock_update_db.assert_called_once_with(slave_of_id=None)
+
     @patch('trove.taskmanager.models.LOG')
     def test_error_attach_replica(self, mock_logging):
         with patch.object(self.instance_task._guest, 'attach_replica',
@@ -992,6 +1047,7 @@ class BackupTasksTest(trove_testtools.TestCase):
             return_value=self.container_content)
         self.swift_client.delete_object = MagicMock(return_value=None)
         self.swift_client.delete_container = MagicMock(return_value=None)
+        self.swift_client.get_capabilities = MagicMock(return_value={})
         self.storage_patch = patch.object(storage, 'get_storage_strategy')
         self.storage_mock = self.storage_patch.start()
         self.addCleanup(self.storage_patch.stop)
@@ -1037,6 +1093,131 @@ class BackupTasksTest(trove_testtools.TestCase):
                 self.backup.state,
                 "backup should be in DELETE_FAILED status")
 
+    def _delete_manifest(self):
+        self.swift_client.head_object = MagicMock(
+            return_value={'x-object-manifest': 'database_backups/12e48_'})
+        taskmanager_models.BackupTasks.delete_backup('dummy context',
+                                                     self.backup.id)
+
+    @patch('trove.taskmanager.models.LOG')
+    def test_delete_backup_segments(self, mock_logging):
+        self._delete_manifest()
+
+        self.swift_client.get_container.assert_called_once_with(
+            'database_backups', prefix='12e48_', full_listing=True)
+        self.swift_client.delete_object.assert_has_calls(
+            [call('database_backups', name)
+             for name in ['first', 'second', 'third']] +
+            [call('database_backups', '12e48.xbstream.gz')],
+            any_order=True)
+        self.backup.delete.assert_any_call()
+
+    @patch('trove.taskmanager.models.LOG')
+    def test_delete_backup_segments_already_deleted(self, mock_logging):
+        self.swift_client.delete_object = MagicMock(
+            side_effect=[ClientException("foo", http_status=404),
+                         None, None, None])
+        self._delete_manifest()
+
+        self.assertEqual(4, self.swift_client.delete_object.call_count)
+        self.backup.delete.assert_any_call()
+
+    @patch('trove.taskmanager.models.LOG')
+    def test_delete_backup_segments_bulk_delete(self, mock_logging):
+        self.swift_client.get_capabilities = MagicMock(
+            return_value={'bulk_delete': {'max_deletes_per_request': 2}})
+        self.swift_client.post_account = MagicMock(
+            return_value=({}, '{"Errors": [], "Number Deleted": 2}'))
+        self._delete_manifest()
+
+        self.swift_client.post_account.assert_has_calls([
+            call(ANY, query_string='bulk-delete',
+                 data='/database_backups/first\n/database_backups/second'),
+            call(ANY, query_string='bulk-delete',
+                 data='/database_backups/third')])
+        # Only the manifest is deleted on its own.
+        self.swift_client.delete_object.assert_called_once_with(
+            'database_backups', '12e48.xbstream.gz')
+        self.backup.delete.assert_any_call()
+
+    @patch('trove.taskmanager.models.LOG')
+    def test_delete_backup_segments_bulk_delete_errors(self, mock_logging):
+        self.swift_client.get_capabilities = MagicMock(
+            return_value={'bulk_delete': {'max_deletes_per_request': 10}})
+        self.swift_client.post_account = MagicMock(return_value=(
+            {}, '{"Errors": [["/database_backups/first", "409 Conflict"]],'
+                ' "Response Status": "400 Bad Request"}'))
+
+        self.swift_client.delete_object = MagicMock(
+            side_effect=[ClientException("foo", http_status=409),
+                         None, None, None])
+
+        self.assertRaises(TroveError, self._delete_manifest)
+        self.assertEqual(state.BackupState.DELETE_FAILED, self.backup.state)
+
+    @patch('trove.taskmanager.models.LOG')
+    def test_delete_backup_segments_bulk_delete_retried(self, mock_logging):
+        self.swift_client.get_capabilities = MagicMock(
+            return_value={'bulk_delete': {'max_deletes_per_request': 2}})
+        self.swift_client.post_account = MagicMock(side_effect=[
+            ({}, '{"Errors": [], "Number Deleted": 2}'),
+            ({}, '{"Errors": [["/database_backups/third", "409 Conflict"]],'
+                 ' "Response Status": "400 Bad Request"}')])
+        self._delete_manifest()
+
+        # The objects of the failed request are deleted one at a time.
+        self.swift_client.delete_object.assert_has_calls(
+            [call('database_backups', 'third'),
+             call('database_backups', '12e48.xbstream.gz')])
+        self.assertEqual(2, self.swift_client.delete_object.call_count)
+        self.backup.delete.assert_any_call()
+
+    @patch('trove.taskmanager.models.LOG')
+    def test_delete_backup_segments_bulk_delete_old_client(self,
+                                                           mock_logging):
+        def _post_account(headers, response_dict=None):
+            pass
+
+        self.swift_client.get_capabilities = MagicMock(
+            return_value={'bulk_delete': {'max_deletes_per_request': 10}})
+        self.swift_client.post_account = MagicMock(side_effect=_post_account)
+        self._delete_manifest()
+
+        self.assertEqual(4, self.swift_client.delete_object.call_count)
+        self.backup.delete.assert_any_call()
+
+    @patch.object(dedup, 'sweep_chunks')
+    @patch.object(backup_models.Backup, 'running_for_tenant',
+                  return_value=None)
+    def test_delete_backup_chunk_manifest(self, mock_running, mock_sweep):
+        context = trove_testtools.TroveTestContext(self)
+        self.swift_client.head_object = MagicMock(
+            return_value={'content-type': dedup.MANIFEST_CONTENT_TYPE})
+
+        taskmanager_models.BackupTasks.delete_backup(context, self.backup.id)
+
+        self.swift_client.delete_object.assert_called_once_with(
+            'database_backups', '12e48.xbstream.gz')
+        mock_running.assert_called_once_with(context.tenant)
+        mock_sweep.assert_called_once_with(self.swift_client,
+                                           'database_backups')
+        self.backup.delete.assert_any_call()
+
+    @patch.object(dedup, 'sweep_chunks')
+    @patch.object(backup_models.Backup, 'running_for_tenant')
+    def test_delete_backup_chunk_manifest_backup_running(self, mock_running,
+                                                         mock_sweep):
+        context = trove_testtools.TroveTestContext(self)
+        self.swift_client.head_object = MagicMock(
+            return_value={'content-type': dedup.MANIFEST_CONTENT_TYPE})
+
+        taskmanager_models.BackupTasks.delete_backup(context, self.backup.id)
+
+        self.swift_client.delete_object.assert_called_once_with(
+            'database_backups', '12e48.xbstream.gz')
+        self.assertFalse(mock_sweep.called)
+        self.backup.delete.assert_any_call()
+
     def test_parse_manifest(self):
         manifest = 'container/prefix'
         cont, prefix = taskmanager_models.BackupTasks._parse_manifest(manifest)
@@ -0,0 +1,64 @@
+# Copyright 2016 Tesora Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import time
+
+import eventlet
+from mock import patch
+
+from trove.common import exception
+from trove.taskmanager import manager
+from trove.taskmanager import status_events
+from trove.tests.unittests import trove_testtools
+
+
+class InstanceStatusEventsTest(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(InstanceStatusEventsTest, self).setUp()
+        self.events = status_events.InstanceStatusEvents()
+        self.ready = set()
+
+    def _set_ready(self, instance_id):
+        self.ready.add(instance_id)
+        self.events.notify(instance_id)
+
+    def _poll(self, sleep_time=60, time_out=60):
+        self.events.poll_until(['a', 'b'],
+                               lambda: self.ready >= set(['a', 'b']),
+                               sleep_time=sleep_time, time_out=time_out)
+
+    def test_woken_by_status_change(self):
+        eventlet.spawn_after(0.01, self._set_ready, 'a')
+        eventlet.spawn_after(0.02, self._set_ready, 'b')
+        start = time.time()
+        self._poll()
+        self.assertLess(time.time() - start, 1)
+        self.assertEqual({}, dict(self.events._watchers))
+
+    def test_fallback_poll(self):
+        # A change that is not notified is seen at the next poll.
+        eventlet.spawn_after(0.01, self.ready.update, ['a', 'b'])
+        self._poll(sleep_time=0.05)
+
+    def test_other_instances_ignored(self):
+        eventlet.spawn_after(0.01, self._set_ready, 'c')
+        self.assertRaises(exception.PollTimeOut, self._poll, time_out=0.1)
+        self.assertEqual({}, dict(self.events._watchers))
+
+    @patch.object(status_events, 'STATUS_EVENTS')
+    def test_manager_notifies(self, mock_events):
+        manager.Manager().instance_status_changed(None, 'a', 'running')
+        mock_events.notify.assert_called_once_with('a')
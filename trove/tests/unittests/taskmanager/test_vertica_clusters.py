@@ -86,24 +86,29 @@ class VerticaClusterTasksTest(trove_testtools.TestCase):
                                          datastore_version=mock_dv1)
 
     @patch.object(ClusterTasks, 'update_statuses_on_failure')
-    @patch.object(InstanceServiceStatus, 'find_by')
+    @patch.object(InstanceServiceStatus, 'find_all_by_instance_ids')
     @patch('trove.taskmanager.models.LOG')
     def test_all_instances_ready_bad_status(self, mock_logging,
                                             mock_find, mock_update):
-        (mock_find.return_value.
-         get_status.return_value) = ServiceStatuses.FAILED
+        mock_status = Mock()
+        mock_status.get_status.return_value = ServiceStatuses.FAILED
+        mock_find.return_value = dict.fromkeys(["1", "2", "3", "4"],
+                                               mock_status)
         ret_val = self.clustertasks._all_instances_ready(["1", "2", "3", "4"],
                                                          self.cluster_id)
         mock_update.assert_called_with(self.cluster_id, None)
         self.assertFalse(ret_val)
 
-    @patch.object(InstanceServiceStatus, 'find_by')
+    @patch.object(InstanceServiceStatus, 'find_all_by_instance_ids')
     def test_all_instances_ready(self, mock_find):
-        (mock_find.return_value.
-         get_status.return_value) = ServiceStatuses.INSTANCE_READY
+        mock_status = Mock()
+        mock_status.get_status.return_value = ServiceStatuses.INSTANCE_READY
+        mock_find.return_value = dict.fromkeys(["1", "2", "3", "4"],
+                                               mock_status)
         ret_val = self.clustertasks._all_instances_ready(["1", "2", "3", "4"],
                                                          self.cluster_id)
         self.assertTrue(ret_val)
+        mock_find.assert_called_with(["1", "2", "3", "4"])
 
     @patch.object(ClusterTasks, 'reset_task')
     @patch.object(ClusterTasks, '_all_instances_ready', return_value=False)